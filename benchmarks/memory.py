@@ -0,0 +1,64 @@
+"""reports how many bytes a tile, an entity and a sound cost, so memory regressions in the object model get caught.
+it needs OpenAL but no window, pygame isn't started. run it from the root of the repository:
+python -m benchmarks.memory [count]
+"""
+
+import sys
+import tracemalloc
+
+from libs import audio, clock, openal, world_map
+
+
+class StubGame:
+    """the parts of game.Game a map and its entities use"""
+
+    def __init__(self):
+        self.time_domain = clock.TimeDomain()
+
+    def new_clock(self, domain=None):
+        return clock.Clock(domain or self.time_domain)
+
+    def new_domain(self, parent=None, scale=1.0):
+        return clock.TimeDomain(parent or self.time_domain, scale)
+
+
+def measure(create, count):
+    """returns the bytes allocated per call of {create}, averaged over {count} calls"""
+    keep = []
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        keep.append(create(i))
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count
+
+
+def main(count=10000):
+    g = StubGame()
+    side = int(count**0.5) + 1
+    m = world_map.Map(g, 0, 0, 0, side, side, 1)
+    src = audio.Src()
+    buffer = openal.BufferSound()
+    buffer.duration = 0
+    generator = openal.Player()
+    results = {
+        "tile": measure(
+            lambda i: m.spawn_platform(
+                i % side, i % side, i // side, i // side, 0, 0, "grass"
+            ),
+            count,
+        ),
+        "entity": measure(
+            lambda i: m.spawn_entity(f"entity{i}", i % side, i // side, 1), count
+        ),
+        "sound": measure(lambda i: audio.Sound(src, buffer, generator), count),
+    }
+    for name, size in results.items():
+        print(f"{name}: {size:.0f} bytes")
+    m.destroy()
+    src.destroy()
+
+
+if __name__ == "__main__":
+    main(*(int(i) for i in sys.argv[1:]))
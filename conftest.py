@@ -0,0 +1 @@
+# lets the tests import libs from the root of the repository.
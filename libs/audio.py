@@ -1,6 +1,9 @@
 import os
 import contextlib
-from collections import namedtuple
+import threading
+import time
+from collections import namedtuple, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 import weakref
 import pyogg
 import urllib3
@@ -11,6 +14,7 @@ from .consts import *
 from .movement import get_3d_distance
 from . import path_utils
 from . import options
+from . import audio_stream
 
 http = urllib3.PoolManager()
 listener = openal.Listener()
@@ -35,9 +39,6 @@ class Filter:
     hp = openal.highpass_filter
 
 
-buffers = {}
-
-
 position = (0, 0, 0)
 
 
@@ -51,28 +52,346 @@ def move(x, y, z):
                 i.mute_if_far()
 
 
+def decode(file):
+    """returns the decoded pyogg.VorbisFile of {file}, or None if it can't be read"""
+    try:
+        return pyogg.VorbisFile(file)
+    except Exception as e:
+        print(file, e)
+        return None
+
+
+def upload(file_buffer):
+    """copies decoded audio into a new OpenAL buffer. the buffer doesn't keep the decoded audio"""
+    buffer = openal.BufferSound()
+    buffer.channels = file_buffer.channels
+    buffer.bitrate = 16
+    buffer.length = file_buffer.buffer_length
+    buffer.samplerate = file_buffer.frequency
+    buffer.duration = (file_buffer.buffer_length / float(file_buffer.frequency)) / 2
+    buffer.load(file_buffer.buffer)
+    # the driver has its own copy now.
+    buffer.wavbuf = None
+    return buffer
+
+
+class CacheEntry:
+    __slots__ = ("buffer", "refs", "pins", "nbytes")
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.refs = 0
+        self.pins = 0
+        self.nbytes = buffer.length
+
+
+class BufferCache:
+    """the OpenAL buffers of every sound file played, uploaded once and shared by every Sound playing that file.
+    each buffer counts the sounds using it. once none do it is kept around in case the file is played again, and
+    buffers no sound uses are deleted least recently used first whenever the cache holds more than {max_bytes}
+    bytes of audio. buffers in use or pinned (see pin) are never deleted, so the cache can go over budget while
+    they're playing. decoded audio isn't kept once it is uploaded.
+    files that couldn't be read are remembered for {failure_ttl} seconds, then tried again.
+    files can be decoded ahead of time on {workers} background threads (see preload) and are uploaded on the main
+    thread by update, since OpenAL buffers are only made there. acquiring a file that is still being preloaded
+    waits for its decode instead of decoding it again.
+    Sound.destroy releases its buffer, so nothing else should delete a buffer from here.
+    params:
+    max_bytes (int, optional): how many bytes of audio the cache tries to stay under
+    failure_ttl (float, optional): how long a file that couldn't be read isn't tried again, in seconds
+    workers (int, optional): how many files can be preloaded at once
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, failure_ttl=30, workers=2):
+        self.max_bytes = max_bytes
+        self.failure_ttl = failure_ttl
+        self.workers = workers
+        # started on the first preload.
+        self.executor = None
+        # path -> the Future of a preload that hasn't been uploaded yet
+        self.loading = {}
+        self.nbytes = 0
+        # path -> CacheEntry
+        self.entries = {}
+        self.paths = {}
+        # the paths of the entries that can be deleted, least recently used first.
+        self.unused = OrderedDict()
+        # path -> when reading it failed
+        self.failures = {}
+        # only the main thread uploads or deletes buffers, the lock guards against sounds played from elsewhere.
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _failed(self, file):
+        """returns true if reading {file} failed less than failure_ttl seconds ago"""
+        failed = self.failures.get(file)
+        if failed is not None:
+            if time.monotonic() - failed < self.failure_ttl:
+                return True
+            del self.failures[file]
+        return False
+
+    def _add(self, file, buffer):
+        entry = self.entries[file] = CacheEntry(buffer)
+        self.paths[buffer] = file
+        self.nbytes += entry.nbytes
+        return entry
+
+    def _load(self, file):
+        entry = self.entries.get(file)
+        if entry is not None:
+            return entry
+        future = self.loading.pop(file, None)
+        if future is not None:
+            # being preloaded, wait for the decode rather than doing it again.
+            file_buffer = future.result()
+        elif self._failed(file):
+            return None
+        else:
+            file_buffer = decode(file)
+        if not file_buffer:
+            self.failures[file] = time.monotonic()
+            return None
+        return self._add(file, upload(file_buffer))
+
+    def preload(self, file):
+        """starts decoding {file} on a background thread, so the first time it plays doesn't stall the game. the
+        next update uploads it and caches the buffer like one no sound uses yet.
+        returns a concurrent.futures.Future, done once the file is decoded (at once if it is cached or can't be
+        read)"""
+        with self.lock:
+            future = self.loading.get(file)
+            if future is not None:
+                return future
+            if file in self.entries or self._failed(file):
+                future = Future()
+                future.set_result(None)
+                return future
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="audio_preload"
+                )
+            future = self.loading[file] = self.executor.submit(decode, file)
+            return future
+
+    def update(self):
+        """uploads the preloads that finished decoding. called once per frame by audio.loop"""
+        if not self.loading:
+            return
+        with self.lock:
+            for file in [i for i, future in self.loading.items() if future.done()]:
+                entry = self._load(file)
+                if entry is not None and entry.refs <= 0 and not entry.pins:
+                    self.unused[file] = None
+            self._evict()
+
+    def acquire(self, file):
+        """returns the buffer of {file}, uploading it if it isn't cached, or None if the file can't be read.
+        every acquire must be matched by a release"""
+        with self.lock:
+            entry = self._load(file)
+            if entry is None:
+                return None
+            entry.refs += 1
+            self.unused.pop(file, None)
+            self._evict()
+            return entry.buffer
+
+    def release(self, buffer):
+        """tells the cache a sound stopped using {buffer}"""
+        with self.lock:
+            file = self.paths.get(buffer)
+            if file is None:
+                return
+            entry = self.entries[file]
+            entry.refs -= 1
+            if entry.refs <= 0 and not entry.pins:
+                self.unused[file] = None
+                self._evict()
+
+    def pin(self, file):
+        """loads {file} and keeps it loaded until unpin, for sounds that play all the time (UI, footsteps).
+        pins are counted, the file stays pinned until every pin is matched by an unpin.
+        returns false if the file can't be read"""
+        with self.lock:
+            entry = self._load(file)
+            if entry is None:
+                return False
+            entry.pins += 1
+            self.unused.pop(file, None)
+            return True
+
+    def unpin(self, file):
+        with self.lock:
+            entry = self.entries.get(file)
+            if entry is not None and entry.pins:
+                entry.pins -= 1
+                if entry.refs <= 0 and not entry.pins:
+                    self.unused[file] = None
+                    self._evict()
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes and self.unused:
+            self._delete(self.unused.popitem(last=False)[0])
+
+    def _delete(self, file):
+        entry = self.entries.pop(file)
+        del self.paths[entry.buffer]
+        self.nbytes -= entry.nbytes
+        entry.buffer.delete()
+
+    def clear(self):
+        """deletes every buffer no sound uses and isn't pinned, and forgets the files that couldn't be read"""
+        with self.lock:
+            for file in list(self.unused):
+                self._delete(file)
+            self.unused.clear()
+            self.failures.clear()
+
+
+buffer_cache = BufferCache(
+    options.get("audio_cache_bytes", 64 * 1024 * 1024),
+    options.get("audio_failure_ttl", 30),
+    options.get("audio_preload_threads", 2),
+)
+
+
+class Priority(enum.IntEnum):
+    """how important a sound is when there are no free voices left, see VoicePool"""
+
+    AMBIENT = 0
+    NORMAL = 1
+    HIGH = 2
+    UI = 3
+
+
+class VoicePool:
+    """a fixed number of OpenAL sources (openal.Player objects), generated up front and reused by every sound.
+    playing a sound borrows a voice and destroying it gives the voice back, so no source is generated or deleted
+    while the game runs, and there are never more sounds playing than {size}.
+    when every voice is busy, the least audible voice of the lowest priority (no higher than the new sound's) is
+    stolen: its sound is destroyed and the voice goes to the new one. sounds muted for being far away count as
+    silent, then quieter and more distant sounds go first. if every voice plays something more important the new
+    sound doesn't play.
+    params:
+    size (int, optional): the most sounds that can play at once
+    """
+
+    def __init__(self, size=64):
+        self.free = [openal.Player() for _ in range(size)]
+        self.size = size
+        # voice -> the Sound playing on it
+        self.sounds = {}
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        """the number of busy voices"""
+        return self.size - len(self.free)
+
+    @staticmethod
+    def audibility(sound):
+        src = sound.src
+        if src.muted:
+            return 0
+        distance = 0
+        if not src.direct:
+            distance = get_3d_distance(
+                *position, src.x + sound.rel_x, src.y + sound.rel_y, src.z + sound.rel_z
+            )
+        return sound.volume / (1 + distance)
+
+    def acquire(self, priority=Priority.NORMAL):
+        """returns a voice for a sound of {priority}, stealing one if needed, or None if none can be had"""
+        with self.lock:
+            if not self.free:
+                victim = min(
+                    (
+                        i
+                        for i in self.sounds.values()
+                        if i.priority <= priority and not i.destroied
+                    ),
+                    key=lambda i: (i.priority, self.audibility(i)),
+                    default=None,
+                )
+                if victim is None:
+                    return None
+                victim.destroy()
+            return self.free.pop() if self.free else None
+
+    def attach(self, voice, sound):
+        """tells the pool which sound plays on {voice}, so it can be stolen"""
+        with self.lock:
+            self.sounds[voice] = sound
+
+    def release(self, voice):
+        """stops {voice}, resets it and gives it back to the pool"""
+        with self.lock:
+            if self.sounds.pop(voice, None) is None and voice in self.free:
+                return
+            self._reset(voice)
+            self.free.append(voice)
+
+    @staticmethod
+    def _reset(voice):
+        voice.stop()
+        voice.loop = False
+        for _ in range(len(voice.queue)):
+            voice.remove()
+        for i in voice._effect.copy():
+            voice.del_effect(i)
+        for i in voice._filter.copy():
+            voice.del_filter(i)
+        voice.volume = 1.0
+        voice.pitch = 1.0
+        voice.rolloff = 0
+        voice.source_relative = False
+        voice.position = (0, 0, 0)
+
+    def destroy(self):
+        with self.lock:
+            for sound in list(self.sounds.values()):
+                sound.destroy()
+            for voice in self.free:
+                voice.delete()
+            self.free.clear()
+
+
+voice_pool = VoicePool(options.get("audio_voices", 64))
+streamer = audio_stream.Streamer()
+
+
+def _sound_files(path):
+    """the files play_sound may pick for {path}, every file of a folder of variants"""
+    path = SOUNDPREPEND + path
+    if os.path.isdir(path):
+        return [f"{path}/{i}" for i in os.listdir(path)]
+    return [path]
+
+
+def pin(path):
+    """keeps the sound(s) play_sound would play for {path} loaded, see BufferCache.pin"""
+    for i in _sound_files(path):
+        buffer_cache.pin(i)
+
+
+def unpin(path):
+    for i in _sound_files(path):
+        buffer_cache.unpin(i)
+
+
+def preload(paths):
+    """starts loading the sound(s) play_sound would play for each of {paths} in the background, see
+    BufferCache.preload. returns a list of futures, one for every file"""
+    if isinstance(paths, str):
+        paths = (paths,)
+    return [buffer_cache.preload(i) for path in paths for i in _sound_files(path)]
+
+
 def get_buffer(file):
-    global buffers
-    file_buffer = None
-    if file in buffers:
-        file_buffer = buffers[file]
-    else:
-        try:
-            file_buffer = pyogg.VorbisFile(file)
-            buffers[file] = file_buffer
-        except Exception as e:
-            print(file, e)
-            file_buffer = None
-            buffers[file] = file_buffer
-    if file_buffer:
-        buffer = openal.BufferSound()
-        buffer.channels = file_buffer.channels
-        buffer.bitrate = 16
-        buffer.length = file_buffer.buffer_length
-        buffer.samplerate = file_buffer.frequency
-        buffer.duration = (file_buffer.buffer_length / float(file_buffer.frequency)) / 2
-        buffer.load(file_buffer.buffer)
-        return buffer
+    """returns the shared OpenAL buffer of {file}, see BufferCache.acquire"""
+    return buffer_cache.acquire(file)
 
 
 def deg2rad(angle):
@@ -114,10 +433,33 @@ def turn(hdirection, vdirection, bdirection):
 
 
 class Sound:
+    __slots__ = (
+        "destroied",
+        "src",
+        "buffer",
+        "generator",
+        "stream",
+        "rel_x",
+        "rel_y",
+        "rel_z",
+        "length",
+        "volume",
+        "priority",
+    )
+
     def __init__(
-        self, src, buffer, generator, stream: bool = False, rel_x=0, rel_y=0, rel_z=0
+        self,
+        src,
+        buffer,
+        generator,
+        stream: bool = False,
+        rel_x=0,
+        rel_y=0,
+        rel_z=0,
+        priority=Priority.NORMAL,
     ):
         self.destroied = False
+        self.priority = priority
         self.src = src
         self.buffer = buffer
         self.generator = generator
@@ -126,37 +468,83 @@ class Sound:
         self.rel_y = rel_y
         self.rel_z = rel_z
         self.length = buffer.duration
-        self.position = property(self.get_position, self.set_position)
-        self.pause = self.generator.pause
-        self.play = self.generator.play
         self.volume = 100
 
+    # once a sound is destroyed (or stolen, see VoicePool) its voice may be playing another sound,
+    # so these do nothing.
+
+    def play(self):
+        if self.destroied:
+            return
+        # a streamed sound's buffer is its audio_stream.Stream, which does the playing.
+        if self.stream:
+            self.buffer.play()
+        else:
+            self.generator.play()
+
+    def pause(self):
+        if self.destroied:
+            return
+        if self.stream:
+            self.buffer.pause()
+        else:
+            self.generator.pause()
+
     def fade(self, *args, **kwargs):
         pass
 
     def get_position(self):
+        if self.destroied:
+            return 0
+        if self.stream:
+            return self.buffer.tell() * 100
         return (self.generator.seek) * 100
 
     def set_position(self, position):
-        self.generator.seek = (position) / 100
+        if self.destroied:
+            return
+        if self.stream:
+            self.buffer.seek(position / 100)
+        else:
+            self.generator.seek = (position) / 100
+
+    def playing(self):
+        """false once the sound played to its end or was destroyed"""
+        if self.destroied:
+            return False
+        if self.stream:
+            return not self.buffer.finished
+        return self.generator.playing()
+
+    position = property(get_position, set_position)
 
     def get_volume(self):
+        if self.destroied:
+            return 0
         return self.generator.volume * 100
 
     def set_volume(self, v):
+        if self.destroied:
+            return
         self.generator.volume = v / 100
 
     def destroy(self):
         if not self.destroied:
             self.destroied = True
-            self.generator.delete()
-            self.buffer.delete()
+            if self.stream:
+                streamer.remove(self.buffer)
+                self.buffer.close()
+                voice_pool.release(self.generator)
+            else:
+                voice_pool.release(self.generator)
+                buffer_cache.release(self.buffer)
         self.src.sounds.discard(self)
 
 
 class Src:
     def __init__(self, accept_effects=True, direct=False):
         self.muted = False
+        self.paused = False
         self.sounds = set()
         self.x, self.y, self.z = 0, 0, 0
         self.direct = direct
@@ -182,7 +570,10 @@ class Src:
         rel_x=0,
         rel_y=0,
         rel_z=0,
+        priority=None,
     ):
+        """plays {path} from this source. {priority} (a Priority) decides which sounds give way when every voice
+        is busy, it defaults to UI for direct sources and NORMAL for the others"""
         if path.startswith("server:"):
             sound_name = path.split(":")[1]
             sound_path = f"server_sounds/{sound_name}"
@@ -194,17 +585,34 @@ class Src:
                     f"{SERVER_SOUNDS_URL}{sound_name}", f"{SOUNDPREPEND}/{sound_path}"
                 )
             return self.play_sound(
-                sound_path, looping, volume, stream, id, rel_x, rel_y, rel_z
+                sound_path, looping, volume, stream, id, rel_x, rel_y, rel_z, priority
             )
         path = SOUNDPREPEND + path
         path = path_utils.random_item(path)
-        buffer = get_buffer(path)
-        if buffer is None:
-            return
-        generator = openal.Player()
-        generator.add(buffer)
-        if looping:
-            generator.loop = True
+        if priority is None:
+            priority = Priority.UI if self.direct else Priority.NORMAL
+        if stream:
+            # long files (music, ambience) are decoded bit by bit on the streamer thread instead of all at once.
+            generator = voice_pool.acquire(priority)
+            if generator is None:
+                return
+            try:
+                buffer = audio_stream.Stream(path, generator, looping)
+            except Exception as e:
+                print(path, e)
+                voice_pool.release(generator)
+                return
+        else:
+            buffer = get_buffer(path)
+            if buffer is None:
+                return
+            generator = voice_pool.acquire(priority)
+            if generator is None:
+                buffer_cache.release(buffer)
+                return
+            generator.add(buffer)
+            if looping:
+                generator.loop = True
         generator.volume = volume / 100
         if not self.direct:
             generator.rolloff = rolloff
@@ -216,14 +624,17 @@ class Src:
             generator.add_filter(self.filter)
         if self.reverb:
             generator.add_effect(self.reverb)
-        snd = Sound(self, buffer, generator, False, rel_x, rel_y, rel_z)
+        snd = Sound(self, buffer, generator, stream, rel_x, rel_y, rel_z, priority)
+        voice_pool.attach(generator, snd)
         if id:
             if id in self.ids:
                 self.ids[id].destroy()
             self.ids[id] = snd
         self.sounds.add(snd)
         self.mute_if_far()
-        generator.play()
+        snd.play()
+        if stream:
+            streamer.add(buffer)
         snd.volume = volume
         return snd
 
@@ -249,10 +660,17 @@ class Src:
             self.reverb = _reverb
 
     def pause(self, value):
+        """pauses or resumes every sound of this source. loop leaves the sounds of a paused source alone.
+        sounds that already finished are destroyed, not replayed from the start"""
+        if value == self.paused:
+            return
+        self.paused = value
         for i in self.sounds.copy():
             if i.destroied:
                 return
-            if value:
+            if value and not i.playing():
+                i.destroy()
+            elif value:
                 i.pause()
             else:
                 i.play()
@@ -349,7 +767,11 @@ def set_global_reverb(reverb, destroy_current=True):
 
 
 def loop():
+    buffer_cache.update()
     for source in sources.copy():
+        # paused sounds aren't playing, but they aren't finished either.
+        if source.paused:
+            continue
         for snd in source.sounds.copy():
-            if not snd.generator.playing():
+            if not snd.playing():
                 snd.destroy()
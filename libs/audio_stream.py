@@ -0,0 +1,198 @@
+import ctypes
+import threading
+import time
+from collections import deque
+
+import pyogg
+
+from . import openal
+
+al = openal.al
+
+
+class Stream:
+    """plays an ogg file on a voice without decoding all of it, for music and ambience.
+    the file is decoded {buffer_size} bytes per channel at a time into a ring of {buffers} OpenAL buffers that are
+    queued on the voice and refilled as they finish playing. the decoding happens on the Streamer thread, so
+    starting a stream only reads the file's headers. looping goes back to the start of the file while the last
+    buffers are still playing, so there is no gap.
+    it takes the place of the buffer of a Sound (see Sound.stream), so it has a duration like a buffer has.
+    params:
+    path (str): the ogg file
+    voice (openal.Player): the source to play on
+    loop (bool, optional): whether to start over at the end
+    buffer_size (int, optional): how many bytes per channel are decoded into each buffer
+    buffers (int, optional): how many buffers are queued ahead
+    """
+
+    def __init__(self, path, voice, loop=False, buffer_size=32768, buffers=4):
+        self.path = path
+        self.voice = voice
+        self.loop = loop
+        self.buffer_size = buffer_size
+        self.lock = threading.RLock()
+        self.decoder = pyogg.VorbisFileStream(path, buffer_size)
+        self.channels = self.decoder.channels
+        self.frequency = self.decoder.frequency
+        self.total = pyogg.vorbis.ov_pcm_total(ctypes.byref(self.decoder.vf), -1)
+        self.duration = self.total / self.frequency if self.frequency else 0
+        self.length = self.total * self.channels * 2
+        self.free = [self._new_buffer() for _ in range(buffers)]
+        # the buffers queued on the voice, oldest first, with the sample they start at.
+        self.queued = deque()
+        self.next_sample = 0
+        self.ended = False
+        self.finished = False
+        self.wants_play = False
+        self._state = al.ALint(0)
+
+    def _new_buffer(self):
+        buffer = openal.BufferSound()
+        buffer.channels = self.channels
+        buffer.bitrate = 16
+        buffer.samplerate = self.frequency
+        return buffer
+
+    def _decode(self):
+        """returns the next chunk of PCM, starting over at the end of the file when looping, or None at the end"""
+        chunk = self.decoder.get_buffer()
+        if chunk is None and self.loop and self.total:
+            # get_buffer closes the file at the end, open it again.
+            self.decoder = pyogg.VorbisFileStream(self.path, self.buffer_size)
+            self.next_sample = 0
+            chunk = self.decoder.get_buffer()
+        if chunk is None:
+            self.decoder = None
+            return None
+        data, length = chunk
+        return ctypes.string_at(ctypes.cast(data, ctypes.c_void_p), length)
+
+    def _fill(self):
+        while self.free and not self.ended:
+            data = self._decode()
+            if data is None:
+                self.ended = True
+                break
+            buffer = self.free.pop()
+            buffer.length = len(data)
+            buffer.load(data)
+            buffer.wavbuf = None
+            al.alSourceQueueBuffers(self.voice.source, 1, buffer.buf)
+            self.queued.append((buffer, self.next_sample))
+            self.next_sample += len(data) // (2 * self.channels)
+
+    def _unqueue_processed(self):
+        processed = al.ALint(0)
+        al.alGetSourcei(self.voice.source, al.AL_BUFFERS_PROCESSED, processed)
+        for _ in range(processed.value):
+            name = al.ALuint(0)
+            al.alSourceUnqueueBuffers(self.voice.source, 1, name)
+            buffer, _ = self.queued.popleft()
+            self.free.append(buffer)
+
+    def _source_state(self):
+        al.alGetSourcei(self.voice.source, al.AL_SOURCE_STATE, self._state)
+        return self._state.value
+
+    def service(self):
+        """called by the Streamer thread. refills finished buffers and restarts the voice if it ran dry"""
+        with self.lock:
+            if self.finished:
+                return
+            self._unqueue_processed()
+            self._fill()
+            state = self._source_state()
+            if state in (al.AL_STOPPED, al.AL_INITIAL) and self.wants_play:
+                if self.queued:
+                    al.alSourcePlay(self.voice.source)
+                elif self.ended:
+                    self.finished = True
+
+    def play(self):
+        with self.lock:
+            self.wants_play = True
+            if self.queued:
+                al.alSourcePlay(self.voice.source)
+
+    def pause(self):
+        with self.lock:
+            self.wants_play = False
+            al.alSourcePause(self.voice.source)
+
+    def tell(self):
+        """returns how far into the file the voice is, from 0 to 1"""
+        with self.lock:
+            if not self.queued or not self.total:
+                return 0
+            offset = al.ALint(0)
+            al.alGetSourcei(self.voice.source, al.AL_SAMPLE_OFFSET, offset)
+            return ((self.queued[0][1] + offset.value) % self.total) / self.total
+
+    def seek(self, position):
+        """jumps to {position} (from 0 to 1) of the file"""
+        with self.lock:
+            state = self._source_state()
+            al.alSourceStop(self.voice.source)
+            self._detach()
+            sample = int(self.total * min(max(position, 0), 1))
+            if self.decoder is None:
+                self.decoder = pyogg.VorbisFileStream(self.path, self.buffer_size)
+            pyogg.vorbis.ov_pcm_seek(ctypes.byref(self.decoder.vf), sample)
+            self.next_sample = sample
+            self.ended = False
+            self.finished = False
+            self._fill()
+            if state == al.AL_PLAYING:
+                al.alSourcePlay(self.voice.source)
+
+    def _detach(self):
+        # a stopped source has processed every buffer.
+        self._unqueue_processed()
+        al.alSourcei(self.voice.source, al.AL_BUFFER, 0)
+        for buffer, _ in self.queued:
+            self.free.append(buffer)
+        self.queued.clear()
+
+    def close(self):
+        """stops the voice, takes the buffers off it and deletes them. the voice itself is left to its owner"""
+        with self.lock:
+            self.finished = True
+            al.alSourceStop(self.voice.source)
+            self._detach()
+            for buffer in self.free:
+                buffer.delete()
+            self.free.clear()
+            self.decoder = None
+
+
+class Streamer:
+    """the background thread keeping every playing Stream fed, checking them every {interval} seconds"""
+
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.streams = set()
+        self.lock = threading.Lock()
+        self._thread = None
+
+    def add(self, stream):
+        with self.lock:
+            self.streams.add(stream)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def remove(self, stream):
+        with self.lock:
+            self.streams.discard(stream)
+
+    def _run(self):
+        while True:
+            with self.lock:
+                streams = list(self.streams)
+            for stream in streams:
+                try:
+                    stream.service()
+                except Exception as e:
+                    print(stream.path, e)
+                    self.remove(stream)
+            time.sleep(self.interval)
@@ -106,6 +106,8 @@ class buffer:
 
 
 class buffer_item:
+    __slots__ = ("text", "time", "urls")
+
     def __init__(self, text):
         self.text = text
         self.time = datetime.datetime.now()
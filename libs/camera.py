@@ -9,6 +9,8 @@ class Camera:
         self.src = audio.Src(False)
         self.focus_object = None
         self.currentzone = ""
+        # a regions.RegionTracker following the camera, if any.
+        self.regions = None
         self.x = 0.0
         self.y = 0.0
         self.z = 0.0
@@ -31,6 +33,8 @@ class Camera:
         self.z = z
         audio.move(self.x, self.y, self.z)
         self.src.move(self.x, self.y, self.z)
+        if self.regions:
+            self.regions.update(self.x, self.y, self.z)
 
     def turn(self, hdeg, vdeg, bdeg=0):
         audio.turn(hdeg, vdeg, bdeg)
@@ -1,17 +1,101 @@
-class Clock:
-    def __init__(self):
-        self.elapsed = 0
+class TimeDomain:
+    """a source of game time that clocks measure against.
+    domains form a tree: the root domain is advanced once per frame by the game, and every other domain
+    derives its time from its parent, scaled by {scale}. nothing is pushed down the tree, a domain only
+    remembers where it was the last time it was paused or rescaled, so pausing or slowing down a whole
+    state or map (and every clock in it) costs O(1).
+    params:
+    parent (TimeDomain, optional): the domain this one follows. None makes a root domain.
+    scale (float, optional): how fast this domain runs relative to its parent (or to what it is advanced by,
+    for a root domain). 0.5 is half speed.
+    """
+
+    def __init__(self, parent=None, scale=1.0):
+        self.parent = parent
+        self._scale = scale
         self.paused = False
+        # the root domain's raw time, only used when there is no parent.
+        self._raw = 0
+        # our own time and our source's time at the last rebase.
+        self._base = 0
+        self._origin = self._source()
 
-    def update(self, delta):
-        if not self.paused:
-            self.elapsed += delta
+    def _source(self):
+        return self.parent.time if self.parent else self._raw
+
+    def _rebase(self):
+        self._base = self.time
+        self._origin = self._source()
+
+    @property
+    def time(self):
+        """the current time of this domain in ms"""
+        if self.paused:
+            return self._base
+        return self._base + (self._source() - self._origin) * self._scale
+
+    @property
+    def scale(self):
+        return self._scale
+
+    @scale.setter
+    def scale(self, value):
+        self._rebase()
+        self._scale = value
+
+    def advance(self, delta):
+        """moves a root domain forward by {delta}ms"""
+        if self.parent:
+            raise ValueError("only root domains can be advanced")
+        self._raw += delta
 
     def pause(self):
-        self.paused = True
+        if not self.paused:
+            self._rebase()
+            self.paused = True
 
     def resume(self):
+        if self.paused:
+            self._origin = self._source()
+            self.paused = False
+
+
+class Clock:
+    """measures time elapsed in a TimeDomain.
+    the clock only stores when it was started, elapsed is worked out when it is read.
+    """
+
+    __slots__ = ("domain", "paused", "_start", "_paused_elapsed")
+
+    def __init__(self, domain):
+        self.domain = domain
         self.paused = False
+        self._start = domain.time
+        self._paused_elapsed = 0
+
+    @property
+    def elapsed(self):
+        if self.paused:
+            return self._paused_elapsed
+        return self.domain.time - self._start
+
+    @elapsed.setter
+    def elapsed(self, value):
+        if self.paused:
+            self._paused_elapsed = value
+        else:
+            self._start = self.domain.time - value
+
+    def pause(self):
+        if not self.paused:
+            self._paused_elapsed = self.elapsed
+            self.paused = True
+
+    def resume(self):
+        if self.paused:
+            self._start = self.domain.time - self._paused_elapsed
+            self.paused = False
 
     def restart(self):
-        self.elapsed = 0
+        self._start = self.domain.time
+        self._paused_elapsed = 0
@@ -0,0 +1,161 @@
+from math import floor
+
+from . import navigation
+
+
+class MoveResult:
+    """where a sweep ended.
+    x, y, z: the final position
+    moved: true if the position changed
+    blocked: true if something stopped part of the motion
+    contacts: a list of (tiletype, (x, y, z)) for every blocking cell the motion ran into, in order
+    """
+
+    __slots__ = ("x", "y", "z", "moved", "blocked", "contacts")
+
+    def __init__(self, x, y, z, moved, blocked, contacts):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.moved = moved
+        self.blocked = blocked
+        self.contacts = contacts
+
+    @property
+    def position(self):
+        return (self.x, self.y, self.z)
+
+
+def _standable(tiletype, blocking):
+    return not blocking(tiletype) and not navigation.is_open(tiletype)
+
+
+def sweep(
+    map,
+    x,
+    y,
+    z,
+    dx,
+    dy,
+    step_height=1,
+    slide=True,
+    blocking=navigation.is_blocked,
+    precision=3,
+):
+    """moves a point from (x, y, z) by (dx, dy) through the tiles of {map}, looking at each cell it crosses once.
+    the motion can be any length, including fractions of a cell.
+    running into a blocking cell stops the motion along the axis it was crossing. with {slide} the rest of the
+    motion carries on along the other axis, otherwise it stops there. a blocking cell with a floor on top of it at most
+    {step_height} cells up is stepped up onto instead, and walking off a ledge onto a floor at most {step_height}
+    cells down steps down onto it (anything deeper is left open, so the entity falls like before).
+    the edge of the map blocks like a wall but isn't a contact. corners can't be cut past a blocking cell.
+    params:
+    map (world_map.Map): the map to move on
+    x, y, z (float): where the motion starts
+    dx, dy (float): the motion
+    step_height (int, optional): the highest ledge that is stepped up or down instead of blocking or falling
+    slide (bool, optional): whether to keep moving along a wall after running into it
+    blocking (callable, optional): takes a tiletype and returns true if it stops the motion
+    precision (int, optional): the final coordinates are rounded to this many decimals, so repeated moves don't drift
+    returns:
+    a MoveResult
+    """
+    start = (x, y, z)
+    pos = [x, y]
+    remaining = [dx, dy]
+    cell = [floor(x), floor(y)]
+    z = int(z)
+    contacts = []
+    blocked = False
+
+    def enter(cx, cy):
+        """returns the z an entity walking into (cx, cy) ends up at, or None and the tile that stopped it"""
+        if not map.in_bound(cx, cy, z):
+            return None, None
+        tile = map.get_tile_at(cx, cy, z)
+        if blocking(tile):
+            for up in range(1, step_height + 1):
+                if not map.in_bound(cx, cy, z + up):
+                    break
+                above = map.get_tile_at(cx, cy, z + up)
+                if blocking(above):
+                    continue
+                if _standable(above, blocking):
+                    return z + up, None
+                break
+            return None, tile
+        if navigation.is_open(tile):
+            for down in range(1, step_height + 1):
+                if not map.in_bound(cx, cy, z - down):
+                    break
+                below = map.get_tile_at(cx, cy, z - down)
+                if blocking(below):
+                    break
+                if _standable(below, blocking):
+                    return z - down, None
+        return z, None
+
+    while remaining[0] or remaining[1]:
+        # how far along the remaining motion (0 to 1) the next cell boundary on each axis is.
+        t = [float("inf"), float("inf")]
+        for axis in (0, 1):
+            if remaining[axis] > 0:
+                t[axis] = (cell[axis] + 1 - pos[axis]) / remaining[axis]
+            elif remaining[axis] < 0:
+                t[axis] = (cell[axis] - pos[axis]) / remaining[axis]
+        first = min(t)
+        if first >= 1:
+            # the motion ends in this cell unless it ends exactly on the far edge of it, which
+            # belongs to the next cell, so that cell still has to be entered.
+            end = [pos[0] + remaining[0], pos[1] + remaining[1]]
+            crossing = [axis for axis in (0, 1) if floor(end[axis]) != cell[axis]]
+            if not crossing:
+                pos = end
+                break
+            first = 1
+        else:
+            crossing = [axis for axis in (0, 1) if t[axis] == first]
+        steps = [1 if remaining[axis] > 0 else -1 for axis in (0, 1)]
+        pos[0] += remaining[0] * first
+        pos[1] += remaining[1] * first
+        remaining[0] -= remaining[0] * first
+        remaining[1] -= remaining[1] * first
+        stopped = []
+        if len(crossing) == 2:
+            # exactly through a corner, both sides have to be open before the diagonal cell is looked at.
+            for axis in crossing:
+                side = list(cell)
+                side[axis] += steps[axis]
+                side_z, tile = enter(*side)
+                if side_z is None:
+                    stopped.append(axis)
+                    if tile is not None:
+                        contacts.append((tile, (*side, z)))
+        if not stopped:
+            target = list(cell)
+            for axis in crossing:
+                target[axis] += steps[axis]
+            new_z, tile = enter(*target)
+            if new_z is not None:
+                cell = target
+                z = new_z
+                continue
+            stopped = crossing
+            if tile is not None:
+                contacts.append((tile, (*target, z)))
+        blocked = True
+        for axis in stopped:
+            remaining[axis] = 0
+            # stay just inside the current cell.
+            if steps[axis] > 0:
+                pos[axis] -= 10**-precision
+        if not slide:
+            break
+    # rounding mustn't carry the position over the edge of the cell it was checked in.
+    edge = 1 - 10**-precision
+    result = (
+        min(round(pos[0], precision), cell[0] + edge),
+        min(round(pos[1], precision), cell[1] + edge),
+        z,
+    )
+    return MoveResult(*result, result != start, blocked, contacts)
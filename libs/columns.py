@@ -0,0 +1,66 @@
+from bisect import bisect_right
+from math import floor
+
+import numpy as np
+
+from . import navigation
+
+
+class ColumnIndex:
+    """the z of every solid (not air) tile in each (x, y) column of a map, for finding where a fall lands.
+    a column is read once, from the raster if the map is baked and with get_tile_at otherwise, the first time
+    something falls through it. after that a landing is a binary search over the column's few solid cells.
+    columns are dropped when tiles inside them change (doors, dynamic tiles) and read again when next needed.
+    params:
+    map (world_map.Map): the map to index
+    """
+
+    def __init__(self, map):
+        self.map = map
+        self._columns = {}
+        map.add_tile_listener(self.invalidate)
+
+    def destroy(self):
+        self.map.remove_tile_listener(self.invalidate)
+        self._columns.clear()
+
+    def _read(self, x, y):
+        m = self.map
+        if m.raster and m.raster.contains(x, y, m.minz):
+            raster = m.raster
+            solid = np.array([not navigation.is_open(i) for i in raster.palette])
+            return (
+                np.flatnonzero(solid[raster.column(x, y)]) + raster.origin[2]
+            ).tolist()
+        return [
+            z
+            for z in range(m.minz, m.maxz + 1)
+            if not navigation.is_open(m.get_tile_at(x, y, z))
+        ]
+
+    def column(self, x, y):
+        """returns the sorted list of solid z's at (x, y)"""
+        key = (floor(x), floor(y))
+        solid = self._columns.get(key)
+        if solid is None:
+            solid = self._columns[key] = self._read(*key)
+        return solid
+
+    def landing(self, x, y, z):
+        """returns the z of the first solid tile at or below (x, y, z), or None if there is nothing down there"""
+        solid = self.column(x, y)
+        index = bisect_right(solid, floor(z))
+        return solid[index - 1] if index else None
+
+    def invalidate(self, minx, maxx, miny, maxy, minz, maxz):
+        if (maxx - minx + 1) * (maxy - miny + 1) > len(self._columns):
+            for key in [
+                i
+                for i in self._columns
+                if minx <= i[0] <= maxx and miny <= i[1] <= maxy
+            ]:
+                del self._columns[key]
+            return
+        for x in range(int(minx), int(maxx) + 1):
+            for y in range(int(miny), int(maxy) + 1):
+                self._columns.pop((x, y), None)
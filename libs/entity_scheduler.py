@@ -0,0 +1,103 @@
+from . import scheduler
+
+
+class EntityScheduler:
+    """decides which entities of a map get their loop called, and how often.
+    entities are asleep until something wakes them (they start falling, get hit, a tile near them changes, or a
+    timer set with wake_after fires). an awake entity is ticked every {entity.tick_interval}ms for as long as it isn't
+    idle (see Object.idle), then goes back to sleep. entities far from the focus object are ticked less often, by up
+    to {max_interval}ms between ticks.
+    ticks are timers on a Scheduler running on the map's time domain, so an update only costs as much as the
+    entities that are due, however many are asleep.
+    params:
+    map (world_map.Map): the map whose entities are ticked
+    lod_distance (int, optional): every {lod_distance} units between an entity and the focus object add {lod_step}ms between its ticks
+    lod_step (int, optional): see lod_distance
+    max_interval (int, optional): the longest time between two ticks of an awake entity, however far it is
+    """
+
+    def __init__(self, map, lod_distance=32, lod_step=50, max_interval=400):
+        self.map = map
+        self.lod_distance = lod_distance
+        self.lod_step = lod_step
+        self.max_interval = max_interval
+        # the object distances are measured from, usually the player. None ticks everything at full rate.
+        self.focus = None
+        self.entities = set()
+        self.timers = {}
+        self.scheduler = scheduler.Scheduler(map.time_domain.time)
+
+    def __len__(self):
+        """the number of awake entities"""
+        return len(self.timers)
+
+    def add(self, entity):
+        """starts scheduling {entity}. it is woken once so it can settle where it was spawned"""
+        self.entities.add(entity)
+        self.wake(entity)
+
+    def remove(self, entity):
+        self.sleep(entity)
+        self.entities.discard(entity)
+
+    def clear(self):
+        self.scheduler.clear()
+        self.timers.clear()
+        self.entities.clear()
+
+    def interval_for(self, entity):
+        """returns how many ms {entity} waits between ticks, given its distance to the focus object"""
+        interval = entity.tick_interval
+        if self.focus is None or self.focus is entity:
+            return interval
+        distance = max(
+            abs(entity.x - self.focus.x),
+            abs(entity.y - self.focus.y),
+            abs(entity.z - self.focus.z),
+        )
+        band = int(distance // self.lod_distance)
+        if not band:
+            return interval
+        return max(interval, min(band * self.lod_step, self.max_interval))
+
+    def wake(self, entity):
+        """ticks {entity} on the next update, and keeps ticking it until it is idle.
+        does nothing if it is already awake, inactive or not scheduled here"""
+        if entity in self.timers or entity not in self.entities or not entity.active:
+            return
+        self.timers[entity] = self.scheduler.call_after(0, lambda: self._tick(entity))
+        entity.on_wake()
+
+    def wake_after(self, entity, time):
+        """wakes {entity} after {time}ms. returns the Timer"""
+        return self.scheduler.call_after(time, lambda: self.wake(entity))
+
+    def wake_in_box(self, minx, maxx, miny, maxy, minz, maxz):
+        """wakes the entities in and right next to a box. used as a tile listener, so tiles changing under or
+        next to an entity (like a door opening) let it react"""
+        if not self.entities:
+            # the map is still being built.
+            return
+        for i in self.map.get_entities_in_box(
+            minx - 1, maxx + 1, miny - 1, maxy + 1, minz - 1, maxz + 1
+        ):
+            self.wake(i)
+
+    def sleep(self, entity):
+        """stops ticking {entity} until it is woken again"""
+        timer = self.timers.pop(entity, None)
+        if timer:
+            timer.cancel()
+
+    def _tick(self, entity):
+        del self.timers[entity]
+        entity.loop()
+        if entity.idle or not entity.active or entity not in self.entities:
+            return
+        self.timers[entity] = self.scheduler.call_after(
+            self.interval_for(entity), lambda: self._tick(entity)
+        )
+
+    def update(self):
+        """ticks the entities that are due. called once per frame by Map.loop"""
+        self.scheduler.update(self.map.time_domain.time)
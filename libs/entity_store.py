@@ -0,0 +1,226 @@
+import numpy as np
+
+from . import navigation
+
+
+class Field:
+    """an attribute of an object that lives in its EntityStore's arrays when it has one.
+    objects without a store keep the value in the slot named after the field with a leading underscore,
+    so classes using fields must declare those slots."""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.slot = "_" + name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        store = instance.store
+        if store is None:
+            return getattr(instance, self.slot)
+        return store.arrays[self.name][instance.id].item()
+
+    def __set__(self, instance, value):
+        store = instance.store
+        if store is None:
+            setattr(instance, self.slot, value)
+        else:
+            store.arrays[self.name][instance.id] = value
+
+
+class EntityStore:
+    """keeps the position, facing, hp and fall state of many entities in NumPy arrays indexed by entity id.
+    entities created with a store are views onto one row of the arrays (see Field), and the systems below update
+    every entity of the store in a few array operations per frame instead of one Python call per entity.
+    Python code only runs for the entities a system changed (moving their sound source, landing sounds).
+    params:
+    map (world_map.Map): the map the entities are on
+    capacity (int, optional): how many entities fit before the arrays have to grow
+    """
+
+    fields = {
+        "x": np.float64,
+        "y": np.float64,
+        "z": np.float64,
+        "hfacing": np.float64,
+        "vfacing": np.float64,
+        "bfacing": np.float64,
+        "hp": np.float64,
+        "falling": np.bool_,
+        "fall_time": np.float64,
+        "fall_elapsed": np.float64,
+        "fall_distance": np.int64,
+    }
+
+    def __init__(self, map, capacity=1024):
+        self.map = map
+        self.arrays = {
+            name: np.zeros(capacity, dtype=dtype) for name, dtype in self.fields.items()
+        }
+        # alive[id] is false for free rows, entities[id] is the entity using a row.
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.entities = [None] * capacity
+        self._free = list(range(capacity - 1, -1, -1))
+        self.last_update = map.time_domain.time
+        self.rng = np.random.default_rng()
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+    def __getattr__(self, name):
+        # store.x, store.falling, ... are the arrays themselves.
+        try:
+            return self.__dict__["arrays"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    @property
+    def capacity(self):
+        return len(self.alive)
+
+    def _grow(self):
+        old = self.capacity
+        new = old * 2
+        for name, array in self.arrays.items():
+            grown = np.zeros(new, dtype=array.dtype)
+            grown[:old] = array
+            self.arrays[name] = grown
+        alive = np.zeros(new, dtype=bool)
+        alive[:old] = self.alive
+        self.alive = alive
+        self.entities.extend([None] * old)
+        self._free.extend(range(new - 1, old - 1, -1))
+
+    def allocate(self, entity):
+        """returns a free row for {entity}"""
+        if not self._free:
+            self._grow()
+        id = self._free.pop()
+        for array in self.arrays.values():
+            array[id] = 0
+        self.alive[id] = True
+        self.entities[id] = entity
+        return id
+
+    def free(self, id):
+        if self.alive[id]:
+            self.alive[id] = False
+            self.entities[id] = None
+            self._free.append(id)
+
+    def ids(self):
+        """returns the ids of every entity in the store"""
+        return np.flatnonzero(self.alive)
+
+    def positions(self, ids=None):
+        """returns an (n, 3) array of the positions of {ids}, or of every entity"""
+        if ids is None:
+            ids = self.ids()
+        return np.stack((self.x[ids], self.y[ids], self.z[ids]), axis=1)
+
+    def distances(self, x, y, z, ids=None):
+        """returns (ids, distances) from (x, y, z), usually the listener, to {ids} or every entity"""
+        if ids is None:
+            ids = self.ids()
+        return ids, np.sqrt(
+            (self.x[ids] - x) ** 2 + (self.y[ids] - y) ** 2 + (self.z[ids] - z) ** 2
+        )
+
+    def within(self, x, y, z, radius):
+        """returns the ids of the entities within {radius} of (x, y, z)"""
+        ids, distances = self.distances(x, y, z)
+        return ids[distances <= radius]
+
+    def face_towards(self, ids, x, y):
+        """turns {ids} to face (x, y) horizontally, like movement.move measures degrees (0 is north, 90 is east)"""
+        ids = np.asarray(ids, dtype=np.int64)
+        self.hfacing[ids] = (
+            np.degrees(np.arctan2(x - self.x[ids], y - self.y[ids])) % 360
+        )
+
+    def fall(self, delta):
+        """moves every falling entity down one cell per {fall_time}ms that passed, all at once.
+        the cells are looked up in the map's raster when it is baked, and in its ColumnIndex otherwise.
+        returns (moved, landed), the ids of the entities that fell and of those that landed
+        """
+        falling = np.flatnonzero(self.alive & self.falling)
+        if not len(falling):
+            return falling, falling
+        elapsed = self.fall_elapsed[falling] + delta
+        steps = (elapsed // self.fall_time[falling]).astype(np.int64)
+        self.fall_elapsed[falling] = elapsed - steps * self.fall_time[falling]
+        moved = falling[steps > 0]
+        steps = steps[steps > 0]
+        if self.map.raster:
+            landed = self._fall_through_raster(moved, steps)
+        else:
+            landed = self._fall_through_columns(moved, steps)
+        self.tumble(moved)
+        return moved, landed
+
+    def _fall_through_raster(self, ids, steps):
+        """drops {ids} by up to {steps} cells, one cell for all of them per pass. returns the ids that landed"""
+        raster = self.map.raster
+        open_ids = np.array([navigation.is_open(i) for i in raster.palette])
+        landed = []
+        origin = np.array(raster.origin)
+        shape = np.array(raster.shape)
+        remaining = steps
+        while len(ids):
+            self.z[ids] -= 1
+            self.fall_distance[ids] += 1
+            cells = np.floor(self.positions(ids)).astype(np.int64) - origin
+            inside = np.all((cells >= 0) & (cells < shape), axis=1)
+            tile_ids = np.zeros(len(ids), dtype=np.int64)
+            tile_ids[inside] = raster.ids[
+                cells[inside, 0], cells[inside, 1], cells[inside, 2]
+            ]
+            # landing on something, or falling off the bottom of the map, ends the fall.
+            stopped = ~inside | ~open_ids[tile_ids]
+            landed.append(ids[stopped])
+            remaining = remaining - 1
+            keep = ~stopped & (remaining > 0)
+            ids, remaining = ids[keep], remaining[keep]
+        return np.concatenate(landed) if landed else ids[:0]
+
+    def _fall_through_columns(self, ids, steps):
+        """like _fall_through_raster, for maps that aren't baked. each entity drops straight to where the map's
+        ColumnIndex says it lands, or by {steps} cells if that is sooner"""
+        m = self.map
+        landed = []
+        cells = np.floor(self.positions(ids)).astype(np.int64).tolist()
+        for id, (x, y, z), count in zip(ids.tolist(), cells, steps.tolist()):
+            if not (
+                m.minx <= x <= m.maxx
+                and m.miny <= y <= m.maxy
+                and m.minz < z <= m.maxz + 1
+            ):
+                # the first cell down is outside the map.
+                stop = 1
+            else:
+                below = m.columns.landing(x, y, z - 1)
+                stop = z - (m.minz - 1 if below is None else below)
+            drop = min(count, stop)
+            self.z[id] -= drop
+            self.fall_distance[id] += drop
+            if drop == stop:
+                landed.append(id)
+        return np.array(landed, dtype=np.int64)
+
+    def tumble(self, ids):
+        """gives {ids} a random facing, like entities get while falling"""
+        n = len(ids)
+        self.hfacing[ids] = self.rng.integers(-45, 46, n) % 360
+        self.vfacing[ids] = self.rng.integers(-45, 46, n)
+        self.bfacing[ids] = self.rng.integers(-45, 46, n)
+
+    def update(self):
+        """runs the systems for the time that passed since the last update. called once per frame by Map.loop"""
+        now = self.map.time_domain.time
+        delta = now - self.last_update
+        self.last_update = now
+        moved, landed = self.fall(delta)
+        for id in moved.tolist():
+            self.entities[id].moved()
+        for id in landed.tolist():
+            self.entities[id].fall_stop()
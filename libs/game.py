@@ -1,19 +1,18 @@
 import sys
-import weakref
-from collections import namedtuple
 import contextlib
 import pygame
 from .speech import speak
-from . import options, state, virtual_input, menus, clock, gameplay, consts, audio, speech
+from . import options, state, virtual_input, menus, clock, gameplay, consts, audio, speech, scheduler, tasks
 from .os_tools import get_os
 
-Delayed_function = namedtuple("delayed_function", ["clock", "time", "function"])
-
 
 class Game:
     def __init__(self, screen):
         self.screen = screen
-        self.clocks = weakref.WeakSet()
+        # the root of every time domain. advanced once per frame, everything else derives its time from it.
+        # clocks and delayed calls used to be advanced twice a frame, game time runs at twice the real time
+        # so the game keeps its pace.
+        self.time_domain = clock.TimeDomain(scale=2.0)
         options.load()
         self.framerate = 60
         self.delta = 1 / self.framerate * 1000
@@ -23,7 +22,9 @@ class Game:
         self.input_history = [""]
         self.input = virtual_input.Virtual_input(self)
         self.last_fps = 60
-        self.delayed_functions = {}
+        self.scheduler = scheduler.Scheduler(self.time)
+        # generator/async def scripts, see start_task.
+        self.tasks = tasks.TaskRunner(self.time)
         self.ids = 0
 
     def start_game(self):
@@ -31,22 +32,35 @@ class Game:
 
     def start(self):
         menus.main_menu(self)
+        # loaded while the player is in the menu.
+        gameplay.Gameplay.preload_sounds()
+
+    @property
+    def time(self):
+        """game time in ms. drives the scheduler."""
+        return self.time_domain.time
 
     def new_id(self):
         self.ids += 1
         return self.ids
 
-    def call_after(self, time, function):  # sourcery skip: avoid-builtin-shadow
-        """call{function} after {time}ms. returns an id that you could use to stop a function before its executed"""
-        id = self.new_id()
-        delayed_function = Delayed_function(self.new_clock(), time, function)
-        self.delayed_functions[id] = delayed_function
-        return id
+    def call_after(self, time, function):
+        """call {function} after {time}ms. returns a timer that you could use to stop the function before its executed"""
+        return self.scheduler.call_after(time, function)
+
+    def call_every(self, interval, function, delay=None):
+        """call {function} every {interval}ms. returns a timer that you could cancel to stop the calls."""
+        return self.scheduler.call_every(interval, function, delay)
+
+    def start_task(self, coroutine):
+        """runs {coroutine} (a generator or an async def coroutine) alongside the game, starting next frame.
+        it can yield (or await) tasks.wait(ms), tasks.until(predicate) and tasks.next_frame() to let the game go on.
+        returns a Task that can be cancelled"""
+        return self.tasks.spawn(coroutine)
 
-    def cancel_before(self, id):
-        """takes an id and prevents the delayed function of that id (if any) from running if they havent been ran yet."""
-        if self.delayed_functions[id]:
-            del self.delayed_functions[id]
+    def cancel_before(self, timer):
+        """takes a timer returned by call_after or call_every and prevents its function from running if it hasnt been ran yet."""
+        timer.cancel()
 
     def toggle(self, key, on_text="on", off_text="off"):
         """toggle options[key]. speaks the new state(whether on or off)"""
@@ -71,14 +85,17 @@ class Game:
     def exit(self):
         self.stack = []
 
-    def new_clock(self):
-        cl = clock.Clock()
-        self.clocks.add(cl)
-        return cl
+    def new_clock(self, domain=None):
+        """returns a clock measuring time in {domain}, or in game time if no domain is given."""
+        return clock.Clock(domain or self.time_domain)
+
+    def new_domain(self, parent=None, scale=1.0):
+        """returns a time domain following {parent}, or game time if no parent is given.
+        pausing or scaling it pauses or scales every clock made from it."""
+        return clock.TimeDomain(parent or self.time_domain, scale)
 
     def loop(self):
         while True:
-            self.update(self.delta)
             self.events = pygame.event.get()
             for event in self.events:
                 if (
@@ -98,23 +115,10 @@ class Game:
             elif callable(st):
                 st()
             self.last_fps = round(self.clock.get_fps())
-            ids_to_remove = []
-            for i in self.delayed_functions.copy():
-                if (
-                    self.delayed_functions[i].clock.elapsed
-                    >= self.delayed_functions[i].time
-                ):
-                    if callable(self.delayed_functions[i].function):
-                        self.delayed_functions[i].function()
-                    ids_to_remove.append(i)
-            for i in ids_to_remove:
-                del self.delayed_functions[i]
+            self.scheduler.update(self.time)
+            self.tasks.update(self.time)
             self.delta = self.clock.tick(self.framerate)
-            self.update(self.delta)
-
-    def update(self, delta):
-        for i in self.clocks:
-            i.update(delta)
+            self.time_domain.advance(self.delta)
 
     def pop(self):
         with contextlib.suppress(IndexError):
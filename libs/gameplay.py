@@ -5,12 +5,25 @@ from .objects import player
 
 
 class Gameplay(state.State):
+    sound_manifest = (
+        "players/turn.ogg",
+        "foley/fall/start.ogg",
+        "foley/fall/end.ogg",
+        "door/open",
+        "door/locked",
+    )
+
     def __init__(self, game):
         super().__init__(game)
-        self.map = world_map.Map(self.game, 0, 0, 0, 10, 10, 10)
+        self.map = world_map.Map(
+            self.game, 0, 0, 0, 10, 10, 10, parent_domain=self.time_domain
+        )
         self.player = player.Player(self.game, self.map, 0, 0, 0)
         self.camera = camera.Camera(self.game)
+        self.camera.regions = self.map.regions
+        self.map.regions.add_listener("zone", self.enter_zone)
         self.camera.set_focus_object(self.player)
+        self.map.entity_scheduler.focus = self.player
         self.music_volume = options.get("music_volume", 25)
         self.running = False
         self.turning = False
@@ -57,6 +70,10 @@ class Gameplay(state.State):
             elif event.type == pygame.KEYUP and event.key in self.keys_released:
                 self.keys_released[event.key](event.mod)
 
+    def enter_zone(self, zone):
+        self.camera.currentzone = zone
+        speak(zone)
+
     def buffer_move_l(self, mod):
         if mod & pygame.KMOD_SHIFT:
             return buffer.cycle_item(3)
@@ -103,7 +120,8 @@ class Gameplay(state.State):
         if self.music_volume > 0:
             for i in self.map.music_list:
                 # i.sound.fade(_from=self.music_volume, to=self.music_volume - 5, fade_time=i.fade_time / 2)
-                i.sound.set_volume(self.music_volume - 5)
+                if i.playing and i.sound:
+                    i.sound.set_volume(self.music_volume - 5)
 
                 i.volume -= 5
             self.music_volume -= 5
@@ -114,7 +132,8 @@ class Gameplay(state.State):
         if self.music_volume < 50:
             for i in self.map.music_list:
                 # i.sound.fade(_from=self.music_volume, to=self.music_volume + 5, fade_time=i.fade_time / 2)
-                i.sound.set_volume(self.music_volume + 5)
+                if i.playing and i.sound:
+                    i.sound.set_volume(self.music_volume + 5)
 
                 i.volume += 5
             self.music_volume += 5
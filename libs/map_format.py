@@ -0,0 +1,374 @@
+"""compiled map files.
+
+maps are written in a readable source format, one map object per line, with the same arguments as the
+matching Map.spawn_* method. blank lines and lines starting with # are ignored, and names with spaces can be quoted:
+
+    map 0 0 0 100 100 10
+    platform 0 100 0 100 0 0 grass
+    zone 0 10 0 10 0 5 "the kitchen"
+    door 5 5 10 10 0 3 wall wood
+    ambience 0 100 0 100 0 10 ambience/wind.ogg 60
+    music 0 50 0 50 0 10 music/town.ogg
+    reverb 0 10 0 10 0 5 1.5 1500
+
+compile_map turns that into a binary file that CompiledMap reads through mmap:
+a header, a string table, one fixed size record per box, and a prebuilt grid index over the tiles and zones.
+nothing is parsed or copied at load time, records are only decoded when a query touches them.
+
+usage: python -m libs.map_format source.txt compiled.map
+"""
+
+import mmap
+import shlex
+import struct
+import sys
+
+import numpy as np
+
+MAGIC = b"TMAP"
+VERSION = 1
+# magic, version, cell size, minx, miny, minz, maxx, maxy, maxz
+HEADER = struct.Struct("<4sII6i")
+# offset and count of every section, in SECTIONS order.
+SECTIONS = (
+    "strings",
+    "string_data",
+    "tiles",
+    "zones",
+    "doors",
+    "ambiences",
+    "musics",
+    "reverbs",
+    "tile_keys",
+    "tile_cells",
+    "tile_items",
+    "zone_keys",
+    "zone_cells",
+    "zone_items",
+)
+SECTION = struct.Struct("<QQ")
+# every box is stored the same way. a and b are string ids (or -1), f1 and f2 hold the numbers some objects need.
+RECORD = np.dtype(
+    [
+        ("minx", "<i4"),
+        ("maxx", "<i4"),
+        ("miny", "<i4"),
+        ("maxy", "<i4"),
+        ("minz", "<i4"),
+        ("maxz", "<i4"),
+        ("a", "<i4"),
+        ("b", "<i4"),
+        ("f1", "<f4"),
+        ("f2", "<f4"),
+    ]
+)
+STRING = np.dtype([("offset", "<u4"), ("length", "<u4")])
+CELL = np.dtype([("start", "<u4"), ("count", "<u4")])
+# grid cells are keyed by their coordinates packed into one int64, 21 bits each.
+_KEY_BITS = 21
+_KEY_BIAS = 1 << (_KEY_BITS - 1)
+
+
+# the fewest arguments each kind of line takes, the rest are optional.
+ARGUMENTS = {
+    "map": 6,
+    "platform": 7,
+    "zone": 7,
+    "door": 8,
+    "ambience": 7,
+    "music": 7,
+    "reverb": 7,
+}
+
+
+class MapFormatError(Exception):
+    pass
+
+
+def cell_key(cx, cy, cz):
+    return (
+        ((cx + _KEY_BIAS) << (_KEY_BITS * 2))
+        | ((cy + _KEY_BIAS) << _KEY_BITS)
+        | (cz + _KEY_BIAS)
+    )
+
+
+def parse_source(text):
+    """parses map source text. returns (bounds, objects) where objects maps a kind to a list of argument lists."""
+    bounds = None
+    objects = {
+        i: [] for i in ("platform", "zone", "door", "ambience", "music", "reverb")
+    }
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            kind, *args = shlex.split(line)
+        except ValueError as e:
+            raise MapFormatError(f"line {number}: {e}") from e
+        if kind not in ARGUMENTS:
+            raise MapFormatError(f"line {number}: unknown object {kind}")
+        if len(args) < ARGUMENTS[kind]:
+            raise MapFormatError(
+                f"line {number}: {kind} needs at least {ARGUMENTS[kind]} arguments, got {len(args)}"
+            )
+        try:
+            if kind == "map":
+                bounds = tuple(int(i) for i in args[:6])
+            else:
+                objects[kind].append([int(i) for i in args[:6]] + args[6:])
+        except ValueError as e:
+            raise MapFormatError(f"line {number}: {e}") from e
+    if bounds is None:
+        raise MapFormatError("the map has no bounds, add a map line")
+    return bounds, objects
+
+
+def _build_grid(records, cell_size):
+    cells = {}
+    for index, r in enumerate(records):
+        for cx in range(r["minx"] // cell_size, r["maxx"] // cell_size + 1):
+            for cy in range(r["miny"] // cell_size, r["maxy"] // cell_size + 1):
+                for cz in range(r["minz"] // cell_size, r["maxz"] // cell_size + 1):
+                    cells.setdefault(cell_key(cx, cy, cz), []).append(index)
+    keys = np.array(sorted(cells), dtype="<i8")
+    table = np.zeros(len(keys), dtype=CELL)
+    items = []
+    for i, key in enumerate(keys.tolist()):
+        table[i] = (len(items), len(cells[key]))
+        items.extend(cells[key])
+    return keys, table, np.array(items, dtype="<u4")
+
+
+def compile_map(source_path, output_path, cell_size=16):
+    """compiles the map source at {source_path} into a binary map at {output_path}"""
+    with open(source_path, encoding="utf-8") as f:
+        bounds, objects = parse_source(f.read())
+    strings = {}
+
+    def string_id(value):
+        return strings.setdefault(value, len(strings))
+
+    def records(kind, convert):
+        table = np.zeros(len(objects[kind]), dtype=RECORD)
+        for i, args in enumerate(objects[kind]):
+            table[i] = tuple(args[:6]) + convert(args[6:])
+        return table
+
+    tables = {
+        "tiles": records("platform", lambda a: (string_id(a[0]), -1, 0, 0)),
+        "zones": records("zone", lambda a: (string_id(a[0]), -1, 0, 0)),
+        "doors": records("door", lambda a: (string_id(a[0]), string_id(a[1]), 0, 0)),
+        "ambiences": records(
+            "ambience",
+            lambda a: (string_id(a[0]), -1, float(a[1]) if len(a) > 1 else 100, 0),
+        ),
+        "musics": records("music", lambda a: (string_id(a[0]), -1, 0, 0)),
+        "reverbs": records(
+            "reverb",
+            lambda a: (-1, -1, float(a[0]), float(a[1]) if len(a) > 1 else 1500),
+        ),
+    }
+    tables["tile_keys"], tables["tile_cells"], tables["tile_items"] = _build_grid(
+        tables["tiles"], cell_size
+    )
+    tables["zone_keys"], tables["zone_cells"], tables["zone_items"] = _build_grid(
+        tables["zones"], cell_size
+    )
+    encoded = [i.encode("utf-8") for i in strings]
+    tables["strings"] = np.zeros(len(encoded), dtype=STRING)
+    offset = 0
+    for i, data in enumerate(encoded):
+        tables["strings"][i] = (offset, len(data))
+        offset += len(data)
+    tables["string_data"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    offset = HEADER.size + SECTION.size * len(SECTIONS)
+    section_table = b""
+    for name in SECTIONS:
+        # keep every section 8 byte aligned so numpy can view it in place.
+        offset += -offset % 8
+        section_table += SECTION.pack(offset, len(tables[name]))
+        offset += tables[name].nbytes
+    with open(output_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, cell_size, *bounds))
+        f.write(section_table)
+        for name in SECTIONS:
+            f.write(b"\0" * (-f.tell() % 8))
+            f.write(tables[name].tobytes())
+
+
+class CompiledMap:
+    """a compiled map opened through mmap.
+    the tables are numpy views straight into the mapped file, so opening a map costs the same no matter how many
+    boxes it has, and the OS only pages in the parts of the file that queries actually touch.
+    params:
+    path (str): the compiled map file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.cell_size, *self.bounds = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise MapFormatError(f"{path} is not a compiled map this version can read")
+        dtypes = {
+            "strings": STRING,
+            "string_data": np.uint8,
+            "tile_keys": "<i8",
+            "tile_cells": CELL,
+            "tile_items": "<u4",
+            "zone_keys": "<i8",
+            "zone_cells": CELL,
+            "zone_items": "<u4",
+        }
+        for i, name in enumerate(SECTIONS):
+            offset, count = SECTION.unpack_from(
+                self._mm, HEADER.size + SECTION.size * i
+            )
+            setattr(
+                self,
+                name,
+                np.frombuffer(
+                    self._mm, dtype=dtypes.get(name, RECORD), count=count, offset=offset
+                ),
+            )
+        self._strings = {}
+
+    def close(self):
+        # the views have to go before the mmap can be closed.
+        for name in SECTIONS:
+            setattr(self, name, None)
+        self._mm.close()
+
+    def string(self, index):
+        """returns string {index} of the string table, or an empty string for -1"""
+        if index < 0:
+            return ""
+        value = self._strings.get(index)
+        if value is None:
+            offset, length = self.strings[index].tolist()
+            value = bytes(self.string_data[offset : offset + length]).decode("utf-8")
+            self._strings[index] = value
+        return value
+
+    def _candidates(self, keys, cells, items, x, y, z):
+        cs = self.cell_size
+        key = cell_key(x // cs, y // cs, z // cs)
+        i = int(np.searchsorted(keys, key))
+        if i == len(keys) or keys[i] != key:
+            return items[:0]
+        start, count = cells[i].tolist()
+        return items[start : start + count]
+
+    def _last_at(self, table, keys, cells, items, x, y, z):
+        candidates = self._candidates(keys, cells, items, x, y, z)
+        if not len(candidates):
+            return None
+        boxes = table[candidates]
+        hits = np.flatnonzero(
+            (boxes["minx"] <= x)
+            & (boxes["maxx"] >= x)
+            & (boxes["miny"] <= y)
+            & (boxes["maxy"] >= y)
+            & (boxes["minz"] <= z)
+            & (boxes["maxz"] >= z)
+        )
+        return int(candidates[hits[-1]]) if len(hits) else None
+
+    def tile_index_at(self, x, y, z):
+        """returns the index of the last tile covering integer coordinates (x, y, z), or None"""
+        return self._last_at(
+            self.tiles, self.tile_keys, self.tile_cells, self.tile_items, x, y, z
+        )
+
+    def zone_index_at(self, x, y, z):
+        """returns the index of the last zone covering integer coordinates (x, y, z), or None"""
+        return self._last_at(
+            self.zones, self.zone_keys, self.zone_cells, self.zone_items, x, y, z
+        )
+
+    def tile_at(self, x, y, z):
+        i = self.tile_index_at(x, y, z)
+        return None if i is None else self.string(int(self.tiles[i]["a"]))
+
+    def zone_at(self, x, y, z):
+        i = self.zone_index_at(x, y, z)
+        return None if i is None else self.string(int(self.zones[i]["a"]))
+
+    def _cells_in_box(self, keys, minx, maxx, miny, maxy, minz, maxz):
+        """returns the positions in {keys} of the grid cells a box overlaps that hold anything"""
+        cs = self.cell_size
+        lo = (minx // cs, miny // cs, minz // cs)
+        hi = (maxx // cs, maxy // cs, maxz // cs)
+        count = (hi[0] - lo[0] + 1) * (hi[1] - lo[1] + 1) * (hi[2] - lo[2] + 1)
+        if count <= len(keys):
+            cx, cy, cz = np.ix_(
+                *(np.arange(a, b + 1, dtype="<i8") for a, b in zip(lo, hi))
+            )
+            wanted = cell_key(cx, cy, cz).ravel()
+            found = np.searchsorted(keys, wanted)
+            found = found[found < len(keys)]
+            return found[np.isin(keys[found], wanted)]
+        # the box has more cells than the map has occupied ones, look at those instead.
+        mask = (1 << _KEY_BITS) - 1
+        coords = (
+            (keys >> (_KEY_BITS * 2)) - _KEY_BIAS,
+            ((keys >> _KEY_BITS) & mask) - _KEY_BIAS,
+            (keys & mask) - _KEY_BIAS,
+        )
+        inside = np.ones(len(keys), dtype=bool)
+        for c, a, b in zip(coords, lo, hi):
+            inside &= (c >= a) & (c <= b)
+        return np.flatnonzero(inside)
+
+    def _indexed_in_box(self, table, keys, cells, items, box):
+        found = self._cells_in_box(keys, *(int(i) for i in box))
+        if not len(found):
+            return items[:0]
+        candidates = np.unique(
+            np.concatenate(
+                [items[start : start + count] for start, count in cells[found].tolist()]
+            )
+        )
+        return candidates[self.in_box(table[candidates], *box)]
+
+    def tiles_in_box(self, minx, maxx, miny, maxy, minz, maxz):
+        """returns the indices of the tiles overlapping a box, in order. only the grid cells of the box are read"""
+        box = (minx, maxx, miny, maxy, minz, maxz)
+        return self._indexed_in_box(
+            self.tiles, self.tile_keys, self.tile_cells, self.tile_items, box
+        )
+
+    def zones_in_box(self, minx, maxx, miny, maxy, minz, maxz):
+        """returns the indices of the zones overlapping a box, in order. only the grid cells of the box are read"""
+        box = (minx, maxx, miny, maxy, minz, maxz)
+        return self._indexed_in_box(
+            self.zones, self.zone_keys, self.zone_cells, self.zone_items, box
+        )
+
+    def in_box(self, table, minx, maxx, miny, maxy, minz, maxz):
+        """returns the indices of the records in {table} overlapping a box, in order.
+        this looks at every record, tiles_in_box and zones_in_box are faster"""
+        return np.flatnonzero(
+            (table["minx"] <= maxx)
+            & (table["maxx"] >= minx)
+            & (table["miny"] <= maxy)
+            & (table["maxy"] >= miny)
+            & (table["minz"] <= maxz)
+            & (table["maxz"] >= minz)
+        )
+
+    def box(self, table, index):
+        """returns (minx, maxx, miny, maxy, minz, maxz) of record {index} of {table}"""
+        return tuple(table[index].tolist()[:6])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(__doc__.rstrip().rsplit("\n", 1)[-1])
+        sys.exit(1)
+    compile_map(sys.argv[1], sys.argv[2])
@@ -37,6 +37,8 @@ class Menu(state.State):
         self.music = ""
         self.mus = None
         self.music_volume = None
+        # the sounds pinned while the menu is shown, see enter.
+        self.pinned = []
 
     def return_first_match(self, text, current_index=0):
         """return the first index that has an item that matches the text"""
@@ -56,6 +58,13 @@ class Menu(state.State):
     def enter(self):
         super().enter()
         speech.speak(self.title, id="menu_title")
+        # menu sounds play on every key press, keep them loaded until the menu exits.
+        if not self.pinned:
+            self.pinned = [
+                i for i in (self.click, self.edge, self.wrap, self.enter_sound) if i
+            ]
+            for i in self.pinned:
+                audio.pin(i)
         if self.open:
             audio.play_direct(self.open)
 
@@ -74,6 +83,8 @@ class Menu(state.State):
         self.enter_sound = enter
         self.open = open
         self.wrap = wrap
+        # menus set their sounds before they are shown, so they can load in the meantime.
+        audio.preload([i for i in (click, close, edge, enter, open, wrap) if i])
 
     def set_music(self, music_path: str, gain=None):
         if gain is None:
@@ -197,6 +208,9 @@ class Menu(state.State):
     def exit(self):
         super().exit()
         options.save()
+        for i in self.pinned:
+            audio.unpin(i)
+        self.pinned = []
         if self.mus != None:
             # self.mus.fade(to=0, fade_time=1.0, evt=consts.EVT_DESTROY)
             self.mus.destroy()
@@ -1,5 +1,9 @@
 from math import pi, sin, cos, atan2, radians, degrees, sqrt
 
+import numpy as np
+
+from .string_utils import directions
+
 
 def to_int(value):
     try:
@@ -21,6 +25,27 @@ _southeast = 135
 _straight_up = 90
 _straight_down = -90
 
+# sin and cos of every whole degree, for the integer facings snapleft/turnleft and friends produce.
+SIN_TABLE = np.sin(np.radians(np.arange(360)))
+COS_TABLE = np.cos(np.radians(np.arange(360)))
+_sin_table = SIN_TABLE.tolist()
+_cos_table = COS_TABLE.tolist()
+
+
+def sin_deg(deg):
+    """sin of {deg} degrees, looked up in SIN_TABLE for whole degrees"""
+    if type(deg) is int:
+        return _sin_table[deg % 360]
+    return sin(radians(deg))
+
+
+def cos_deg(deg):
+    """cos of {deg} degrees, looked up in COS_TABLE for whole degrees"""
+    if type(deg) is int:
+        return _cos_table[deg % 360]
+    return cos(radians(deg))
+
+
 # Coordinate systems
 
 
@@ -34,6 +59,8 @@ class Vector:
     z (float, optional): The starting z coordinate of this vector.
     """
 
+    __slots__ = ("x", "y", "z")
+
     def __init__(self, x=0.0, y=0.0, z=0.0):
         self.x = x
         self.y = y
@@ -68,11 +95,11 @@ def move(coords, deg, pitch=0.0, factor=1.0):
             a transformed vector
     """
     x, y, z = coords
-    steplength = factor * cos(radians(pitch))
+    steplength = factor * cos_deg(pitch)
     r = Vector()
-    r.x = x + steplength * sin(radians(deg))
-    r.y = y + steplength * cos(radians(deg))
-    r.z = to_int(z) + factor * sin(radians(pitch))
+    r.x = x + steplength * sin_deg(deg)
+    r.y = y + steplength * cos_deg(deg)
+    r.z = to_int(z) + factor * sin_deg(pitch)
     return r
 
 
@@ -162,14 +189,76 @@ def get_1d_distance(x1, x2):
 
 def get_2d_distance(x1, y1, x2, y2):
     """returns the pythagorean distance between two points on an x-y plane."""
-    x = get_1d_distance(x1 - x2)
-    y = get_1d_distance(y1, y2)
+    x = int(x1) - int(x2)
+    y = int(y1) - int(y2)
     return sqrt(x * x + y * y)
 
 
 def get_3d_distance(x1, y1, z1, x2, y2, z2):
     """returns the pythagorean distance between two points in 3-space."""
-    x = get_1d_distance(x1, x2)
-    y = get_1d_distance(y1, y2)
-    z = get_1d_distance(z1, z2)
+    # called for every playing sound every frame, so truncate directly rather than through to_int.
+    x = int(x1) - int(x2)
+    y = int(y1) - int(y2)
+    z = int(z1) - int(z2)
     return sqrt(x * x + y * y + z * z)
+
+
+# Batch versions of the functions above. they take NumPy arrays (or anything np.asarray accepts) and work on every
+# point in one call, for code that handles many objects at once (audio culling, AI, radar).
+# coordinates are (n, 3) arrays of x, y, z, and angles may be one value for every point or an array with one per point.
+
+
+def _trig_many(deg):
+    """sin and cos of an array of degrees, from the tables when every angle is a whole degree"""
+    deg = np.asarray(deg)
+    if deg.dtype.kind in "iu":
+        index = deg % 360
+        return SIN_TABLE[index], COS_TABLE[index]
+    rad = np.radians(deg)
+    return np.sin(rad), np.cos(rad)
+
+
+def move_many(coords, deg, pitch=0.0, factor=1.0):
+    """moves every point of {coords} like move does, returns an (n, 3) array of the new points"""
+    coords = np.asarray(coords, dtype=np.float64)
+    hsin, hcos = _trig_many(deg)
+    psin, pcos = _trig_many(pitch)
+    steplength = factor * pcos
+    result = np.empty_like(coords)
+    result[:, 0] = coords[:, 0] + steplength * hsin
+    result[:, 1] = coords[:, 1] + steplength * hcos
+    result[:, 2] = np.trunc(coords[:, 2]) + factor * psin
+    return result
+
+
+def distance_squared_many(origin, points):
+    """returns the squared distances from {origin} (one point, or an array with one origin per point) to every point
+    of {points}. cheaper than distance_many when you only compare distances"""
+    delta = np.asarray(points, dtype=np.float64) - np.asarray(origin, dtype=np.float64)
+    return np.einsum("ij,ij->i", delta, delta)
+
+
+def distance_many(origin, points):
+    """returns the distances from {origin} to every point of {points}.
+    unlike get_3d_distance the coordinates aren't truncated to whole units first"""
+    return np.sqrt(distance_squared_many(origin, points))
+
+
+def calculate_angle_many(origin, points, deg=0):
+    """calculate_angle from {origin} to every point of {points}, with the origin facing {deg}"""
+    delta = np.asarray(points, dtype=np.float64) - np.asarray(origin, dtype=np.float64)
+    x, y = delta[:, 0], delta[:, 1]
+    fdeg = 270 - np.degrees(np.arctan2(y, x)) - deg
+    fdeg = np.where(fdeg < 0, fdeg + 360, np.where(fdeg > 360, fdeg - 360, fdeg))
+    # straight ahead or behind, calculate_angle doesn't shift these by the facing.
+    return np.where(x == 0, np.where(y >= 0, 0.0, 180.0), fdeg)
+
+
+def direction_index_many(deg):
+    """returns which of the 16 compass points (0 is north, 4 is east) every angle of {deg} falls in"""
+    return (np.asarray(deg, dtype=np.float64) / 22.5 + 0.5).astype(np.int64) % 16
+
+
+def direction_many(deg):
+    """string_utils.direction for an array of angles, returns an array of compass point names"""
+    return np.array(directions)[direction_index_many(deg)]
@@ -0,0 +1,381 @@
+import heapq
+import itertools
+from collections import OrderedDict
+from math import floor, sqrt
+
+import numpy as np
+
+# the 8 directions an entity can walk in, as (dx, dy, cost).
+STEPS = tuple(
+    (dx, dy, sqrt(2) if dx and dy else 1.0)
+    for dx, dy in itertools.product((-1, 0, 1), repeat=2)
+    if dx or dy
+)
+
+
+def is_blocked(tiletype):
+    return "wall" in tiletype
+
+
+def is_open(tiletype):
+    """true for tiletypes an entity falls through"""
+    return tiletype in ("air", "")
+
+
+class Navigator:
+    """finds walking paths over a map's tiles with A*.
+    a cell is a whole unit coordinate. walking into a wall is blocked unless there is a floor at most {step_height}
+    cells above it to step up onto (like collision.sweep does), and walking into air means falling down to the first
+    tile below, so a step can end higher or lower than it started. stepping off the map is never allowed.
+    what each cell leads to and the paths found are cached, and both caches are cleared where tiles change
+    (doors opening, dynamic tiles), so entities re-pathing to the same goal cost a dictionary lookup.
+    params:
+    map (world_map.Map): the map to navigate
+    cache_size (int, optional): how many paths are remembered
+    max_nodes (int, optional): how many cells a search may expand before giving up, to bound the cost of unreachable goals
+    step_height (int, optional): the highest ledge that can be stepped up onto, see Entity.step_height
+    """
+
+    def __init__(self, map, cache_size=256, max_nodes=20000, step_height=1):
+        self.map = map
+        self.cache_size = cache_size
+        self.max_nodes = max_nodes
+        self.step_height = step_height
+        self._landings = {}
+        self._paths = OrderedDict()
+        # flow fields by goal cell, and the walkability grids they're built from.
+        self._fields = OrderedDict()
+        self._grid = None
+        map.add_tile_listener(self.invalidate)
+
+    def destroy(self):
+        self.map.remove_tile_listener(self.invalidate)
+        self._landings.clear()
+        self._paths.clear()
+        self._fields.clear()
+        self._grid = None
+
+    def flow_field(self, goal, cache_size=4):
+        """returns a FlowField leading every reachable cell of the map to {goal}.
+        fields are kept until the map's tiles change, so any number of entities chasing the same goal share one,
+        and it is only rebuilt when the goal moves to another cell.
+        the map must be baked, see Map.bake_tiles"""
+        goal = tuple(floor(i) for i in goal)
+        field = self._fields.get(goal)
+        if field is None:
+            if not self.map.raster:
+                raise RuntimeError("flow fields need a baked map, see bake_tiles")
+            if self._grid is None or self._grid.raster is not self.map.raster:
+                self._grid = WalkGrid(self.map.raster, self.step_height)
+            field = FlowField(self._grid, goal)
+            self._fields[goal] = field
+            if len(self._fields) > cache_size:
+                self._fields.popitem(last=False)
+        else:
+            self._fields.move_to_end(goal)
+        return field
+
+    def landing(self, x, y, z):
+        """returns the cell an entity ends up in after walking into (x, y, z), or None if it can't go there"""
+        cell = (x, y, z)
+        if cell in self._landings:
+            return self._landings[cell]
+        m = self.map
+        result = None
+        if m.in_bound(x, y, z) and is_blocked(m.get_tile_at(x, y, z)):
+            for up in range(1, self.step_height + 1):
+                if not m.in_bound(x, y, z + up):
+                    break
+                tile = m.get_tile_at(x, y, z + up)
+                if is_blocked(tile):
+                    continue
+                if not is_open(tile):
+                    result = (x, y, z + up)
+                break
+            self._landings[cell] = result
+            return result
+        while m.in_bound(x, y, z):
+            tile = m.get_tile_at(x, y, z)
+            if is_blocked(tile):
+                break
+            if not is_open(tile):
+                result = (x, y, z)
+                break
+            z -= 1
+        self._landings[cell] = result
+        return result
+
+    def neighbours(self, cell):
+        """yields (cell, cost) for every cell reachable in one step from {cell}"""
+        x, y, z = cell
+        for dx, dy, cost in STEPS:
+            if dx and dy:
+                # don't cut corners, both sides have to be walkable.
+                if not self.landing(x + dx, y, z) or not self.landing(x, y + dy, z):
+                    continue
+            target = self.landing(x + dx, y + dy, z)
+            if target:
+                # climbing and falling are slower than walking.
+                yield target, cost + abs(z - target[2])
+
+    @staticmethod
+    def _estimate(a, b):
+        dx = abs(a[0] - b[0])
+        dy = abs(a[1] - b[1])
+        return max(dx, dy) + (sqrt(2) - 1) * min(dx, dy) + abs(a[2] - b[2])
+
+    def find_path(self, start, goal):
+        """returns the list of cells from {start} to {goal} (both included), or None if there is no path.
+        coordinates are floored to cells, like Map.get_tile_at does"""
+        start = tuple(floor(i) for i in start)
+        goal = tuple(floor(i) for i in goal)
+        key = (start, goal)
+        if key in self._paths:
+            self._paths.move_to_end(key)
+            return self._paths[key]
+        path = self._search(start, goal)
+        self._paths[key] = path
+        if len(self._paths) > self.cache_size:
+            self._paths.popitem(last=False)
+        return path
+
+    def _search(self, start, goal):
+        counter = itertools.count()
+        frontier = [(self._estimate(start, goal), next(counter), start)]
+        came_from = {start: None}
+        costs = {start: 0}
+        expanded = 0
+        while frontier:
+            _, _, cell = heapq.heappop(frontier)
+            if cell == goal:
+                path = []
+                while cell:
+                    path.append(cell)
+                    cell = came_from[cell]
+                path.reverse()
+                return path
+            expanded += 1
+            if expanded > self.max_nodes:
+                break
+            for nxt, cost in self.neighbours(cell):
+                new_cost = costs[cell] + cost
+                if new_cost < costs.get(nxt, float("inf")):
+                    costs[nxt] = new_cost
+                    came_from[nxt] = cell
+                    heapq.heappush(
+                        frontier,
+                        (new_cost + self._estimate(nxt, goal), next(counter), nxt),
+                    )
+        return None
+
+    def invalidate(self, minx, maxx, miny, maxy, minz, maxz):
+        """forgets what is known about the cells in a box, and the paths going through or next to it.
+        falling means cells above the box can lead into it, so whole columns from minz up are dropped.
+        a change anywhere can change every distance of a flow field, so those are all dropped, but the walk grid
+        they are built from only re-reads the box"""
+        self._fields.clear()
+        if self._grid is not None:
+            if self._grid.raster is self.map.raster:
+                self._grid.update(minx, maxx, miny, maxy, minz, maxz)
+            else:
+                self._grid = None
+        minx, miny = minx - 1, miny - 1
+        minz -= self.step_height
+        maxx, maxy = maxx + 1, maxy + 1
+        for cell in [
+            i
+            for i in self._landings
+            if minx <= i[0] <= maxx and miny <= i[1] <= maxy and i[2] >= minz
+        ]:
+            del self._landings[cell]
+        for key in [
+            key
+            for key, path in self._paths.items()
+            if path is None
+            or any(
+                minx <= x <= maxx and miny <= y <= maxy and z >= minz - 1
+                for x, y, z in path
+            )
+        ]:
+            del self._paths[key]
+
+
+class WalkGrid:
+    """the walkability of every cell of a TileRaster, as arrays.
+    for each of the 8 STEPS, target[i] holds the flat index of the cell an entity standing on each cell ends up in
+    after taking that step (after stepping up or falling), or -1 if it can't take it, and costs[i] what the step
+    costs. when tiles change only the columns around them are read again, see update.
+    params:
+    raster (tile_raster.TileRaster): the baked tiles of the map
+    step_height (int, optional): the highest ledge that can be stepped up onto, see Navigator
+    """
+
+    def __init__(self, raster, step_height=1):
+        self.raster = raster
+        self.step_height = step_height
+        self.origin = raster.origin
+        self.shape = raster.shape
+        self.size = int(np.prod(self.shape))
+        self.blocked = np.zeros(self.shape, dtype=bool)
+        self.standable = np.zeros(self.shape, dtype=bool)
+        # the z an entity walking into each cell ends up at, -1 if it can't (a wall, or falling off the map).
+        self.land = np.full(self.shape, -1, dtype=np.int32)
+        self.target = np.full((len(STEPS),) + self.shape, -1, dtype=np.int32)
+        self.costs = np.zeros((len(STEPS),) + self.shape, dtype=np.float32)
+        self._reverse = None
+        ox, oy, oz = self.origin
+        sx, sy, sz = self.shape
+        self.update(ox, ox + sx - 1, oy, oy + sy - 1, oz, oz + sz - 1)
+
+    def update(self, minx, maxx, miny, maxy, minz, maxz):
+        """reads the cells of a box from the raster again after its tiles changed.
+        whole columns are read, since falling and stepping up look up and down them, and the steps of the columns
+        around them are worked out again"""
+        ox, oy, _ = self.origin
+        sx, sy, sz = self.shape
+        x0, x1 = max(int(minx) - ox, 0), min(int(maxx) - ox + 1, sx)
+        y0, y1 = max(int(miny) - oy, 0), min(int(maxy) - oy + 1, sy)
+        if x0 >= x1 or y0 >= y1:
+            return
+        palette = self.raster.palette
+        ids = self.raster.ids[x0:x1, y0:y1]
+        blocked = np.array([is_blocked(i) for i in palette])[ids]
+        falling = np.array([is_open(i) for i in palette])[ids]
+        standable = ~blocked & ~falling
+        self.blocked[x0:x1, y0:y1] = blocked
+        self.standable[x0:x1, y0:y1] = standable
+        z = np.arange(sz, dtype=np.int32)
+        land = np.where(standable, z, -1).astype(np.int32)
+        for i in range(1, sz):
+            land[:, :, i] = np.where(falling[:, :, i], land[:, :, i - 1], land[:, :, i])
+        # a wall with a floor at most step_height cells above it (and only wall in between) is stepped up onto.
+        climbing = blocked.copy()
+        for up in range(1, min(self.step_height, sz - 1) + 1):
+            found = climbing[:, :, :-up] & standable[:, :, up:]
+            land[:, :, :-up][found] = (z[:-up] + up)[np.nonzero(found)[2]]
+            climbing[:, :, :-up] &= blocked[:, :, up:]
+        self.land[x0:x1, y0:y1] = land
+        self._update_steps(
+            max(x0 - 1, 0), min(x1 + 1, sx), max(y0 - 1, 0), min(y1 + 1, sy)
+        )
+        self._reverse = None
+
+    def _update_steps(self, x0, x1, y0, y1):
+        sx, sy, sz = self.shape
+        x, y, z = np.ogrid[x0:x1, y0:y1, 0:sz]
+        land = self.land
+        standable = self.standable[x0:x1, y0:y1]
+        for i, (dx, dy, cost) in enumerate(STEPS):
+            nx, ny = x + dx, y + dy
+            inside = (nx >= 0) & (nx < sx) & (ny >= 0) & (ny < sy)
+            cnx, cny = np.clip(nx, 0, sx - 1), np.clip(ny, 0, sy - 1)
+            nz = np.where(inside, land[cnx, cny, z], -1)
+            valid = standable & (nz >= 0)
+            if dx and dy:
+                # corners can't be cut, both sides have to be walkable, like in Navigator.neighbours.
+                valid &= (land[cnx, y, z] >= 0) & (land[x, cny, z] >= 0)
+            self.target[i, x0:x1, y0:y1] = np.where(
+                valid, (cnx * sy + cny) * sz + nz, -1
+            )
+            # climbing and falling are slower than walking.
+            self.costs[i, x0:x1, y0:y1] = cost + np.abs(z - nz)
+
+    def steps(self):
+        """returns (target, costs) with one flat row per step"""
+        return self.target.reshape(len(STEPS), -1), self.costs.reshape(len(STEPS), -1)
+
+    def reverse(self):
+        """returns (sources, costs, start): the steps leading into each cell, grouped by that cell.
+        the cells stepping into cell c are sources[start[c]:start[c + 1]], at costs[start[c]:start[c + 1]]
+        """
+        if self._reverse is None:
+            target, costs = self.steps()
+            step, source = np.nonzero(target >= 0)
+            dest = target[step, source]
+            order = np.argsort(dest, kind="stable")
+            start = np.zeros(self.size + 1, dtype=np.int64)
+            np.cumsum(np.bincount(dest, minlength=self.size), out=start[1:])
+            self._reverse = (
+                source[order].astype(np.int32),
+                costs[step, source][order],
+                start,
+            )
+        return self._reverse
+
+    def flat(self, x, y, z):
+        """returns the flat index of map coordinates (x, y, z), or None if they're off the grid"""
+        ox, oy, oz = self.origin
+        cell = (x - ox, y - oy, z - oz)
+        if not all(0 <= c < s for c, s in zip(cell, self.shape)):
+            return None
+        return int(np.ravel_multi_index(cell, self.shape))
+
+    def unflat(self, index):
+        ox, oy, oz = self.origin
+        x, y, z = np.unravel_index(index, self.shape)
+        return (int(x) + ox, int(y) + oy, int(z) + oz)
+
+
+class FlowField:
+    """the distance from every cell of a WalkGrid to a goal, and the step to take from each cell to get closer.
+    distances are found in one pass spreading out from the goal: each round only looks at the steps leading into
+    the cells whose distance just improved, all of them at once, until nothing improves. every cell is settled a
+    few times at most, however many entities end up reading the field.
+    params:
+    grid (WalkGrid): the walkable cells
+    goal (tuple): the (x, y, z) cell to lead to
+    """
+
+    def __init__(self, grid, goal):
+        self.grid = grid
+        self.goal = goal
+        size = grid.size
+        # one extra cell that is always unreachable, for the -1 targets to point at.
+        dist = np.full(size + 1, np.inf, dtype=np.float32)
+        goal_index = grid.flat(*goal)
+        if goal_index is not None and grid.standable.ravel()[goal_index]:
+            sources, costs, start = grid.reverse()
+            dist[goal_index] = 0
+            frontier = np.array([goal_index])
+            while len(frontier):
+                counts = start[frontier + 1] - start[frontier]
+                total = int(counts.sum())
+                if not total:
+                    break
+                # the positions of every step into the frontier, its groups laid end to end.
+                edges = np.repeat(start[frontier] - np.cumsum(counts) + counts, counts)
+                edges += np.arange(total)
+                cells = sources[edges]
+                reached = np.repeat(dist[frontier], counts) + costs[edges]
+                better = reached < dist[cells]
+                cells, reached = cells[better], reached[better]
+                # a cell can be reached from several frontier cells, keep the shortest.
+                order = np.lexsort((reached, cells))
+                cells, reached = cells[order], reached[order]
+                first = np.ones(len(cells), dtype=bool)
+                first[1:] = cells[1:] != cells[:-1]
+                frontier = cells[first]
+                dist[frontier] = reached[first]
+        self.distance = dist[:-1]
+        target, cost = grid.steps()
+        candidates = dist[target] + cost
+        best = np.argmin(candidates, axis=0)
+        self.next = np.where(
+            np.isfinite(candidates.min(axis=0)),
+            target[best, np.arange(size)],
+            -1,
+        ).astype(np.int32)
+        if goal_index is not None:
+            self.next[goal_index] = -1
+
+    def distance_at(self, x, y, z):
+        """returns the path length from (x, y, z) to the goal, or inf if it can't be reached"""
+        index = self.grid.flat(floor(x), floor(y), floor(z))
+        return float("inf") if index is None else float(self.distance[index])
+
+    def next_step(self, x, y, z):
+        """returns the cell to move to from (x, y, z) to get closer to the goal, or None at the goal or if it can't be reached"""
+        index = self.grid.flat(floor(x), floor(y), floor(z))
+        if index is None or self.next[index] < 0:
+            return None
+        return self.grid.unflat(self.next[index])
@@ -1,30 +1,55 @@
 import os
+from math import floor
 from random import randint as random
 
-from .. import audio, movement, consts
+from .. import audio, movement, consts, collision
+from ..tasks import wait
+from ..entity_store import Field
 from .object import Object
 
 
 class Entity(Object):
-    def __init__(self, game, map, x, y, z, hp, name="None"):
-        super().__init__(game, map, x, y, z)
+    __slots__ = (
+        "on_move",
+        "on_turn",
+        "movement_clock",
+        "name",
+        "step_height",
+        "_hfacing",
+        "_vfacing",
+        "_bfacing",
+        "_hp",
+        "_fall_elapsed",
+        "_fall_distance",
+    )
+    # like x, y and z (see Object), these live in the entity's EntityStore when it has one.
+    hfacing = Field()
+    vfacing = Field()
+    bfacing = Field()
+    hp = Field()
+    fall_elapsed = Field()
+    fall_distance = Field()
+
+    def __init__(self, game, map, x, y, z, hp, name="None", store=None):
+        super().__init__(game, map, x, y, z, store)
+        self.fall_elapsed = 0
         self.on_move = None
         self.on_turn = None
-        self.movement_clock = game.new_clock()
+        self.movement_clock = game.new_clock(map.time_domain)
         self.hp = hp
         self.hfacing = 0
         self.vfacing = 0
         self.bfacing = 0
         self.fall_distance = 0
         self.name = name
+        # the highest ledge walk steps up or down instead of bumping into it or falling.
+        self.step_height = 1
 
     def move(self, x, y, z, play_sound=True, mode="walk"):
         self.x = x
         self.y = y
         self.z = z
-        if callable(self.on_move):
-            self.on_move(x, y, z)
-        self.src.move(self.x, self.y, self.z)
+        self.moved()
         tile = self.map.get_tile_at(self.x, self.y, self.z)
         # start/stop falling if the current tile is air.
         if not self.falling and tile in ["air", ""]:
@@ -52,69 +77,125 @@ class Entity(Object):
             self.on_turn(self.hfacing, self.vfacing, self.bfacing)
 
     def walk(
-        self, back=False, left=False, right=False, down=False, up=False, mode="walk"
+        self,
+        back=False,
+        left=False,
+        right=False,
+        down=False,
+        up=False,
+        mode="walk",
+        distance=1.0,
     ):
-        dist = movement.move((self.x, self.y, self.z), self.hfacing).get_tuple
+        """walks {distance} units (fractions included) in the facing direction, or the one given, sliding along walls.
+        returns true if the entity moved"""
         self.face(self.hfacing, 0)
+        if up or down:
+            dist = (self.x, self.y, self.z + (1 if up else -1))
+            if not self.map.in_bound(*dist):
+                return False
+            disttile = self.map.get_tile_at(*dist)
+            if "wall" in disttile:
+                self.play_sound(f"walls/{disttile}.ogg", rel_z=1)
+                return False
+            if disttile in ["air", ""]:
+                return False
+            self.move(*dist, mode=mode)
+            return True
+        deg = self.hfacing
         if back:
-            dist = movement.move(
-                (self.x, self.y, self.z), self.hfacing + 180 % 360
-            ).get_tuple
+            deg += 180
         if left:
-            dist = movement.move(
-                (self.x, self.y, self.z), self.hfacing - 90 % 360
-            ).get_tuple
+            deg -= 90
         if right:
-            dist = movement.move(
-                (self.x, self.y, self.z), self.hfacing + 90 % 360
-            ).get_tuple
-        if down:
-            dist = (self.x, self.y, self.z - 1)
-        if up:
-            dist = (self.x, self.y, self.z + 1)
-        if self.map.in_bound(*dist):
-            disttile = self.map.get_tile_at(*dist)
-            if "wall" not in disttile:
-                if (up or down) and disttile in ["air", ""]:
-                    return False
-                self.move(*dist, mode=mode)
-                return True
+            deg += 90
+        result = collision.sweep(
+            self.map,
+            self.x,
+            self.y,
+            self.z,
+            distance * movement.sin_deg(deg),
+            distance * movement.cos_deg(deg),
+            self.step_height,
+        )
+        for tiletype, (x, y, z) in result.contacts:
             self.play_sound(
-                f"walls/{disttile}.ogg",
-                rel_x=dist[0] - self.x,
-                rel_y=dist[1] - self.y,
+                f"walls/{tiletype}.ogg",
+                rel_x=x - int(self.x),
+                rel_y=y - int(self.y),
                 rel_z=1,
             )
-        return False
+        if result.moved:
+            self.move(*result.position, mode=mode)
+        return result.moved
+
+    @property
+    def idle(self):
+        # the store runs the falls of its entities itself.
+        return self.store is not None or not self.falling
+
+    def moved(self):
+        """tells the map, the sound source and on_move that the entity was moved. move calls it, call it yourself
+        after changing the position some other way (like a fall or its EntityStore do)
+        """
+        self.map.entity_hash.move(self, self.x, self.y, self.z)
+        if self.map.streamer:
+            self.map.streamer.place(self)
+        self.src.move(self.x, self.y, self.z)
+        if callable(self.on_move):
+            self.on_move(self.x, self.y, self.z)
+
+    def on_wake(self):
+        # the ground may have gone away while we slept (a door opening under us).
+        if not self.falling and self.map.get_tile_at(self.x, self.y, self.z) in [
+            "air",
+            "",
+        ]:
+            self.fall_start()
 
     def fall_start(self):
         self.fall_clock.restart()
+        self.fall_elapsed = 0
         self.play_sound("foley/fall/start.ogg")
         self.falling = True
+        self.wake()
 
     def fall_stop(self):
         self.falling = False
         self.play_sound("foley/fall/end.ogg")
         # sound-simulate landing hard on a platform.
-        for _ in range(random(3, 7)):
-            self.game.call_after(
-                random(10, 100), lambda: self.move(self.x, self.y, self.z, mode="run")
-            )
+        self.map.start_task(
+            self._stumble(sorted(random(10, 100) for _ in range(random(3, 7))))
+        )
+
+    def _stumble(self, delays):
+        """plays a running step {delays} ms after landing. the delays must be sorted"""
+        elapsed = 0
+        for delay in delays:
+            yield wait(delay - elapsed)
+            elapsed = delay
+            self.move(self.x, self.y, self.z, mode="run")
 
     def loop(self):
-        if (
-            self.falling
-            and self.fall_clock.elapsed >= self.fall_time
-            and self.map.in_bound(self.x, self.y, self.z)
-        ):
-            self.fall_clock.restart()
-            self.move(self.x, self.y, self.z - 1, False)
-            self.face(random(-45, 45), random(-45, 45), random(-45, 45))
-            self.fall_distance += 1
-            if not self.map.in_bound(self.x, self.y, self.z):
-                self.fall_stop()
+        if self.store is not None or not self.falling:
+            return
+        # a fall drops one cell every fall_time ms until it reaches the first solid tile below, or leaves the map.
+        # far away entities are ticked less often, so this catches up on every cell due since the last tick.
+        steps = int(self.fall_clock.elapsed // self.fall_time)
+        if not steps:
+            return
+        self.fall_clock.elapsed -= steps * self.fall_time
+        landing = self.map.columns.landing(self.x, self.y, self.z)
+        bottom = self.map.minz - 1 if landing is None else landing
+        z = max(floor(self.z) - steps, bottom)
+        self.fall_distance += floor(self.z) - z
+        self.z = z
+        self.face(random(-45, 45), random(-45, 45), random(-45, 45))
+        self.moved()
+        if z == bottom:
+            self.fall_stop()
 
     def on_hit(self):
+        self.wake()
         self.play_sound(f"entities/{self.name}/pain{random(1, 3)}.ogg)")
 
     def death(self):
@@ -1,22 +1,59 @@
 import contextlib
 from .. import audio
+from ..entity_store import Field
 
 
 class Object:
-    def __init__(self, game, map, x, y, z):
+    __slots__ = (
+        "game",
+        "map",
+        "store",
+        "id",
+        "active",
+        "tick_interval",
+        "fall_clock",
+        "src",
+        "_x",
+        "_y",
+        "_z",
+        "_falling",
+        "_fall_time",
+    )
+    # these live in the object's EntityStore when it has one, see entity_store.
+    x = Field()
+    y = Field()
+    z = Field()
+    falling = Field()
+    fall_time = Field()
+
+    def __init__(self, game, map, x, y, z, store=None):
         self.game = game
         self.map = map
+        self.store = store
+        self.id = store.allocate(self) if store is not None else None
         self.x = x
         self.y = y
         self.z = z
+        # inactive objects are never ticked by the map, see set_active.
+        self.active = True
+        # how many ms the map's EntityScheduler waits between ticks while this object is awake.
+        self.tick_interval = 0
         self.falling = False
         self.fall_time = 80
-        self.fall_clock = game.new_clock()
+        self.fall_clock = game.new_clock(map.time_domain)
         self.src = audio.Src()
         self.src.move(x, y, z)
 
     def play_sound(
-        self, sound, looping=False, volume=100, id="", rel_x=0, rel_y=0, rel_z=0
+        self,
+        sound,
+        looping=False,
+        volume=100,
+        id="",
+        rel_x=0,
+        rel_y=0,
+        rel_z=0,
+        priority=None,
     ):
         try:
             return self.src.play_sound(
@@ -27,10 +64,34 @@ class Object:
                 rel_x=rel_x,
                 rel_y=rel_y,
                 rel_z=rel_z,
+                priority=priority,
             )
         except Exception as e:
             pass
 
+    def set_active(self, active):
+        """starts or stops updating this object, pausing its sounds while it is inactive"""
+        if active != self.active:
+            self.active = active
+            self.src.pause(not active)
+            if active:
+                self.wake()
+            else:
+                self.map.entity_scheduler.sleep(self)
+
+    @property
+    def idle(self):
+        """true while the object has nothing to do in loop, so the map can stop ticking it"""
+        return True
+
+    def wake(self):
+        """asks the map to start ticking this object again, see entity_scheduler.EntityScheduler"""
+        self.map.entity_scheduler.wake(self)
+
+    def on_wake(self):
+        """called when the map starts ticking this object after it slept"""
+        pass
+
     def on_hit(self, object, hp):
         pass
 
@@ -42,3 +103,5 @@ class Object:
 
     def destroy(self):
         self.src.destroy()
+        if self.store is not None:
+            self.store.free(self.id)
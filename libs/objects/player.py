@@ -5,6 +5,17 @@ from random import randint as random
 
 
 class Player(Entity):
+    __slots__ = (
+        "locked",
+        "direct_src",
+        "play_direct",
+        "walktime",
+        "runtime",
+        "movetime",
+        "turntime",
+        "turning_clock",
+    )
+
     def __init__(self, game, map, x, y, z, hp=100):
         super().__init__(game, map, x, y, z, hp, "player")
         self.locked = False
@@ -14,7 +25,7 @@ class Player(Entity):
         self.runtime = 184
         self.movetime = self.walktime
         self.turntime = 5
-        self.turning_clock = game.new_clock()
+        self.turning_clock = game.new_clock(map.time_domain)
 
     def death(self):
         pass
@@ -0,0 +1,95 @@
+import numpy as np
+
+
+def _cast(origins, targets, blocked_at):
+    """walks a batch of rays through the cells they cross (3D DDA), all together, one cell per pass.
+    {blocked_at}(cells) takes the (k, 3) array of cells the rays still going are in, and returns a bool array
+    of the ones that stop a ray and an array of their tiletypes.
+    returns what raycast returns"""
+    origins = np.atleast_2d(np.asarray(origins, dtype=np.float64))
+    targets = np.atleast_2d(np.asarray(targets, dtype=np.float64))
+    count = len(origins)
+    delta = targets - origins
+    lengths = np.linalg.norm(delta, axis=1)
+
+    cell = np.floor(origins).astype(np.int64)
+    last = np.floor(targets).astype(np.int64)
+    step = np.sign(delta).astype(np.int64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # how far along the ray (0 to 1) it takes to cross one cell on each axis, and to reach the next boundary.
+        t_delta = np.where(step != 0, np.abs(1 / delta), np.inf)
+        t_max = np.where(
+            step > 0,
+            (cell + 1 - origins) / delta,
+            np.where(step < 0, (cell - origins) / delta, np.inf),
+        )
+    t = np.zeros(count)
+    hits = np.zeros(count, dtype=bool)
+    tiletypes = np.full(count, "", dtype=object)
+    active = np.ones(count, dtype=bool)
+    rows = np.arange(count)
+    while active.any():
+        current = rows[active]
+        blocked, types = blocked_at(cell[current])
+        hits[current[blocked]] = True
+        tiletypes[current[blocked]] = types[blocked]
+        active &= ~hits & np.any(cell != last, axis=1)
+        axis = np.argmin(t_max, axis=1)
+        t = np.where(active, t_max[rows, axis], t)
+        active &= t <= 1
+        cell[rows[active], axis[active]] += step[rows[active], axis[active]]
+        t_max[rows[active], axis[active]] += t_delta[rows[active], axis[active]]
+    distances = np.where(hits, t * lengths, lengths)
+    return hits, tiletypes, distances
+
+
+def raycast(raster, origins, targets, blocking):
+    """casts a batch of rays through the cells of a TileRaster and finds the first blocking tile along each one.
+    all rays are walked together, one cell per pass (3D DDA), so a batch costs as many array passes as the
+    longest ray crosses cells, not one Python loop per ray. cells outside the raster never block.
+    params:
+    raster (tile_raster.TileRaster): the baked tiles to cast against
+    origins (array like): an (n, 3) array of ray starts in map coordinates
+    targets (array like): an (n, 3) array of ray ends in map coordinates
+    blocking (callable): takes a tiletype and returns true if it stops a ray
+    returns:
+    (hits, tiletypes, distances): a bool array telling which rays were blocked, an array of the tiletype that
+    blocked each ray ("" for rays that weren't), and an array of the distance from the origin to where each ray
+    was blocked (the full length of the ray for rays that weren't)
+    """
+    blocking_ids = np.array([bool(blocking(i)) for i in raster.palette])
+    origin = np.array(raster.origin)
+    shape = np.array(raster.shape)
+
+    def blocked_at(cells):
+        index = cells - origin
+        inside = np.all((index >= 0) & (index < shape), axis=1)
+        ids = np.zeros(len(cells), dtype=np.int64)
+        ids[inside] = raster.ids[tuple(index[inside].T)]
+        return inside & blocking_ids[ids], raster.decode(ids)
+
+    return _cast(origins, targets, blocked_at)
+
+
+def raycast_map(map, origins, targets, blocking):
+    """like raycast, but looks the cells up with the map's get_tile_at, for maps that aren't baked.
+    the rays are still walked together, only the tile lookups are one per cell. cells outside the map never block.
+    params:
+    map (world_map.Map): the map to cast against
+    see raycast for the rest
+    """
+    blocks = {}
+
+    def blocked_at(cells):
+        types = []
+        blocked = []
+        for x, y, z in cells.tolist():
+            inside = map.in_bound(x, y, z)
+            tiletype = map.get_tile_at(x, y, z) if inside else ""
+            if tiletype not in blocks:
+                blocks[tiletype] = bool(blocking(tiletype))
+            types.append(tiletype)
+            blocked.append(inside and blocks[tiletype])
+        return np.array(blocked, dtype=bool), np.array(types, dtype=object)
+
+    return _cast(origins, targets, blocked_at)
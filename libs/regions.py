@@ -0,0 +1,93 @@
+from math import floor
+
+
+class RegionTracker:
+    """keeps track of the zones, ambiences, music and reverbs containing a point, usually the camera.
+    the regions are only looked up again when the point moves into another cell (a whole unit coordinate),
+    and listeners are told about the regions that were left and entered since the last lookup.
+    zones are tracked by name, the other kinds by their map object.
+    the nearby_ambience and nearby_music kinds track the ambiences and music within {approach_distance} of the point.
+    params:
+    map (world_map.Map): the map whose regions are tracked
+    approach_distance (int, optional): how close an ambience or music region has to be to count as nearby
+    """
+
+    kinds = ("zone", "ambience", "music", "reverb", "nearby_ambience", "nearby_music")
+
+    def __init__(self, map, approach_distance=10):
+        self.map = map
+        self.approach_distance = approach_distance
+        self.cell = None
+        self.position = None
+        self.current = {i: [] for i in self.kinds}
+        self.listeners = {i: [] for i in self.kinds}
+
+    def add_listener(self, kind, on_enter=None, on_leave=None):
+        """calls {on_enter}(region) and {on_leave}(region) when a region of {kind} is entered or left"""
+        self.listeners[kind].append((on_enter, on_leave))
+
+    def remove_listener(self, kind, on_enter=None, on_leave=None):
+        self.listeners[kind].remove((on_enter, on_leave))
+
+    def _lookup(self, kind, x, y, z):
+        m = self.map
+        if kind == "zone":
+            zone = m.get_zone_at(x, y, z)
+            return [zone] if zone else []
+        if kind == "ambience":
+            return list(m.get_ambiences_at(x, y, z))
+        if kind == "music":
+            return list(m.get_musics_at(x, y, z))
+        if kind.startswith("nearby_"):
+            d = self.approach_distance
+            index = m.ambience_index if kind == "nearby_ambience" else m.music_index
+            return index.query_box(x - d, x + d, y - d, y + d, z - d, z + d)
+        reverb = m.get_reverb_at(x, y, z)
+        return [reverb] if reverb else []
+
+    def _fire(self, kind, regions, entered):
+        for region in regions:
+            for listener in self.listeners[kind].copy():
+                callback = listener[0 if entered else 1]
+                if callable(callback):
+                    callback(region)
+
+    def update(self, x, y, z):
+        """tells the tracker the point moved to (x, y, z). does nothing unless it changed cell"""
+        self.position = (x, y, z)
+        cell = (floor(x), floor(y), floor(z))
+        if cell == self.cell:
+            return
+        self.cell = cell
+        changes = []
+        for kind in self.kinds:
+            old = self.current[kind]
+            new = self._lookup(kind, *cell)
+            if old != new:
+                self.current[kind] = new
+                changes.append(
+                    (
+                        kind,
+                        [i for i in old if i not in new],
+                        [i for i in new if i not in old],
+                    )
+                )
+        # everything is left before anything is entered, so e.g. the new reverb wins over the old one.
+        # regions are approached before they're entered and departed after they're left.
+        for kind, left, _ in changes:
+            self._fire(kind, left, False)
+        for kind, _, entered in reversed(changes):
+            self._fire(kind, entered, True)
+
+    def refresh(self):
+        """looks the regions up again even if the point hasn't moved, for when regions were added or removed"""
+        self.cell = None
+        if self.position:
+            self.update(*self.position)
+
+    def clear(self):
+        """leaves every region"""
+        for kind in self.kinds:
+            self._fire(kind, self.current[kind], False)
+            self.current[kind] = []
+        self.cell = None
@@ -0,0 +1,106 @@
+import heapq
+import itertools
+
+
+class Timer:
+    """a handle to a function scheduled on a Scheduler.
+    you don't create these yourself, Scheduler.call_after and Scheduler.call_every return them.
+    """
+
+    def __init__(self, scheduler, deadline, function, interval=None):
+        self.scheduler = scheduler
+        self.deadline = deadline
+        self.function = function
+        self.interval = interval
+        self.cancelled = False
+        self.fired = False
+
+    @property
+    def active(self):
+        """true if the timer is still going to fire at least once more"""
+        return not self.cancelled and (self.interval is not None or not self.fired)
+
+    def cancel(self):
+        """prevents the timer from firing again. cancelling an already cancelled or fired timer does nothing."""
+        self.scheduler.cancel(self)
+
+
+class Scheduler:
+    """runs functions once their deadline has passed, in deadline order.
+    timers are kept in a heap ordered by (deadline, insertion order), so scheduling costs O(log n),
+    cancelling costs O(1) (cancelled timers are skipped when they reach the top of the heap),
+    and update only ever looks at the timers that are actually due.
+    params:
+    now (float): the time (in ms) the scheduler starts at
+    """
+
+    def __init__(self, now=0):
+        self.now = now
+        self._heap = []
+        self._counter = itertools.count()
+        self._cancelled = 0
+
+    def __len__(self):
+        """the number of timers that are still pending"""
+        return len(self._heap) - self._cancelled
+
+    def _push(self, timer):
+        heapq.heappush(self._heap, (timer.deadline, next(self._counter), timer))
+
+    def call_after(self, time, function):
+        """call {function} after {time}ms. returns a Timer that can be cancelled before it fires."""
+        timer = Timer(self, self.now + time, function)
+        self._push(timer)
+        return timer
+
+    def call_every(self, interval, function, delay=None):
+        """call {function} every {interval}ms until the returned Timer is cancelled.
+        the first call happens after {delay}ms, or after {interval}ms if no delay is given.
+        """
+        timer = Timer(
+            self, self.now + (interval if delay is None else delay), function, interval
+        )
+        self._push(timer)
+        return timer
+
+    def cancel(self, timer):
+        if timer.active:
+            timer.cancelled = True
+            self._cancelled += 1
+            # a lot of cancelled timers can pile up behind a far deadline, rebuild the heap once they are the majority.
+            # it is rebuilt in place, update may be walking it from a timer that is cancelling others.
+            if self._cancelled > 64 and self._cancelled * 2 > len(self._heap):
+                self._heap[:] = [i for i in self._heap if not i[2].cancelled]
+                heapq.heapify(self._heap)
+                self._cancelled = 0
+
+    def clear(self):
+        """cancels every pending timer"""
+        for *_, timer in self._heap:
+            timer.cancelled = True
+        self._heap.clear()
+        self._cancelled = 0
+
+    def update(self, now):
+        """advances the scheduler to {now} and runs every timer whose deadline has passed.
+        timers scheduled while this runs (including repeating timers being rescheduled) wait for the next update,
+        even if they are already due.
+        """
+        self.now = now
+        heap = self._heap
+        limit = next(self._counter)
+        while heap and heap[0][0] <= now and heap[0][1] < limit:
+            timer = heapq.heappop(heap)[2]
+            if timer.cancelled:
+                self._cancelled -= 1
+                continue
+            if timer.interval is None:
+                timer.fired = True
+            else:
+                timer.deadline += timer.interval
+                if timer.deadline <= now:
+                    # we fell behind, don't fire a burst of catch-up calls.
+                    timer.deadline = now + timer.interval
+                self._push(timer)
+            if callable(timer.function):
+                timer.function()
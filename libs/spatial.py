@@ -0,0 +1,269 @@
+import itertools
+from bisect import insort
+
+
+class GridIndex:
+    """a bucketed 3D grid of axis aligned boxes.
+    every box is stored in each cell of {cell_size}³ units it overlaps, so point queries only look at the boxes
+    sharing the point's cell instead of every box on the map.
+    each box gets an order when it is inserted (insertion order unless given explicitly), and query results
+    always come back in that order, so the last inserted box covering a point can still win.
+    params:
+    cell_size (int, optional): the width, depth and height of a cell
+    """
+
+    def __init__(self, cell_size=16):
+        self.cell_size = cell_size
+        self._cells = {}
+        self._entries = {}
+        self._order = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, item):
+        return item in self._entries
+
+    def _cell_range(self, minx, maxx, miny, maxy, minz, maxz):
+        cs = self.cell_size
+        return itertools.product(
+            range(int(minx // cs), int(maxx // cs) + 1),
+            range(int(miny // cs), int(maxy // cs) + 1),
+            range(int(minz // cs), int(maxz // cs) + 1),
+        )
+
+    def insert(self, item, minx, maxx, miny, maxy, minz, maxz, order=None):
+        """adds {item} covering the given box. if {order} is None the item goes after every item inserted so far."""
+        if item in self._entries:
+            self.remove(item)
+        if order is None:
+            order = next(self._order)
+        entry = (order, id(item), minx, maxx, miny, maxy, minz, maxz, item)
+        self._entries[item] = entry
+        for key in self._cell_range(minx, maxx, miny, maxy, minz, maxz):
+            cell = self._cells.get(key)
+            if cell is None:
+                self._cells[key] = [entry]
+            elif cell[-1][0] <= order:
+                cell.append(entry)
+            else:
+                insort(cell, entry)
+
+    def remove(self, item):
+        """removes {item}. does nothing if it isn't in the index."""
+        entry = self._entries.pop(item, None)
+        if entry is None:
+            return
+        for key in self._cell_range(*entry[2:8]):
+            cell = self._cells[key]
+            cell.remove(entry)
+            if not cell:
+                del self._cells[key]
+
+    def clear(self):
+        self._cells.clear()
+        self._entries.clear()
+
+    def box_of(self, item):
+        """returns (minx, maxx, miny, maxy, minz, maxz) of {item}"""
+        return self._entries[item][2:8]
+
+    def order_of(self, item):
+        return self._entries[item][0]
+
+    def _cell_at(self, x, y, z):
+        cs = self.cell_size
+        return self._cells.get((int(x // cs), int(y // cs), int(z // cs)), ())
+
+    def query_point(self, x, y, z):
+        """yields every item covering (x, y, z), in order"""
+        for order, _, minx, maxx, miny, maxy, minz, maxz, item in self._cell_at(
+            x, y, z
+        ):
+            if minx <= x <= maxx and miny <= y <= maxy and minz <= z <= maxz:
+                yield item
+
+    def first_at(self, x, y, z):
+        """returns the first item covering (x, y, z), or None"""
+        return next(self.query_point(x, y, z), None)
+
+    def last_at(self, x, y, z, predicate=None):
+        """returns the last item covering (x, y, z) for which {predicate}(item) is true (any item if no predicate
+        is given), or None. walks the cell backwards in place, allocating nothing"""
+        for order, _, minx, maxx, miny, maxy, minz, maxz, item in reversed(
+            self._cell_at(x, y, z)
+        ):
+            if (
+                minx <= x <= maxx
+                and miny <= y <= maxy
+                and minz <= z <= maxz
+                and (predicate is None or predicate(item))
+            ):
+                return item
+        return None
+
+    def query_box(self, minx, maxx, miny, maxy, minz, maxz):
+        """returns a list of every item overlapping the given box, in order"""
+        found = {}
+        for key in self._cell_range(minx, maxx, miny, maxy, minz, maxz):
+            for entry in self._cells.get(key, ()):
+                if (
+                    entry[2] <= maxx
+                    and entry[3] >= minx
+                    and entry[4] <= maxy
+                    and entry[5] >= miny
+                    and entry[6] <= maxz
+                    and entry[7] >= minz
+                ):
+                    found[entry[8]] = entry
+        return [i[8] for i in sorted(found.values())]
+
+    def items(self):
+        """returns every item in the index, in order"""
+        return [i[8] for i in sorted(self._entries.values())]
+
+
+class SpatialHash:
+    """a hash of points (usually entities) by the {cell_size}³ cell they are in.
+    moving an item only touches its old and new cell, and radius, box and nearest neighbour queries only look
+    at the cells around the query instead of every item.
+    params:
+    cell_size (int, optional): the width, depth and height of a cell
+    """
+
+    def __init__(self, cell_size=8):
+        self.cell_size = cell_size
+        self._cells = {}
+        self._positions = {}
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, item):
+        return item in self._positions
+
+    def _key(self, x, y, z):
+        cs = self.cell_size
+        return (int(x // cs), int(y // cs), int(z // cs))
+
+    def insert(self, item, x, y, z):
+        if item in self._positions:
+            return self.move(item, x, y, z)
+        key = self._key(x, y, z)
+        self._positions[item] = (x, y, z, key)
+        self._cells.setdefault(key, {})[item] = None
+
+    def move(self, item, x, y, z):
+        """updates the position of {item}. does nothing if it isn't in the hash"""
+        old = self._positions.get(item)
+        if old is None:
+            return
+        key = self._key(x, y, z)
+        self._positions[item] = (x, y, z, key)
+        if key != old[3]:
+            self._discard(item, old[3])
+            self._cells.setdefault(key, {})[item] = None
+
+    def _discard(self, item, key):
+        cell = self._cells[key]
+        del cell[item]
+        if not cell:
+            del self._cells[key]
+
+    def remove(self, item):
+        old = self._positions.pop(item, None)
+        if old is not None:
+            self._discard(item, old[3])
+
+    def clear(self):
+        self._cells.clear()
+        self._positions.clear()
+
+    def position_of(self, item):
+        return self._positions[item][:3]
+
+    def query_point(self, x, y, z):
+        """returns the items exactly at (x, y, z)"""
+        return [
+            i
+            for i in self._cells.get(self._key(x, y, z), ())
+            if self._positions[i][:3] == (x, y, z)
+        ]
+
+    def query_box(self, minx, maxx, miny, maxy, minz, maxz):
+        """returns the items inside a box"""
+        if not self._cells:
+            return []
+        lo = self._key(minx, miny, minz)
+        hi = self._key(maxx, maxy, maxz)
+        found = []
+        count = (hi[0] - lo[0] + 1) * (hi[1] - lo[1] + 1) * (hi[2] - lo[2] + 1)
+        if count > len(self._cells):
+            # the box covers more cells than are occupied, just look at the occupied ones.
+            keys = [
+                i for i in self._cells if all(a <= c <= b for a, c, b in zip(lo, i, hi))
+            ]
+        else:
+            keys = itertools.product(
+                range(lo[0], hi[0] + 1),
+                range(lo[1], hi[1] + 1),
+                range(lo[2], hi[2] + 1),
+            )
+        for key in keys:
+            for item in self._cells.get(key, ()):
+                x, y, z, _ = self._positions[item]
+                if minx <= x <= maxx and miny <= y <= maxy and minz <= z <= maxz:
+                    found.append(item)
+        return found
+
+    def query_radius(self, x, y, z, radius):
+        """returns the items within {radius} of (x, y, z), nearest first"""
+        found = []
+        for item in self.query_box(
+            x - radius, x + radius, y - radius, y + radius, z - radius, z + radius
+        ):
+            ix, iy, iz, _ = self._positions[item]
+            distance = (ix - x) ** 2 + (iy - y) ** 2 + (iz - z) ** 2
+            if distance <= radius * radius:
+                found.append((distance, item))
+        found.sort(key=lambda i: i[0])
+        return [i[1] for i in found]
+
+    def nearest(self, x, y, z, k=1, exclude=None):
+        """returns up to {k} items nearest to (x, y, z), nearest first. {exclude} is never returned.
+        cells are searched in growing rings around the point, and the search stops as soon as no unsearched cell
+        can hold anything closer than what was found"""
+        center = self._key(x, y, z)
+        found = []
+        seen = 0
+        total = len(self._positions) - (exclude in self._positions)
+        ring = 0
+        while seen < total:
+            if (2 * ring + 1) ** 3 > len(self._cells):
+                # the ring has more cells than are occupied, just look at all of them.
+                keys = [
+                    i
+                    for i in self._cells
+                    if max(abs(a - b) for a, b in zip(i, center)) >= ring
+                ]
+            else:
+                r = range(-ring, ring + 1)
+                keys = [
+                    (center[0] + dx, center[1] + dy, center[2] + dz)
+                    for dx, dy, dz in itertools.product(r, r, r)
+                    if max(abs(dx), abs(dy), abs(dz)) == ring
+                ]
+            for key in keys:
+                for item in self._cells.get(key, ()):
+                    if item is exclude:
+                        continue
+                    seen += 1
+                    ix, iy, iz, _ = self._positions[item]
+                    found.append(((ix - x) ** 2 + (iy - y) ** 2 + (iz - z) ** 2, item))
+            found.sort(key=lambda i: i[0])
+            # anything in the next ring is at least ring * cell_size away.
+            reach = ring * self.cell_size
+            if len(found) >= k and found[k - 1][0] <= reach * reach:
+                break
+            ring += 1
+        return [i[1] for i in found[:k]]
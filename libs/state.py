@@ -1,10 +1,20 @@
 import contextlib
 from .speech import speak
+from . import audio
 class State: 
+    # the sounds this state plays, see preload_sounds.
+    sound_manifest = ()
     def __init__(self, game, parrent = None): 
         self.game = game
         self.parrent = parrent
         self.substates = []
+        # pausing or scaling this pauses or scales every clock created in this state.
+        self.time_domain = game.new_domain(parrent.time_domain if parrent else None)
+    @classmethod
+    def preload_sounds(cls):
+        """starts loading {sound_manifest} in the background (see audio.preload). call it while the state before this one is still running, so the first sounds of this one don't stall the game.
+        returns the futures"""
+        return audio.preload(cls.sound_manifest)
     def enter(self): 
         for i in self.substates: 
             if isinstance(i, State): 
@@ -1,5 +1,7 @@
+# the 16 compass points, each covering 22.5 degrees centered on its own direction.
+directions=["North","NorthNorthEast","NorthEast","EastNorthEast","East","EastSouthEast", "SouthEast", "SouthSouthEast","South","SouthSouthWest","SouthWest","WestSouthWest","West","WestNorthWest","NorthWest","NorthNorthWest"]
+
 def direction(num):
     '''return's a string representation of {direction}'''
     val=int((num/22.5)+.5)
-    arr=["North","NorthNorthEast","NorthEast","EastNorthEast","East","EastSouthEast", "SouthEast", "SouthSouthEast","South","SouthSouthWest","SouthWest","WestSouthWest","West","WestNorthWest","NorthWest","NorthNorthWest"]
-    return arr[(val % 16)]
\ No newline at end of file
+    return directions[(val % 16)]
\ No newline at end of file
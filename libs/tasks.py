@@ -0,0 +1,159 @@
+import heapq
+import itertools
+from collections import deque
+
+
+class _Waitable:
+    """something a task can yield (in a generator) or await (in an async def) to be resumed later"""
+
+    __slots__ = ()
+
+    def __await__(self):
+        yield self
+
+
+class wait(_Waitable):
+    """resumes the task after {time}ms"""
+
+    __slots__ = ("time",)
+
+    def __init__(self, time):
+        self.time = time
+
+
+class until(_Waitable):
+    """resumes the task on the first frame {predicate}() is true. it is checked once per frame"""
+
+    __slots__ = ("predicate",)
+
+    def __init__(self, predicate):
+        self.predicate = predicate
+
+
+class next_frame(_Waitable):
+    """resumes the task on the next frame"""
+
+    __slots__ = ()
+
+
+class Task:
+    """a coroutine being run by a TaskRunner. you don't create these yourself, TaskRunner.spawn returns them."""
+
+    __slots__ = ("runner", "coroutine", "done", "cancelled", "result")
+
+    def __init__(self, runner, coroutine):
+        self.runner = runner
+        self.coroutine = coroutine
+        self.done = False
+        self.cancelled = False
+        self.result = None
+
+    def cancel(self):
+        """stops the task where it is waiting. cancelling a finished task does nothing"""
+        if not self.done:
+            self.done = True
+            self.cancelled = True
+            self.coroutine.close()
+
+
+class TaskRunner:
+    """runs generator and async def coroutines cooperatively, for scripted sequences like cutscenes, AI routines
+    and sound sequences.
+    a task runs until it yields (or awaits) wait(ms), until(predicate) or next_frame(), and is resumed once that is
+    satisfied. yielding None is the same as next_frame(). every task that can go on is put on one ready queue and
+    resumed from it once per update, so a waiting task costs a heap entry (wait) or a list slot (until, next_frame)
+    and no closure, timer or clock.
+    params:
+    now (float): the time (in ms) the runner starts at
+    """
+
+    def __init__(self, now=0):
+        self.now = now
+        self._sleeping = []
+        self._counter = itertools.count()
+        self._polling = []
+        self._next_frame = []
+        self._ready = deque()
+
+    def __len__(self):
+        """the number of unfinished tasks"""
+        return sum(
+            not i.done
+            for i in itertools.chain(
+                (i[2] for i in self._sleeping),
+                (i[0] for i in self._polling),
+                self._next_frame,
+                self._ready,
+            )
+        )
+
+    def spawn(self, coroutine):
+        """starts running {coroutine} (a generator or the coroutine of an async def, or a function returning one)
+        on the next update. returns its Task"""
+        if callable(coroutine):
+            coroutine = coroutine()
+        task = Task(self, coroutine)
+        self._ready.append(task)
+        return task
+
+    def clear(self):
+        """cancels every task"""
+        for task in itertools.chain(
+            (i[2] for i in self._sleeping),
+            (i[0] for i in self._polling),
+            self._next_frame,
+            self._ready,
+        ):
+            task.cancel()
+        self._sleeping.clear()
+        self._polling.clear()
+        self._next_frame.clear()
+        self._ready.clear()
+
+    def _park(self, task, waitable):
+        if waitable is None or isinstance(waitable, next_frame):
+            self._next_frame.append(task)
+        elif isinstance(waitable, wait):
+            heapq.heappush(
+                self._sleeping, (self.now + waitable.time, next(self._counter), task)
+            )
+        elif isinstance(waitable, until):
+            self._polling.append((task, waitable.predicate))
+        else:
+            task.cancel()
+            raise TypeError(f"a task can't wait for {waitable!r}")
+
+    def update(self, now):
+        """advances the runner to {now} and resumes every task that can go on. called once per frame by the game"""
+        self.now = now
+        ready = self._ready
+        ready.extend(self._next_frame)
+        self._next_frame = []
+        sleeping = self._sleeping
+        while sleeping and sleeping[0][0] <= now:
+            ready.append(heapq.heappop(sleeping)[2])
+        if self._polling:
+            polling = []
+            for entry in self._polling:
+                if entry[0].done:
+                    continue
+                if entry[1]():
+                    ready.append(entry[0])
+                else:
+                    polling.append(entry)
+            self._polling = polling
+        # tasks parked while this runs wait for the next update, even if they are already due.
+        for _ in range(len(ready)):
+            task = ready.popleft()
+            if task.done:
+                continue
+            try:
+                waitable = task.coroutine.send(None)
+            except StopIteration as e:
+                task.done = True
+                task.result = e.value
+                continue
+            except BaseException:
+                task.done = True
+                raise
+            self._park(task, waitable)
@@ -0,0 +1,118 @@
+import numpy as np
+
+
+class TileRaster:
+    """a dense 3D array of tile ids covering a bounded map.
+    every coordinate from (minx, miny, minz) to (maxx, maxy, maxz) of the map holds a small integer, and
+    palette[id] is the tiletype at that coordinate (id 0 is the blank tiletype, no tile).
+    a coordinate costs one byte while the map has less than 256 tiletypes and two bytes after that.
+    params:
+    map (world_map.Map): the map to rasterize. its bounds decide the size of the raster
+    """
+
+    def __init__(self, map):
+        self.map = map
+        self.origin = (map.minx, map.miny, map.minz)
+        self.shape = (
+            map.maxx - map.minx + 1,
+            map.maxy - map.miny + 1,
+            map.maxz - map.minz + 1,
+        )
+        self.palette = [""]
+        self._palette_ids = {"": 0}
+        self._decoder = np.array(self.palette, dtype=object)
+        self.ids = np.zeros(self.shape, dtype=np.uint8)
+
+    @property
+    def nbytes(self):
+        """the memory used by the raster's array, in bytes"""
+        return self.ids.nbytes
+
+    def id_of(self, tiletype):
+        """returns the palette id of {tiletype}, adding it to the palette if it is new"""
+        tile_id = self._palette_ids.get(tiletype)
+        if tile_id is None:
+            tile_id = len(self.palette)
+            self.palette.append(tiletype)
+            self._palette_ids[tiletype] = tile_id
+            self._decoder = np.array(self.palette, dtype=object)
+            if tile_id > np.iinfo(self.ids.dtype).max:
+                self.ids = self.ids.astype(np.uint16)
+        return tile_id
+
+    def decode(self, ids):
+        """turns an array of tile ids into an array of tiletypes"""
+        return self._decoder[ids]
+
+    def contains(self, x, y, z):
+        ox, oy, oz = self.origin
+        sx, sy, sz = self.shape
+        return 0 <= x - ox < sx and 0 <= y - oy < sy and 0 <= z - oz < sz
+
+    def _slices(self, minx, maxx, miny, maxy, minz, maxz):
+        """converts an inclusive map box into array slices, clipped to the raster. returns None if nothing is left"""
+        slices = []
+        for lo, hi, origin, size in zip(
+            (minx, miny, minz), (maxx, maxy, maxz), self.origin, self.shape
+        ):
+            lo = max(int(lo) - origin, 0)
+            hi = min(int(hi) - origin + 1, size)
+            if lo >= hi:
+                return None
+            slices.append(slice(lo, hi))
+        return tuple(slices)
+
+    def bake(self):
+        """rebuilds the whole raster from the map's tiles"""
+        self.ids[...] = 0
+        for tile in self.map.iter_tiles():
+            self.paint(tile)
+
+    def paint(self, tile, box=None):
+        """draws {tile} over whatever is in the raster, optionally clipped to {box}"""
+        minx, maxx, miny, maxy, minz, maxz = (
+            tile.minx,
+            tile.maxx,
+            tile.miny,
+            tile.maxy,
+            tile.minz,
+            tile.maxz,
+        )
+        if box:
+            minx, miny, minz = max(minx, box[0]), max(miny, box[2]), max(minz, box[4])
+            maxx, maxy, maxz = min(maxx, box[1]), min(maxy, box[3]), min(maxz, box[5])
+        sl = self._slices(minx, maxx, miny, maxy, minz, maxz)
+        if sl:
+            self.ids[sl] = self.id_of(tile.tiletype)
+
+    def repaint(self, minx, maxx, miny, maxy, minz, maxz):
+        """rebuilds a box of the raster from the tiles overlapping it, for when a tile was removed"""
+        sl = self._slices(minx, maxx, miny, maxy, minz, maxz)
+        if sl is None:
+            return
+        self.ids[sl] = 0
+        box = (minx, maxx, miny, maxy, minz, maxz)
+        for tile in self.map.get_tiles_in_box(*box):
+            self.paint(tile, box)
+
+    def id_at(self, x, y, z):
+        ox, oy, oz = self.origin
+        return self.ids[x - ox, y - oy, z - oz]
+
+    def tile_at(self, x, y, z):
+        """returns the tiletype at integer coordinates that are inside the raster"""
+        return self.palette[self.id_at(x, y, z)]
+
+    def ids_in_box(self, minx, maxx, miny, maxy, minz, maxz):
+        """returns a view of the tile ids inside a box, clipped to the raster"""
+        sl = self._slices(minx, maxx, miny, maxy, minz, maxz)
+        return self.ids[sl] if sl else np.zeros((0, 0, 0), dtype=self.ids.dtype)
+
+    def tiles_in_box(self, minx, maxx, miny, maxy, minz, maxz):
+        """returns an array of the tiletypes inside a box, clipped to the raster"""
+        return self.decode(self.ids_in_box(minx, maxx, miny, maxy, minz, maxz))
+
+    def column(self, x, y):
+        """returns a view of the tile ids from the bottom to the top of the map at (x, y)"""
+        ox, oy, oz = self.origin
+        return self.ids[x - ox, y - oy, :]
@@ -1,10 +1,18 @@
 import contextlib
-from . import audio, consts, options
+from math import floor
+from . import audio, consts, options, spatial, tile_raster, map_format, world_stream, regions, navigation, raycast, entity_scheduler, entity_store, columns, scheduler, tasks
 from .objects import entity
 
 
+def _has_tiletype(tile):
+    # overlay tiles set to None let the tiles below show through.
+    return tile.tiletype is not None
+
+
 class Map:
-    def __init__(self, game, minx=0, miny=0, minz=0, maxx=0, maxy=0, maxz=0):
+    def __init__(
+        self, game, minx=0, miny=0, minz=0, maxx=0, maxy=0, maxz=0, parent_domain=None
+    ):
         """Constructs a basic map:
         params:
         minx (int): Minimum x of the map
@@ -12,8 +20,14 @@ class Map:
         minz (int): Minimum Z of the map
         maxx (int): Maximum x of the map
         maxy (int): Maximum y of the map
-        maxz (int): Maximum z of the map"""
+        maxz (int): Maximum z of the map
+        parent_domain (clock.TimeDomain, optional): the time domain the map's own domain follows. defaults to game time"""
         self.game = game
+        # every entity clock on the map lives in this domain, pause it to freeze the map.
+        self.time_domain = game.new_domain(parent_domain)
+        # timers and tasks belonging to the map run on its time, so they stop when it is paused. see call_after.
+        self.scheduler = scheduler.Scheduler(self.time_domain.time)
+        self.tasks = tasks.TaskRunner(self.time_domain.time)
         self.minx, self.miny, self.minz = minx, miny, minz
         self.maxx = maxx
         self.maxy = maxy
@@ -27,7 +41,73 @@ class Map:
         self.ambience_list = []
         self.music_list=[]
         self.reverb_list = []
+        # spatial indexes over the lists above, so lookups only test the boxes near a point.
+        self.tile_index = spatial.GridIndex()
+        self.door_index = spatial.GridIndex()
+        self.zone_index = spatial.GridIndex()
+        self.ambience_index = spatial.GridIndex()
+        self.music_index = spatial.GridIndex()
+        self.reverb_index = spatial.GridIndex()
+        # mutable tiles (doors, breakable walls, bridges) kept apart from the static geometry. they win over it where they overlap.
+        self.overlay_list = []
+        self.overlay_index = spatial.GridIndex()
+        # functions called with (minx, maxx, miny, maxy, minz, maxz) whenever tiles in that box change.
+        self.tile_listeners = []
+        # where falls land, see columns.ColumnIndex.
+        self.columns = columns.ColumnIndex(self)
+        # pathfinding over the tiles, created the first time it is needed. see find_path.
+        self.navigator = None
+        # optional dense array of tile ids, see bake_tiles.
+        self.raster = None
+        # tiles and zones of a compiled map file, see load. they come before anything spawned at runtime.
+        self.static = None
+        # loads the stateful objects of a compiled map around the camera, see stream.
+        self.streamer = None
+        # fires enter/leave events as the camera moves between regions, see camera.Camera.regions.
+        self.regions = regions.RegionTracker(self, options.get("ambience_approach_distance", 10))
+        self.regions.add_listener("ambience", Ambience.enter, Ambience.leave)
+        self.regions.add_listener("music", Ambience.enter, Ambience.leave)
+        self.regions.add_listener("nearby_ambience", Ambience.approach, Ambience.depart)
+        self.regions.add_listener("nearby_music", Ambience.approach, Ambience.depart)
+        self.regions.add_listener("reverb", self.enter_reverb, self.leave_reverb)
         self.entities = {}
+        # the positions of the entities in self.entities, kept up to date by Entity.move.
+        self.entity_hash = spatial.SpatialHash()
+        # ticks only the entities that have something to do, see entity_scheduler.EntityScheduler.
+        self.entity_scheduler = entity_scheduler.EntityScheduler(self)
+        self.add_tile_listener(self.entity_scheduler.wake_in_box)
+        # optional arrays holding the state of every entity, see use_entity_store.
+        self.entity_store = None
+
+    @classmethod
+    def load(cls, game, path, parent_domain=None, stream=False):
+        """Loads a map compiled with map_format.compile_map.
+        The file is memory mapped, and its tiles and zones are only turned into objects when a query needs them,
+        so loading takes about the same time however big the map is. Doors, ambiences, music and reverbs are spawned
+        as usual since they hold state.
+        params:
+        game (game.Game): the game
+        path (str): the compiled map file
+        parent_domain (clock.TimeDomain, optional): see Map
+        stream (bool, optional): don't spawn anything yet, leave it to a ChunkStreamer. see stream
+        Return Value:
+        the loaded map"""
+        static = map_format.CompiledMap(path)
+        minx, miny, minz, maxx, maxy, maxz = static.bounds
+        self = cls(game, minx, miny, minz, maxx, maxy, maxz, parent_domain)
+        self.static = static
+        if stream:
+            return self
+        s = static.string
+        for r in static.doors.tolist():
+            self.spawn_door(*r[:6], s(r[6]), s(r[7]))
+        for r in static.ambiences.tolist():
+            self.spawn_ambience(*r[:6], s(r[6]), r[8])
+        for r in static.musics.tolist():
+            self.spawn_music(*r[:6], s(r[6]))
+        for r in static.reverbs.tolist():
+            self.spawn_reverb(*r[:6], r[8], r[9])
+        return self
 
     def in_bound(self, x, y, z):
         """verifies whether the hole map covers a certain coordinate
@@ -38,9 +118,9 @@ class Map:
         returns:
         (bool) true if the objects covers this coordinate, or false if otherwise
         """
-        x = int(x)
-        y = int(y)
-        z = int(z)
+        x = floor(x)
+        y = floor(y)
+        z = floor(z)
         return (
             x >= self.minx
             and x <= self.maxx
@@ -50,11 +130,51 @@ class Map:
             and z <= self.maxz
         )
 
+    def stream(self, camera, chunk_size=32, radius=2):
+        """Starts streaming the doors, ambiences, music and reverbs of a map loaded with stream=True around {camera}'s focus object.
+        Entities outside the loaded chunks stop being updated. See world_stream.ChunkStreamer.
+        Return Value:
+        the ChunkStreamer"""
+        self.streamer = world_stream.ChunkStreamer(self, camera, chunk_size, radius)
+        return self.streamer
+
+    def call_after(self, time, function):
+        """call {function} after {time}ms of map time. returns a timer that can be cancelled"""
+        return self.scheduler.call_after(time, function)
+
+    def call_every(self, interval, function, delay=None):
+        """call {function} every {interval}ms of map time. returns a timer that can be cancelled"""
+        return self.scheduler.call_every(interval, function, delay)
+
+    def start_task(self, coroutine):
+        """like Game.start_task, but the task waits in map time and is cancelled when the map is destroyed"""
+        return self.tasks.spawn(coroutine)
+
+    def enter_reverb(self, reverb):
+        audio.set_global_reverb(reverb.reverb)
+
+    def leave_reverb(self, reverb):
+        audio.set_global_reverb(None)
+
     def loop(self):
-        for i in self.entities.values():
-            i.loop()
+        if self.streamer:
+            self.streamer.update()
+        if self.entity_store is not None:
+            self.entity_store.update()
+        self.entity_scheduler.update()
+        now = self.time_domain.time
+        self.scheduler.update(now)
+        self.tasks.update(now)
 
     def destroy(self, destroy_entities=True):
+        if self.streamer:
+            self.streamer.stop()
+            self.streamer = None
+        self.regions.clear()
+        self.columns.destroy()
+        if self.navigator:
+            self.navigator.destroy()
+            self.navigator = None
         audio.set_global_reverb(None)
         for i in self.reverb_list.copy():
             i.destroy()
@@ -62,8 +182,11 @@ class Map:
             for i in self.entities.values():
                 i.destroy()
             self.entities.clear()
+            self.entity_hash.clear()
+            self.entity_scheduler.clear()
         self.reverb_list.clear()
         self.tile_list.clear()
+        self.overlay_list.clear()
         self.zone_list.clear()
         self.door_list.clear()
         for i in self.ambience_list.copy():
@@ -72,16 +195,178 @@ class Map:
         for i in self.music_list.copy():
             i.leave(destroy=True)
         self.music_list.clear()
+        self.scheduler.clear()
+        self.tasks.clear()
+        for i in (
+            self.tile_index,
+            self.door_index,
+            self.zone_index,
+            self.ambience_index,
+            self.music_index,
+            self.reverb_index,
+            self.overlay_index,
+        ):
+            i.clear()
+        self.raster = None
+        if self.static:
+            self.static.close()
+            self.static = None
+
+    def _add(self, objects, index, obj):
+        """appends {obj} to {objects} and inserts it into {index} with its bounds"""
+        objects.append(obj)
+        index.insert(obj, obj.minx, obj.maxx, obj.miny, obj.maxy, obj.minz, obj.maxz)
+        return obj
+
+    def _remove(self, objects, index, obj):
+        index.remove(obj)
+        with contextlib.suppress(ValueError):
+            objects.remove(obj)
+
+    def detach(self, obj):
+        """Takes a door, ambience, music or reverb off the map.
+        Return Value:
+        a function that frees its audio. it can be called later, on the main thread"""
+        if isinstance(obj, Door):
+            self._remove(self.door_list, self.door_index, obj)
+            for i in (obj.base, obj.upper):
+                if i:
+                    self.remove_dynamic_tile(i)
+            return obj.src.destroy
+        if isinstance(obj, Reverb):
+            self._remove(self.reverb_list, self.reverb_index, obj)
+            return obj.destroy
+        if obj in self.music_index:
+            self._remove(self.music_list, self.music_index, obj)
+        else:
+            self._remove(self.ambience_list, self.ambience_index, obj)
+        return lambda: obj.leave(destroy=True)
+
+    def add_tile_listener(self, listener):
+        """Calls {listener}(minx, maxx, miny, maxy, minz, maxz) whenever the tiles inside that box change,
+        so caches built from tiles (footsteps, occlusion, navigation) can drop just that part"""
+        self.tile_listeners.append(listener)
+
+    def remove_tile_listener(self, listener):
+        with contextlib.suppress(ValueError):
+            self.tile_listeners.remove(listener)
+
+    def _tiles_changed(self, tile):
+        box = (tile.minx, tile.maxx, tile.miny, tile.maxy, tile.minz, tile.maxz)
+        for i in self.tile_listeners.copy():
+            i(*box)
+
+    def _paint_overlay(self, tile, after=None):
+        """paints the overlay tiles overlapping {tile} back over it in the raster, or only those spawned after {after}"""
+        box = (tile.minx, tile.maxx, tile.miny, tile.maxy, tile.minz, tile.maxz)
+        overlays = self.overlay_index.query_box(*box)
+        if after is not None:
+            overlays = overlays[overlays.index(after) + 1 :]
+        for i in overlays:
+            if i.tiletype is not None:
+                self.raster.paint(i, box)
+
+    def add_tile(self, tile):
+        """adds a tile after every existing tile, so it takes priority over them where they overlap.
+        the overlay tiles (doors, dynamic tiles) stay on top of it"""
+        self._add(self.tile_list, self.tile_index, tile)
+        if self.raster:
+            self.raster.paint(tile)
+            self._paint_overlay(tile)
+        self._tiles_changed(tile)
+        return tile
+
+    def remove_tile(self, tile):
+        """removes a tile. does nothing if the tile isn't on the map"""
+        if tile in self.tile_index:
+            self.tile_index.remove(tile)
+            self.tile_list.remove(tile)
+            if self.raster:
+                self.raster.repaint(
+                    tile.minx, tile.maxx, tile.miny, tile.maxy, tile.minz, tile.maxz
+                )
+            self._tiles_changed(tile)
+
+    def spawn_dynamic_tile(self, minx=0, maxx=0, miny=0, maxy=0, minz=0, maxz=0, type=""):
+        """Spawns a tile on the overlay layer, on top of all the static geometry.
+        Its type can be changed with set_tile_type at no cost to the rest of the map
+        Params:
+        minx (int): The minimum x of the tile
+        maxx (int): The maximum x of the tile
+        miny (int): The minimum y of the tile
+        maxy (int): The maximum y of the tile
+        minz (int): The minimum z of the tile
+        maxz (int): The maximum z of the tile
+        type (str): the tiletype, or None to let the static tiles below show through
+        Return Value:
+        the DynamicTile"""
+        tile = self._add(
+            self.overlay_list,
+            self.overlay_index,
+            DynamicTile(minx, maxx, miny, maxy, minz, maxz, type),
+        )
+        if self.raster and type is not None:
+            self.raster.paint(tile)
+        self._tiles_changed(tile)
+        return tile
+
+    def set_tile_type(self, tile, type):
+        """Changes the type of a DynamicTile, e.g. to open a door or break a wall.
+        Only the tile's own box is touched, and the tile listeners are told about it"""
+        if tile.tiletype == type:
+            return
+        tile.tiletype = type
+        if self.raster:
+            if type is None:
+                self.raster.repaint(
+                    tile.minx, tile.maxx, tile.miny, tile.maxy, tile.minz, tile.maxz
+                )
+            else:
+                self.raster.paint(tile)
+                self._paint_overlay(tile, after=tile)
+        self._tiles_changed(tile)
+
+    def remove_dynamic_tile(self, tile):
+        if tile in self.overlay_index:
+            self._remove(self.overlay_list, self.overlay_index, tile)
+            if self.raster:
+                self.raster.repaint(
+                    tile.minx, tile.maxx, tile.miny, tile.maxy, tile.minz, tile.maxz
+                )
+            self._tiles_changed(tile)
+
+    def _static_tile(self, index):
+        r = self.static.tiles[index].tolist()
+        return Tile(*r[:6], self.static.string(r[6]))
+
+    def _static_zone(self, index):
+        r = self.static.zones[index].tolist()
+        return Zone(*r[:6], self.static.string(r[6]))
+
+    def iter_tiles(self):
+        """Yields every tile of the map in priority order, compiled tiles first and overlay tiles last"""
+        if self.static:
+            for i in range(len(self.static.tiles)):
+                yield self._static_tile(i)
+        yield from self.tile_index.items()
+        for i in self.overlay_index.items():
+            if i.tiletype is not None:
+                yield i
+
+    def bake_tiles(self):
+        """Bakes the tiles of the map into a TileRaster covering minx..maxz, so get_tile_at becomes a single array lookup.
+        The raster is kept up to date as tiles are spawned and doors are opened or closed.
+        Return Value:
+        the TileRaster"""
+        self.raster = tile_raster.TileRaster(self)
+        self.raster.bake()
+        return self.raster
 
     def get_ambiences_at(self, x, y, z):
-        for i in self.ambience_list:
-            if i.in_bound(x, y, z):
-                yield i
+        return self.ambience_index.query_point(floor(x), floor(y), floor(z))
 
     def get_musics_at(self, x, y, z):
-        for i in self.music_list:
-            if i.in_bound(x, y, z):
-                yield i
+        return self.music_index.query_point(floor(x), floor(y), floor(z))
 
     def get_tile_at(self, x, y, z):
         """Returns a tile at a specified coordinates
@@ -91,11 +376,62 @@ class Map:
         z (int): The z coordinate from which a tile will be retrieved
         Return Value:
         A blank string if a tile wasn't found or a tiletype which is within the x, y, and z coordinate"""
-        found_responses = ""
-        for i in self.tile_list:
-            if i.in_bound(x, y, z):
-                found_responses = i.tiletype
-        return found_responses
+        x, y, z = floor(x), floor(y), floor(z)
+        if self.raster and self.raster.contains(x, y, z):
+            return self.raster.tile_at(x, y, z)
+        tile = self.overlay_index.last_at(x, y, z, _has_tiletype)
+        if tile:
+            return tile.tiletype
+        tile = self.tile_index.last_at(x, y, z)
+        if tile:
+            return tile.tiletype
+        return (self.static and self.static.tile_at(x, y, z)) or ""
+
+    def get_tiles_in_box(self, minx, maxx, miny, maxy, minz, maxz):
+        """Returns every tile overlapping a box, in the order they were spawned"""
+        box = (minx, maxx, miny, maxy, minz, maxz)
+        tiles = self.tile_index.query_box(*box)
+        if self.static:
+            static = self.static.tiles_in_box(*box)
+            tiles = [self._static_tile(i) for i in static] + tiles
+        return tiles + [
+            i for i in self.overlay_index.query_box(*box) if i.tiletype is not None
+        ]
+
+    def find_path(self, start, goal):
+        """Finds a walking path between two points, see navigation.Navigator
+        params:
+        start (tuple): the (x, y, z) to start from
+        goal (tuple): the (x, y, z) to get to
+        Return Value:
+        a list of (x, y, z) cells from start to goal, or None if goal can't be reached"""
+        if not self.navigator:
+            self.navigator = navigation.Navigator(self)
+        return self.navigator.find_path(start, goal)
+
+    def flow_field(self, goal):
+        """Returns a navigation.FlowField that any number of entities can read to walk towards goal, see navigation.Navigator.flow_field.
+        The map has to be baked first, see bake_tiles"""
+        if not self.navigator:
+            self.navigator = navigation.Navigator(self)
+        return self.navigator.flow_field(goal)
+
+    def raycast(self, origins, targets, blocking=navigation.is_blocked):
+        """Casts a batch of rays against the map's tiles, see raycast.raycast. Baked maps cast against their raster,
+        the others look every cell up with get_tile_at
+        params:
+        origins (array like): an (n, 3) array of ray starts
+        targets (array like): an (n, 3) array of ray ends
+        blocking (callable, optional): takes a tiletype and returns true if it stops a ray. walls by default
+        Return Value:
+        (hits, tiletypes, distances) arrays, one entry per ray"""
+        if self.raster:
+            return raycast.raycast(self.raster, origins, targets, blocking)
+        return raycast.raycast_map(self, origins, targets, blocking)
+
+    def line_of_sight(self, x1, y1, z1, x2, y2, z2):
+        """Returns true if nothing blocks the straight line between two points"""
+        return not self.raycast([(x1, y1, z1)], [(x2, y2, z2)])[0][0]
 
     def get_door_at(self, x, y, z):
         """Returns a door at a specified coordinates
@@ -105,36 +441,48 @@ class Map:
         z (int): The z coordinate from which a door will be retrieved
         Return Value:
         Noneif a door wasn't found or a door object  which is within the x, y, and z coordinate"""
-        return next((i for i in self.door_list if i.at_bound(x, y, z)), None)
+        # doors are indexed by the area they can be opened from, see Door.at_bound.
+        return self.door_index.first_at(x, y, z)
 
     def get_zone_at(self, x, y, z):
         """Same as get_tile_at, except deals with zones"""
-        found_responses = ""
-        for i in self.zone_list:
-            if i.in_bound(x, y, z):
-                found_responses = i.zonename
-        return found_responses
+        x, y, z = floor(x), floor(y), floor(z)
+        zone = self.zone_index.last_at(x, y, z)
+        if zone:
+            return zone.zonename
+        return (self.static and self.static.zone_at(x, y, z)) or ""
+
+    def get_zones_in_box(self, minx, maxx, miny, maxy, minz, maxz):
+        """Returns every zone overlapping a box, in the order they were spawned"""
+        box = (minx, maxx, miny, maxy, minz, maxz)
+        zones = self.zone_index.query_box(*box)
+        if self.static:
+            static = self.static.zones_in_box(*box)
+            zones = [self._static_zone(i) for i in static] + zones
+        return zones
 
     def spawn_reverb(self, minx, maxx, miny, maxy, minz, maxz, t60, damp = 1500):
-        #self.reverb_list.append(Reverb(minx, maxx, miny, maxy, minz, maxz, t60, damp))
+        #return self._add(self.reverb_list, self.reverb_index, Reverb(minx, maxx, miny, maxy, minz, maxz, t60, damp))
         pass
 
     def get_reverb_at(self, x, y, z):
-        for i in self.reverb_list:
-            if i.in_bound(x, y, z):
-                return i
+        return self.reverb_index.first_at(floor(x), floor(y), floor(z))
 
     def spawn_music(self, minx, maxx, miny, maxy, minz, maxz, sound):
         with contextlib.suppress(Exception):
-            self.music_list.append(
-                Ambience(minx, maxx, miny, maxy, minz, maxz, sound, options.get("music_volume", 25))
+            return self._add(
+                self.music_list,
+                self.music_index,
+                Ambience(minx, maxx, miny, maxy, minz, maxz, sound, options.get("music_volume", 25), self),
             )
 
 
     def spawn_ambience(self, minx, maxx, miny, maxy, minz, maxz, sound, volume=100):
         with contextlib.suppress(Exception):
-            self.ambience_list.append(
-                Ambience(minx, maxx, miny, maxy, minz, maxz, sound, volume)
+            return self._add(
+                self.ambience_list,
+                self.ambience_index,
+                Ambience(minx, maxx, miny, maxy, minz, maxz, sound, volume, self),
             )
 
     def spawn_zone(self, minx=0, maxx=0, miny=0, maxy=0, minz=0, maxz=0, type=""):
@@ -146,7 +494,7 @@ class Map:
         maxy (int): The maximum y of the zone
         minz (int): The minimum z of the zone
         maxz (int): The maximum z of the zone"""
-        self.zone_list.append(Zone(minx, maxx, miny, maxy, minz, maxz, type))
+        self._add(self.zone_list, self.zone_index, Zone(minx, maxx, miny, maxy, minz, maxz, type))
 
 
     def spawn_platform(self, minx=0, maxx=0, miny=0, maxy=0, minz=0, maxz=0, type=""):
@@ -158,7 +506,7 @@ class Map:
         maxy (int): The maximum y of the tile
         minz (int): The minimum z of the tile
         maxz (int): The maximum z of the tile"""
-        self.tile_list.append(Tile(minx, maxx, miny, maxy, minz, maxz, type))
+        self.add_tile(Tile(minx, maxx, miny, maxy, minz, maxz, type))
 
     def spawn_door(self, minx=0, maxx=0, miny=0, maxy=0, minz=0, maxz=0, walltype="", tiletype=""):
         """Spawns a door
@@ -172,7 +520,10 @@ class Map:
         walltype (str) the type of the wall when the door is closed
         tiletype (str) the tile of of the door when it is open
         """
-        self.door_list.append(Door(minx, maxx, miny, maxy, minz, maxz, walltype, tiletype, self))
+        door = Door(minx, maxx, miny, maxy, minz, maxz, walltype, tiletype, self)
+        self.door_list.append(door)
+        self.door_index.insert(door, minx - 1, maxx + 1, miny - 1, maxy + 1, minz, maxz)
+        return door
 
     def get_min_x(self):
         """Returns the minimum x"""
@@ -201,25 +552,58 @@ class Map:
     def spawn_entity(self, name, x, y, z, hp=100):
         if self.entities.get(name):
             self.entities[name].destroy()
-        self.entities[name] = entity.Entity(self.game, self, x, y, z, hp)
+            self.entity_hash.remove(self.entities[name])
+            self.entity_scheduler.remove(self.entities[name])
+        self.entities[name] = entity.Entity(
+            self.game, self, x, y, z, hp, store=self.entity_store
+        )
+        self.entity_hash.insert(self.entities[name], x, y, z)
+        self.entity_scheduler.add(self.entities[name])
+        if self.streamer:
+            self.streamer.place(self.entities[name])
         return self.entities[name]
 
+    def use_entity_store(self, capacity=1024):
+        """Keeps the state of the entities spawned from now on in NumPy arrays, and simulates them all at once.
+        Worth it for maps with thousands of entities, see entity_store.EntityStore
+        Return Value:
+        the EntityStore"""
+        if self.entity_store is None:
+            self.entity_store = entity_store.EntityStore(self, capacity)
+        return self.entity_store
+
     def get_entities_at(self, x, y, z):
-        for i in self.entities.values():
-            if i.x == x and i.y == y and i.z == z:
-                yield i
+        return iter(self.entity_hash.query_point(x, y, z))
+
+    def get_entities_in_radius(self, x, y, z, radius):
+        """Returns the entities within radius of (x, y, z), nearest first"""
+        return self.entity_hash.query_radius(x, y, z, radius)
+
+    def get_entities_in_box(self, minx, maxx, miny, maxy, minz, maxz):
+        """Returns the entities inside a box"""
+        return self.entity_hash.query_box(minx, maxx, miny, maxy, minz, maxz)
+
+    def get_nearest_entities(self, x, y, z, k=1, exclude=None):
+        """Returns up to k entities nearest to (x, y, z), nearest first, leaving out exclude"""
+        return self.entity_hash.nearest(x, y, z, k, exclude)
 
     def remove_entity(self, name):
         if entity := self.entities.get(name):
             entity.destroy()
+            self.entity_hash.remove(entity)
+            self.entity_scheduler.remove(entity)
             del self.entities[name]
 
 
 class BaseMapObj:
     """base map object
-    this object is the base class from where tiles, zones and custom map objects inherit
+    this object is the base class from where tiles, zones and custom map objects inherit.
+    map objects are created by the hundred thousand, so they and their subclasses here use __slots__.
+    subclasses that don't declare __slots__ get a __dict__ back and can hold whatever they like
     """
 
+    __slots__ = ("minx", "maxx", "miny", "maxy", "minz", "maxz", "type")
+
     def __init__(self, minx, maxx, miny, maxy, minz, maxz, type):
         """the BaseMapObj constructor
         params:
@@ -248,9 +632,9 @@ class BaseMapObj:
         returns:
         (bool) true if the objects covers this coordinate, or false if otherwise
         """
-        x = int(x)
-        y = int(y)
-        z = int(z)
+        x = floor(x)
+        y = floor(y)
+        z = floor(z)
         return (
             x >= self.minx
             and x <= self.maxx
@@ -262,6 +646,8 @@ class BaseMapObj:
 
 
 class Reverb(BaseMapObj):
+    __slots__ = ("t60", "damp", "reverb")
+
     def __init__(self, minx, maxx, miny, maxy, minz, maxz, t60, damp=1500):
         super().__init__(minx, maxx, miny, maxy, minz, maxz, "reverb")
         self.t60 = t60
@@ -276,49 +662,148 @@ class Reverb(BaseMapObj):
                 self.reverb.delete_effect()
 
 class Ambience(BaseMapObj):
-    def __init__(self, minx, maxx, miny, maxy, minz, maxz, sound, volume=100):
+    """A looping sound covering a region of the map.
+    Nothing is loaded until the player approaches the region. The sound is then started silently at the point
+    of its loop it would have reached had it been playing since the map was created, faded in on enter,
+    and faded out and released on leave."""
+
+    __slots__ = (
+        "file",
+        "volume",
+        "fade_time",
+        "map",
+        "epoch",
+        "sound",
+        "playing",
+        "_fade_timer",
+    )
+    fade_step = 50
+
+    def __init__(self, minx, maxx, miny, maxy, minz, maxz, sound, volume=100, map=None):
         super().__init__(minx, maxx, miny, maxy, minz, maxz, "ambience")
         self.file = sound
         self.volume = volume
         self.fade_time = 0.5
+        self.map = map
+        # the time every loop of this ambience is measured from.
+        self.epoch = map.time_domain.time if map else 0
+        self.sound = None
+        self.playing = False
+        self._fade_timer = None
+
+    def _now(self):
+        return self.map.time_domain.time if self.map else 0
+
+    def _has_sound(self):
+        """false when there is no sound, or the voice pool stole it for something more important"""
+        return self.sound is not None and not self.sound.destroied
+
+    def acquire(self):
+        """loads and starts the sound silently, at the current offset of its loop"""
+        if self._has_sound():
+            return
         self.sound = audio.play_direct(
-            self.file, True, 0, options.get("stream_ambience", True)
+            self.file,
+            True,
+            0,
+            options.get("stream_ambience", True),
+            priority=audio.Priority.AMBIENT,
         )
-        self.playing = False
+        if self.sound and self.sound.length:
+            loop_ms = self.sound.length * 1000
+            self.sound.set_position((self._now() - self.epoch) % loop_ms / loop_ms * 100)
+
+    def release(self):
+        self._cancel_fade()
+        if self.sound:
+            self.sound.destroy()
+            self.sound = None
+
+    def _cancel_fade(self):
+        if self._fade_timer:
+            self._fade_timer.cancel()
+            self._fade_timer = None
+
+    def fade(self, to, fade_time, then=None):
+        """fades the volume to {to} over {fade_time} seconds, then calls {then}"""
+        self._cancel_fade()
+        if not self._has_sound():
+            # nothing to fade, a stolen sound still has to be released.
+            if then:
+                then()
+            return
+        if not self.map or fade_time <= 0:
+            self.sound.set_volume(to)
+            if then:
+                then()
+            return
+        start = self.sound.get_volume()
+        began = self._now()
+        duration = fade_time * 1000
+
+        def step():
+            # a stolen sound ends the fade early.
+            progress = 1
+            if self._has_sound():
+                progress = min((self._now() - began) / duration, 1)
+                self.sound.set_volume(start + (to - start) * progress)
+            if progress >= 1:
+                self._cancel_fade()
+                if then:
+                    then()
+
+        self._fade_timer = self.map.call_every(self.fade_step, step, 0)
+
+    def approach(self):
+        """the player came near the region"""
+        self.acquire()
+
+    def depart(self):
+        """the player is no longer near the region"""
+        if not self.playing:
+            self.release()
 
     def enter(self):
         if not self.playing:
             self.playing = True
-            #self.sound.fade(_from=self.volume / 3, to=self.volume, fade_time=self.fade_time * 2)
-            if self.sound: self.sound.set_volume(self.volume)
+            self.acquire()
+            self.fade(self.volume, self.fade_time * 2)
 
     def leave(self, destroy=False):
-        evt = consts.EVT_DESTROY if destroy else 0
-        if self.playing:
+        if destroy:
+            self.playing = False
+            self.release()
+        elif self.playing:
             self.playing = False
-            #self.sound.fade(to=0, fade_time=self.fade_time, evt=evt)
-            if self.sound: 
-                self.sound.set_volume(0)
-        if self.sound and destroy: self.sound.destroy()
+            self.fade(0, self.fade_time, then=self.release)
 
 class Tile(BaseMapObj):
     """An internal tile class. You do not need to create any objects with this type externally"""
 
+    __slots__ = ("tiletype",)
+
     def __init__(self, minx, maxx, miny, maxy, minz, maxz, type):
         super(Tile, self).__init__(minx, maxx, miny, maxy, minz, maxz, "tile")
         self.tiletype = type
 
 
+class DynamicTile(Tile):
+    """A tile on the map's overlay layer. Create them with Map.spawn_dynamic_tile and change them with Map.set_tile_type"""
+
+    __slots__ = ()
+
+
 class Door(BaseMapObj):
+    __slots__ = ("closetype", "opentype", "map", "base", "upper", "open", "src")
+
     def __init__(self, minx, maxx, miny, maxy, minz, maxz, closetype, opentype, map):
         super().__init__(minx, maxx, miny, maxy, minz, maxz, closetype)
-        self.closetile=Tile(minx, maxx, miny, maxy, minz, maxz, closetype)
-        self.opentilebase=Tile(minx, maxx, miny, maxy, minz, minz, opentype)
-        self.opentile_air=Tile(minx, maxx, miny, maxy, minz+1, maxz, "air") if self.maxz>self.minz else None
+        self.closetype = closetype
+        self.opentype = opentype
         self.map=map
-        self.map.tile_list.append(self.closetile)
-        self.tile_index=len(self.map.tile_list)-1
-        self.air_index=None
+        # the bottom layer is the floor when open, everything above it turns to air.
+        self.base = map.spawn_dynamic_tile(minx, maxx, miny, maxy, minz, minz, closetype)
+        self.upper = map.spawn_dynamic_tile(minx, maxx, miny, maxy, minz+1, maxz, closetype) if self.maxz>self.minz else None
         self.open = False
         self.src=audio.Src()
     def switch_state(self, locked=False, to_open=True, silent=False):
@@ -330,20 +815,14 @@ class Door(BaseMapObj):
                 False,
                 100
             )
-            self.map.tile_list.pop(self.tile_index)
-            self.map.tile_list.append(self.opentilebase)
-            self.tile_index=len(self.map.tile_list)-1
-            if self.opentile_air: 
-                self.map.tile_list.append(self.opentile_air)
-                self.air_index=len(self.map.tile_list)-1
+            self.map.set_tile_type(self.base, self.opentype)
+            if self.upper:
+                self.map.set_tile_type(self.upper, "air")
         elif not to_open:
             self.open = False
-            if self.opentile_air:
-                if self.air_index: self.map.tile_list.pop(self.air_index)
-                self.air_index=None
-            self.map.tile_list.pop(self.tile_index)
-            self.map.tile_list.append(self.closetile)
-            self.tile_index=len(self.map.tile_list)-1
+            self.map.set_tile_type(self.base, self.closetype)
+            if self.upper:
+                self.map.set_tile_type(self.upper, self.closetype)
         else:
             self.src.move(self.maxx, self.miny+(self.maxy-self.miny), self.minz)
             self.src.play_sound(
@@ -373,6 +852,9 @@ class Door(BaseMapObj):
 
 class Zone(BaseMapObj):
     """an internal zone class"""
+
+    __slots__ = ("zonename",)
+
     def __init__(self, minx, maxx, miny, maxy, minz, maxz, name):
         super(Zone, self).__init__(minx, maxx, miny, maxy, minz, maxz, "zone")
         self.zonename = name
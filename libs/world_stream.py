@@ -0,0 +1,168 @@
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ChunkStreamer:
+    """streams the stateful objects of a compiled map in and out around the camera's focus object.
+    the map is split into columns of {chunk_size}x{chunk_size} units. the chunks within {radius} chunks of the focus
+    object have their doors, ambiences, music and reverbs spawned and their entities active; everything else is
+    unloaded, so only the neighbourhood of the player holds OpenAL sources.
+    finding what a chunk holds (and paging that part of the map file in) runs on a background thread, the main
+    thread only links finished chunks into the map. unloaded objects are torn down on the main thread too, since
+    that touches timers and audio, but only {destroy_per_frame} of them per frame.
+    tiles and zones aren't touched, they are answered from the memory mapped file directly.
+    params:
+    map (world_map.Map): a map opened with Map.load(..., stream=True)
+    camera (camera.Camera): the camera whose focus object decides what is loaded
+    chunk_size (int, optional): the width and depth of a chunk
+    radius (int, optional): how many chunks around the focus object's chunk are kept loaded
+    destroy_per_frame (int, optional): how many unloaded objects are freed per update
+    """
+
+    kinds = ("doors", "ambiences", "musics", "reverbs")
+
+    def __init__(self, map, camera, chunk_size=32, radius=2, destroy_per_frame=8):
+        self.map = map
+        self.camera = camera
+        self.chunk_size = chunk_size
+        self.radius = radius
+        self.destroy_per_frame = destroy_per_frame
+        self.center = None
+        # the chunks around center, the ones that are (or are being) loaded.
+        self.wanted_chunks = set()
+        self.loaded = {}
+        self.pending = {}
+        # (kind, record index) -> [object, number of loaded chunks using it]
+        self.resident = {}
+        # functions freeing the audio of unloaded objects, see Map.detach.
+        self.garbage = deque()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def chunk_of(self, x, y):
+        return (int(x // self.chunk_size), int(y // self.chunk_size))
+
+    def wanted(self, center):
+        cx, cy = center
+        r = range(-self.radius, self.radius + 1)
+        return {(cx + dx, cy + dy) for dx, dy in itertools.product(r, r)}
+
+    def chunk_box(self, chunk):
+        cs = self.chunk_size
+        m = self.map
+        return (
+            chunk[0] * cs,
+            chunk[0] * cs + cs - 1,
+            chunk[1] * cs,
+            chunk[1] * cs + cs - 1,
+            m.minz,
+            m.maxz,
+        )
+
+    def _read_chunk(self, chunk):
+        """runs on the background thread. returns the records of every stateful object in {chunk}"""
+        static = self.map.static
+        box = self.chunk_box(chunk)
+        found = {}
+        for kind in self.kinds:
+            table = getattr(static, kind)
+            found[kind] = [
+                (int(i), table[i].tolist()) for i in static.in_box(table, *box)
+            ]
+        # touch the chunk's tiles so their pages are in memory before the player gets there.
+        static.tiles[static.tiles_in_box(*box)]
+        return found
+
+    def _spawn(self, kind, record):
+        m = self.map
+        s = m.static.string
+        if kind == "doors":
+            return m.spawn_door(*record[:6], s(record[6]), s(record[7]))
+        if kind == "ambiences":
+            return m.spawn_ambience(*record[:6], s(record[6]), record[8])
+        if kind == "musics":
+            return m.spawn_music(*record[:6], s(record[6]))
+        return m.spawn_reverb(*record[:6], record[8], record[9])
+
+    def _link(self, chunk, found):
+        keys = []
+        for kind, records in found.items():
+            for index, record in records:
+                key = (kind, index)
+                if key in self.resident:
+                    self.resident[key][1] += 1
+                else:
+                    self.resident[key] = [self._spawn(kind, record), 1]
+                keys.append(key)
+        self.loaded[chunk] = keys
+
+    def _unlink(self, chunk, garbage):
+        for key in self.loaded.pop(chunk):
+            entry = self.resident[key]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self.resident[key]
+                if entry[0] is not None:
+                    garbage.append(self.map.detach(entry[0]))
+
+    def _destroy(self, count=None):
+        """frees the audio of up to {count} unloaded objects, or all of them"""
+        garbage = self.garbage
+        for _ in range(len(garbage) if count is None else min(count, len(garbage))):
+            garbage.popleft()()
+
+    def place(self, entity):
+        """activates {entity} if it is in a loaded chunk and deactivates it otherwise.
+        called when an entity is spawned or moved"""
+        if self.center is not None:
+            entity.set_active(self.chunk_of(entity.x, entity.y) in self.wanted_chunks)
+
+    def update(self):
+        """called once per frame by the map. only does work when the focus object changes chunk or a chunk finished loading"""
+        focus = self.camera.focus_object
+        if focus is not None:
+            center = self.chunk_of(focus.x, focus.y)
+            if center != self.center:
+                self.center = center
+                self._recenter(center)
+        linked = False
+        for chunk, future in list(self.pending.items()):
+            if future.done():
+                del self.pending[chunk]
+                self._link(chunk, future.result())
+                linked = True
+        if linked:
+            self.map.regions.refresh()
+        self._destroy(self.destroy_per_frame)
+
+    def _recenter(self, center):
+        wanted = self.wanted_chunks = self.wanted(center)
+        garbage = []
+        for chunk in list(self.loaded):
+            if chunk not in wanted:
+                self._unlink(chunk, garbage)
+        if garbage:
+            # let the region listeners see the unloaded regions go before their audio is freed.
+            self.map.regions.refresh()
+            self.garbage.extend(garbage)
+        for chunk in list(self.pending):
+            if chunk not in wanted:
+                self.pending.pop(chunk).cancel()
+        for chunk in wanted:
+            if chunk not in self.loaded and chunk not in self.pending:
+                self.pending[chunk] = self._executor.submit(self._read_chunk, chunk)
+        for i in self.map.entities.values():
+            self.place(i)
+
+    def stop(self):
+        """unloads everything and stops the background thread"""
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        garbage = []
+        for chunk in list(self.loaded):
+            self._unlink(chunk, garbage)
+        self.map.regions.refresh()
+        self._executor.shutdown(wait=True)
+        self.garbage.extend(garbage)
+        self._destroy()
@@ -0,0 +1,163 @@
+import sys
+from math import floor
+from types import SimpleNamespace
+
+import pytest
+
+import fake_openal
+import libs
+from libs import clock, tile_raster
+
+# the tests never load the OpenAL library or play anything: libs.openal is replaced by a stand-in before the
+# audio code imports it.
+sys.modules["libs.openal"] = fake_openal
+libs.openal = fake_openal
+
+
+class GridMap:
+    """a small bounded map made of boxes of tiletypes, later boxes on top, with the Map methods the collision,
+    navigation, column and raster code use. cells maps every covered coordinate to its tiletype, and reads counts
+    the calls to get_tile_at"""
+
+    def __init__(self, sx, sy, sz):
+        self.minx = self.miny = self.minz = 0
+        self.maxx, self.maxy, self.maxz = sx - 1, sy - 1, sz - 1
+        self.tiles = []
+        self.cells = {}
+        self.listeners = []
+        self.raster = None
+        self.reads = 0
+
+    def _cells_in(self, tile, clip=None):
+        """the coordinates of the map covered by {tile}, and by {clip} too if given"""
+        boxes = [tile, self] + ([clip] if clip else [])
+        ranges = [
+            range(
+                max(getattr(i, "min" + axis) for i in boxes),
+                min(getattr(i, "max" + axis) for i in boxes) + 1,
+            )
+            for axis in "xyz"
+        ]
+        for x in ranges[0]:
+            for y in ranges[1]:
+                for z in ranges[2]:
+                    yield x, y, z
+
+    def _changed(self, tile):
+        for i in self.listeners:
+            i(tile.minx, tile.maxx, tile.miny, tile.maxy, tile.minz, tile.maxz)
+
+    def add(self, minx, maxx, miny, maxy, minz, maxz, tiletype):
+        tile = SimpleNamespace(
+            minx=minx,
+            maxx=maxx,
+            miny=miny,
+            maxy=maxy,
+            minz=minz,
+            maxz=maxz,
+            tiletype=tiletype,
+        )
+        self.tiles.append(tile)
+        for cell in self._cells_in(tile):
+            self.cells[cell] = tiletype
+        if self.raster:
+            self.raster.paint(tile)
+        self._changed(tile)
+        return tile
+
+    def set(self, x, y, z, tiletype):
+        return self.add(x, x, y, y, z, z, tiletype)
+
+    def remove(self, tile):
+        self.tiles.remove(tile)
+        for cell in self._cells_in(tile):
+            self.cells.pop(cell, None)
+        for i in self.get_tiles_in_box(
+            tile.minx, tile.maxx, tile.miny, tile.maxy, tile.minz, tile.maxz
+        ):
+            for cell in self._cells_in(i, tile):
+                self.cells[cell] = i.tiletype
+        if self.raster:
+            self.raster.repaint(
+                tile.minx, tile.maxx, tile.miny, tile.maxy, tile.minz, tile.maxz
+            )
+        self._changed(tile)
+
+    def in_bound(self, x, y, z):
+        return (
+            self.minx <= x <= self.maxx
+            and self.miny <= y <= self.maxy
+            and self.minz <= z <= self.maxz
+        )
+
+    def get_tile_at(self, x, y, z):
+        self.reads += 1
+        return self.cells.get((floor(x), floor(y), floor(z)), "")
+
+    def iter_tiles(self):
+        return iter(self.tiles)
+
+    def get_tiles_in_box(self, minx, maxx, miny, maxy, minz, maxz):
+        return [
+            i
+            for i in self.tiles
+            if i.minx <= maxx
+            and i.maxx >= minx
+            and i.miny <= maxy
+            and i.maxy >= miny
+            and i.minz <= maxz
+            and i.maxz >= minz
+        ]
+
+    def bake_tiles(self):
+        self.raster = tile_raster.TileRaster(self)
+        self.raster.bake()
+        return self.raster
+
+    def add_tile_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_tile_listener(self, listener):
+        self.listeners.remove(listener)
+
+
+class StubGame:
+    """the parts of game.Game a map and its entities use"""
+
+    def __init__(self):
+        self.time_domain = clock.TimeDomain()
+
+    def new_clock(self, domain=None):
+        return clock.Clock(domain or self.time_domain)
+
+    def new_domain(self, parent=None, scale=1.0):
+        return clock.TimeDomain(parent or self.time_domain, scale)
+
+
+@pytest.fixture
+def game():
+    """a StubGame, advance game.time_domain to move time on"""
+    return StubGame()
+
+
+@pytest.fixture
+def audio(monkeypatch):
+    """libs.audio with a fresh buffer cache and voice pool, where every file decodes to a short buffer"""
+    audio = pytest.importorskip("libs.audio")
+
+    def upload(file):
+        buffer = audio.openal.BufferSound()
+        buffer.load(bytes(100))
+        return buffer
+
+    monkeypatch.setattr(audio, "decode", lambda file: file)
+    monkeypatch.setattr(audio, "upload", upload)
+    monkeypatch.setattr(audio, "buffer_cache", audio.BufferCache())
+    monkeypatch.setattr(audio, "voice_pool", audio.VoicePool(8))
+    return audio
+
+
+@pytest.fixture
+def grid_map():
+    """the GridMap class, call it with the size of the map"""
+    return GridMap
@@ -0,0 +1,200 @@
+"""stands in for libs.openal in the tests (see conftest), so they need neither the OpenAL library nor a sound card.
+sources and buffers are plain objects that remember what was done to them. al keeps a queue of buffers per source
+like OpenAL does: nothing plays by itself, call al.process to finish queued buffers.
+"""
+
+import ctypes
+import itertools
+
+_names = itertools.count(1)
+
+
+class _Source:
+    __slots__ = ("queue", "processed", "state", "offset")
+
+    def __init__(self):
+        self.queue = []
+        self.processed = 0
+        self.state = _Al.AL_INITIAL
+        self.offset = 0
+
+
+class _Al:
+    ALint = ctypes.c_int
+    ALuint = ctypes.c_uint
+    AL_BUFFER = 0x1009
+    AL_SOURCE_STATE = 0x1010
+    AL_INITIAL = 0x1011
+    AL_PLAYING = 0x1012
+    AL_PAUSED = 0x1013
+    AL_STOPPED = 0x1014
+    AL_BUFFERS_PROCESSED = 0x1016
+    AL_SAMPLE_OFFSET = 0x1025
+
+    def __init__(self):
+        self.sources = {}
+
+    def source(self, source):
+        """the state of {source}, a name or an ALuint"""
+        return self.sources.setdefault(getattr(source, "value", source), _Source())
+
+    def process(self, source, count=1):
+        """pretends {count} more buffers queued on {source} finished playing. the source stops once all have"""
+        s = self.source(source)
+        s.processed = min(s.processed + count, len(s.queue))
+        if s.processed == len(s.queue):
+            s.state = self.AL_STOPPED
+
+    def alSourceQueueBuffers(self, source, count, buffer):
+        self.source(source).queue.append(buffer.value)
+
+    def alSourceUnqueueBuffers(self, source, count, name):
+        s = self.source(source)
+        if not s.processed:
+            raise RuntimeError("unqueueing a buffer that hasn't been processed")
+        s.processed -= 1
+        name.value = s.queue.pop(0)
+
+    def alSourcei(self, source, param, value):
+        s = self.source(source)
+        if param == self.AL_BUFFER and value == 0:
+            if s.state == self.AL_PLAYING:
+                raise RuntimeError("detaching the buffers of a playing source")
+            s.queue.clear()
+            s.processed = 0
+
+    def alGetSourcei(self, source, param, out):
+        s = self.source(source)
+        if param == self.AL_SOURCE_STATE:
+            out.value = s.state
+        elif param == self.AL_BUFFERS_PROCESSED:
+            out.value = s.processed
+        elif param == self.AL_SAMPLE_OFFSET:
+            out.value = s.offset
+
+    def alSourcePlay(self, source):
+        s = self.source(source)
+        # a source with nothing left to play stops straight away.
+        s.state = self.AL_PLAYING if s.processed < len(s.queue) else self.AL_STOPPED
+
+    def alSourcePause(self, source):
+        s = self.source(source)
+        if s.state == self.AL_PLAYING:
+            s.state = self.AL_PAUSED
+
+    def alSourceStop(self, source):
+        s = self.source(source)
+        s.state = self.AL_STOPPED
+        s.processed = len(s.queue)
+
+
+al = _Al()
+
+
+class Listener:
+    def __init__(self):
+        self.position = (0, 0, 0)
+        self.hrtf = 0
+        self.at_orientation = (0, 1, 0)
+        self.up_orientation = (0, 0, 1)
+
+
+class BufferSound:
+    def __init__(self):
+        self.channels = 1
+        self.bitrate = 16
+        self.samplerate = 44100
+        self.length = None
+        self.duration = 0
+        self.wavbuf = None
+        self.buf = al.ALuint(next(_names))
+        self.deleted = False
+
+    def load(self, data):
+        self.wavbuf = data
+        if self.length is None:
+            self.length = len(data)
+        self.duration = (self.length / float(self.samplerate)) / 2
+
+    def delete(self):
+        self.deleted = True
+
+
+class Player:
+    def __init__(self):
+        self.source = al.ALuint(next(_names))
+        self.volume = 1.0
+        self.pitch = 1.0
+        self.position = (0, 0, 0)
+        self.rolloff = 0
+        self.source_relative = False
+        self.max_distance = 3.4
+        self.loop = False
+        self.seek = 0
+        self.queue = []
+        self._filter = []
+        self._effect = []
+        self.deleted = False
+
+    def add(self, sound):
+        al.alSourceQueueBuffers(self.source, 1, sound.buf)
+        self.queue.append(sound)
+
+    def remove(self):
+        if self.queue:
+            al.alSourcei(self.source, al.AL_BUFFER, 0)
+            self.queue.pop(0)
+
+    def play(self):
+        al.alSourcePlay(self.source)
+
+    def pause(self):
+        al.alSourcePause(self.source)
+
+    def stop(self):
+        al.alSourceStop(self.source)
+
+    def playing(self):
+        return al.source(self.source).state == al.AL_PLAYING
+
+    def add_filter(self, filtr):
+        if filtr not in self._filter:
+            self._filter.append(filtr)
+
+    def del_filter(self, filtr):
+        if filtr in self._filter:
+            self._filter.remove(filtr)
+
+    def add_effect(self, slot, filtr=None):
+        self._effect.append(slot)
+
+    def del_effect(self, slot):
+        self._effect.remove(slot)
+
+    def delete(self):
+        self.deleted = True
+
+
+class _Effect:
+    def __init__(self):
+        self.deleted = False
+
+    def delete(self):
+        self.deleted = True
+
+
+class reverb(_Effect):
+    pass
+
+
+class lowpass_filter(_Effect):
+    pass
+
+
+class highpass_filter(_Effect):
+    pass
+
+
+class EFXslot(_Effect):
+    def set_effect(self, effect):
+        self.effect = effect
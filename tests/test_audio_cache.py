@@ -0,0 +1,137 @@
+import threading
+
+import pytest
+
+pytest.importorskip("pyogg")
+pytest.importorskip("urllib3")
+from libs import audio
+
+
+class FakeBuffer:
+    def __init__(self, file, length):
+        self.file = file
+        self.length = length
+        self.deleted = False
+        self.thread = threading.current_thread()
+
+    def delete(self):
+        self.deleted = True
+
+
+@pytest.fixture
+def decoded(monkeypatch):
+    """decodes every file to 100 bytes of audio without touching OpenAL, and counts the decodes of each file.
+    files with "missing" in their name can't be read"""
+    decodes = {}
+
+    def decode(file):
+        decodes[file] = decodes.get(file, 0) + 1
+        return None if "missing" in file else file
+
+    monkeypatch.setattr(audio, "decode", decode)
+    monkeypatch.setattr(audio, "upload", lambda file: FakeBuffer(file, 100))
+    return decodes
+
+
+def test_sounds_of_one_file_share_its_buffer(decoded):
+    cache = audio.BufferCache(max_bytes=1000)
+    a = cache.acquire("a.ogg")
+    assert cache.acquire("a.ogg") is a
+    assert decoded == {"a.ogg": 1}
+    assert cache.entries["a.ogg"].refs == 2
+    cache.release(a)
+    cache.release(a)
+    assert "a.ogg" in cache.unused and not a.deleted
+
+
+def test_unused_buffers_are_evicted_least_recently_used_first(decoded):
+    cache = audio.BufferCache(max_bytes=250)
+    buffers = [cache.acquire(f"{i}.ogg") for i in range(3)]
+    # all three are playing, the cache goes over budget rather than delete them.
+    assert cache.nbytes == 300 and len(cache) == 3
+    cache.release(buffers[1])
+    cache.release(buffers[0])
+    assert buffers[1].deleted and not buffers[0].deleted
+    assert cache.nbytes == 200
+    # playing it again takes it off the unused list.
+    assert cache.acquire("0.ogg") is buffers[0]
+    cache.acquire("3.ogg")
+    assert not buffers[0].deleted and len(cache) == 3
+
+
+def test_pins_are_counted(decoded):
+    cache = audio.BufferCache(max_bytes=0)
+    assert cache.pin("ui.ogg")
+    assert cache.pin("ui.ogg")
+    buffer = cache.entries["ui.ogg"].buffer
+    cache.release(cache.acquire("ui.ogg"))
+    cache.unpin("ui.ogg")
+    assert not buffer.deleted
+    cache.unpin("ui.ogg")
+    assert buffer.deleted and len(cache) == 0 and cache.nbytes == 0
+    # unpinning more than was pinned does nothing.
+    cache.unpin("ui.ogg")
+
+
+def test_unreadable_files_are_retried_after_the_failure_ttl(decoded, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(audio.time, "monotonic", lambda: now[0])
+    cache = audio.BufferCache(failure_ttl=30)
+    assert cache.acquire("missing.ogg") is None
+    assert cache.acquire("missing.ogg") is None
+    assert not cache.pin("missing.ogg")
+    assert decoded["missing.ogg"] == 1
+    now[0] = 31
+    assert cache.acquire("missing.ogg") is None
+    assert decoded["missing.ogg"] == 2
+
+
+def test_clear_keeps_buffers_in_use_and_pinned(decoded):
+    cache = audio.BufferCache()
+    playing = cache.acquire("playing.ogg")
+    cache.pin("pinned.ogg")
+    cache.release(cache.acquire("idle.ogg"))
+    cache.clear()
+    assert sorted(cache.entries) == ["pinned.ogg", "playing.ogg"]
+    assert not playing.deleted
+
+
+def test_preloads_decode_in_the_background_and_upload_on_update(decoded):
+    cache = audio.BufferCache(workers=2)
+    futures = [cache.preload(f"{i}.ogg") for i in range(4)]
+    for future in futures:
+        future.result()
+    assert len(cache) == 0
+    cache.update()
+    assert len(cache) == 4 and not cache.loading
+    assert list(cache.unused) == [f"{i}.ogg" for i in range(4)]
+    assert all(
+        i.buffer.thread is threading.current_thread() for i in cache.entries.values()
+    )
+    # cached files aren't decoded again.
+    assert cache.preload("0.ogg").result() is None
+    assert decoded["0.ogg"] == 1
+    cache.executor.shutdown()
+
+
+def test_acquiring_a_file_being_preloaded_waits_for_its_decode(decoded, monkeypatch):
+    release = threading.Event()
+
+    def decode(file):
+        release.wait(5)
+        decoded[file] = decoded.get(file, 0) + 1
+        return None if "missing" in file else file
+
+    monkeypatch.setattr(audio, "decode", decode)
+    cache = audio.BufferCache()
+    cache.preload("a.ogg")
+    cache.preload("missing.ogg")
+    cache.update()
+    assert len(cache) == 0
+    release.set()
+    buffer = cache.acquire("a.ogg")
+    assert buffer.thread is threading.current_thread()
+    assert cache.acquire("missing.ogg") is None
+    assert decoded == {"a.ogg": 1, "missing.ogg": 1}
+    assert not cache.loading
+    cache.executor.shutdown()
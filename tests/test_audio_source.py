@@ -0,0 +1,46 @@
+import pytest
+
+
+@pytest.fixture
+def src(audio):
+    src = audio.Src(accept_effects=False)
+    yield src
+    src.destroy()
+
+
+def test_paused_sources_keep_their_sounds_through_the_audio_loop(audio, src):
+    loop = src.play_sound("loop.ogg", looping=True)
+    once = src.play_sound("once.ogg")
+    src.pause(True)
+    audio.loop()
+    assert src.sounds == {loop, once}
+    assert not loop.playing() and not loop.destroied
+    src.pause(False)
+    audio.loop()
+    assert loop.playing() and once.playing()
+
+
+def test_sounds_that_finished_before_a_pause_are_not_played_again(audio, src):
+    once = src.play_sound("once.ogg")
+    audio.openal.al.process(once.generator.source)
+    src.pause(True)
+    assert once.destroied and src.sounds == set()
+    # pausing twice doesn't resume anything.
+    src.pause(True)
+    src.pause(False)
+    assert src.sounds == set()
+
+
+def test_sounds_of_one_file_share_its_buffer_until_the_last_one_goes(audio, src):
+    a = src.play_sound("step.ogg")
+    b = src.play_sound("step.ogg")
+    assert a.buffer is b.buffer
+    entry = audio.buffer_cache.entries["data/step.ogg"]
+    assert entry.refs == 2
+    a.destroy()
+    assert entry.refs == 1 and b.playing()
+    b.destroy()
+    assert entry.refs == 0 and not b.buffer.deleted
+    # the next sound of that file reuses the buffer instead of loading the file again.
+    c = src.play_sound("step.ogg")
+    assert c.buffer is a.buffer and entry.refs == 1
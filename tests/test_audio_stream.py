@@ -0,0 +1,149 @@
+import ctypes
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pyogg")
+from libs import audio_stream
+
+al = audio_stream.al
+
+
+class FakeFile:
+    """a mono file of {samples} samples, decoded {buffer_size} bytes at a time.
+    the sample it is at is kept in vf, so the fake ov_pcm_seek can move it"""
+
+    samples = 10000
+
+    def __init__(self, path, buffer_size):
+        self.channels = 1
+        self.frequency = 1000
+        self.buffer_size = buffer_size
+        self.vf = ctypes.c_int(0)
+
+    def get_buffer(self):
+        left = (self.samples - self.vf.value) * 2
+        if left <= 0:
+            return None
+        length = min(self.buffer_size, left)
+        self.vf.value += length // 2
+        self.data = ctypes.create_string_buffer(length)
+        return self.data, length
+
+
+@pytest.fixture(autouse=True)
+def fake_pyogg(monkeypatch):
+    def seek(vf, sample):
+        vf._obj.value = sample
+
+    monkeypatch.setattr(
+        audio_stream,
+        "pyogg",
+        SimpleNamespace(
+            VorbisFileStream=FakeFile,
+            vorbis=SimpleNamespace(
+                ov_pcm_total=lambda vf, i: FakeFile.samples, ov_pcm_seek=seek
+            ),
+        ),
+    )
+
+
+def new_stream(loop=False):
+    """a stream of 1000 samples a buffer, 3 buffers ahead"""
+    voice = audio_stream.openal.Player()
+    return audio_stream.Stream("music.ogg", voice, loop, buffer_size=2000, buffers=3)
+
+
+def starts(stream):
+    return [sample for _, sample in stream.queued]
+
+
+def test_buffers_are_refilled_as_they_finish_playing():
+    stream = new_stream()
+    assert stream.duration == 10 and not stream.queued
+    stream.play()
+    stream.service()
+    assert starts(stream) == [0, 1000, 2000] and not stream.free
+    assert stream.voice.playing()
+    al.process(stream.voice.source, 2)
+    stream.service()
+    assert starts(stream) == [2000, 3000, 4000]
+    queue = [i.buf.value for i, _ in stream.queued]
+    assert al.source(stream.voice.source).queue == queue
+
+
+def test_the_stream_finishes_once_its_last_buffer_played():
+    stream = new_stream()
+    stream.play()
+    for _ in range(4):
+        stream.service()
+        assert not stream.finished
+        al.process(stream.voice.source, 3)
+    # the last buffer went out with the fourth refill, the file is done.
+    assert stream.ended and stream.decoder is None
+    stream.service()
+    assert stream.finished and not stream.queued and len(stream.free) == 3
+    buffers = list(stream.free)
+    stream.close()
+    assert all(i.deleted for i in buffers) and not stream.free
+
+
+def test_looping_streams_go_back_to_the_start_without_a_gap():
+    stream = new_stream(loop=True)
+    stream.play()
+    for _ in range(4):
+        stream.service()
+        al.process(stream.voice.source, 3)
+    stream.service()
+    assert starts(stream) == [2000, 3000, 4000] and not stream.finished
+    assert stream.voice.playing()
+
+
+def test_seeking_refills_from_the_new_position():
+    stream = new_stream()
+    stream.play()
+    stream.service()
+    stream.seek(0.5)
+    assert starts(stream) == [5000, 6000, 7000]
+    assert stream.voice.playing()
+    # the old buffers were taken off the voice.
+    assert len(al.source(stream.voice.source).queue) == 3
+    assert stream.tell() == 0.5
+
+
+def test_paused_streams_are_not_restarted_by_the_streamer():
+    stream = new_stream()
+    stream.play()
+    stream.service()
+    stream.pause()
+    al.process(stream.voice.source, 3)
+    stream.service()
+    assert not stream.voice.playing() and len(stream.queued) == 3
+
+
+class FakeStream:
+    def __init__(self, path, fails=False):
+        self.path = path
+        self.fails = fails
+        self.serviced = threading.Event()
+
+    def service(self):
+        self.serviced.set()
+        if self.fails:
+            raise OSError("unreadable")
+
+
+def test_the_streamer_thread_services_its_streams_and_drops_broken_ones():
+    streamer = audio_stream.Streamer(interval=0.001)
+    working = FakeStream("a.ogg")
+    broken = FakeStream("b.ogg", fails=True)
+    streamer.add(working)
+    streamer.add(broken)
+    assert working.serviced.wait(2) and broken.serviced.wait(2)
+    # the broken stream is dropped before the next pass.
+    working.serviced.clear()
+    assert working.serviced.wait(2)
+    assert streamer.streams == {working}
+    streamer.remove(working)
+    assert not streamer.streams
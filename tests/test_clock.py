@@ -0,0 +1,68 @@
+from libs import clock
+
+
+def test_child_domain_follows_its_parent_at_its_scale():
+    root = clock.TimeDomain()
+    child = clock.TimeDomain(root, 0.5)
+    root.advance(100)
+    assert child.time == 50
+    child.scale = 2
+    root.advance(100)
+    assert child.time == 250
+
+
+def test_a_scaled_root_domain_runs_faster_than_it_is_advanced():
+    root = clock.TimeDomain(scale=2.0)
+    c = clock.Clock(clock.TimeDomain(root))
+    root.advance(16)
+    assert root.time == 32 and c.elapsed == 32
+
+
+def test_pausing_a_domain_freezes_it_and_its_children():
+    root = clock.TimeDomain()
+    parent = clock.TimeDomain(root)
+    child = clock.TimeDomain(parent)
+    root.advance(10)
+    parent.pause()
+    root.advance(100)
+    assert parent.time == 10
+    assert child.time == 10
+    parent.resume()
+    root.advance(5)
+    assert child.time == 15
+
+
+def test_only_root_domains_can_be_advanced():
+    child = clock.TimeDomain(clock.TimeDomain())
+    try:
+        child.advance(1)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("advancing a child domain should fail")
+
+
+def test_clock_elapsed_pause_and_restart():
+    root = clock.TimeDomain()
+    c = clock.Clock(root)
+    root.advance(30)
+    assert c.elapsed == 30
+    c.pause()
+    root.advance(30)
+    assert c.elapsed == 30
+    c.resume()
+    root.advance(10)
+    assert c.elapsed == 40
+    c.elapsed = 5
+    assert c.elapsed == 5
+    c.restart()
+    assert c.elapsed == 0
+
+
+def test_clock_in_a_paused_domain_stands_still():
+    root = clock.TimeDomain()
+    domain = clock.TimeDomain(root)
+    c = clock.Clock(domain)
+    domain.pause()
+    root.advance(100)
+    assert c.elapsed == 0
@@ -0,0 +1,97 @@
+from math import floor
+
+import pytest
+
+from libs import collision
+
+DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+
+
+@pytest.fixture
+def grass_map(grid_map):
+    """makes a map with a floor of grass, walls and ledges are set per cell on top of it"""
+
+    def make(sx, sy, sz=3):
+        m = grid_map(sx, sy, sz)
+        m.add(0, sx - 1, 0, sy - 1, 0, 0, "grass")
+        return m
+
+    return make
+
+
+def assert_inside_open_cell(m, result):
+    cell = (floor(result.x), floor(result.y), result.z)
+    assert m.in_bound(*cell)
+    assert "wall" not in m.get_tile_at(*cell)
+
+
+@pytest.mark.parametrize("dx, dy", DIRECTIONS)
+@pytest.mark.parametrize("distance", [0.5, 0.75, 1, 1.5, 2])
+def test_walls_stop_motion_in_every_direction(grass_map, dx, dy, distance):
+    m = grass_map(3, 3)
+    m.set(1 + dx, 1 + dy, 0, "wall")
+    result = collision.sweep(m, 1.5, 1.5, 0, dx * distance, dy * distance)
+    assert_inside_open_cell(m, result)
+    assert (floor(result.x), floor(result.y)) == (1, 1)
+    # going up an axis the far edge of the cell already belongs to the wall, going down it's still inside.
+    reaches_wall = distance > 0.5 or dx + dy > 0
+    assert result.blocked == reaches_wall
+    assert result.contacts == ([("wall", (1 + dx, 1 + dy, 0))] if reaches_wall else [])
+
+
+@pytest.mark.parametrize("dx, dy", DIRECTIONS)
+@pytest.mark.parametrize("distance", [0.5, 1, 3])
+def test_the_map_edge_stops_motion_without_a_contact(grass_map, dx, dy, distance):
+    m = grass_map(1, 1)
+    result = collision.sweep(m, 0.5, 0.5, 0, dx * distance, dy * distance)
+    assert_inside_open_cell(m, result)
+    assert result.blocked == (distance > 0.5 or dx + dy > 0)
+    assert result.contacts == []
+
+
+@pytest.mark.parametrize("dx, dy", DIRECTIONS)
+def test_ending_exactly_on_a_boundary_steps_onto_a_ledge(grass_map, dx, dy):
+    m = grass_map(3, 3)
+    m.set(1 + dx, 1 + dy, 0, "wall")
+    m.set(1 + dx, 1 + dy, 1, "grass")
+    # the far edge of the ledge cell going down an axis, its near edge going up.
+    distance = 1.5 if dx + dy < 0 else 0.5
+    result = collision.sweep(m, 1.5, 1.5, 0, dx * distance, dy * distance)
+    assert not result.blocked
+    assert (floor(result.x), floor(result.y), result.z) == (1 + dx, 1 + dy, 1)
+
+
+def test_slides_along_a_wall_and_does_not_cut_corners(grass_map):
+    m = grass_map(3, 3)
+    m.set(2, 1, 0, "wall")
+    result = collision.sweep(m, 1.5, 1.5, 0, 1, 1)
+    assert result.blocked
+    assert (result.x, result.y) == (1.999, 2.5)
+    assert collision.sweep(m, 1.5, 1.5, 0, 1, 1, slide=False).position == (
+        1.999,
+        1.999,
+        0,
+    )
+    # diagonally through the corner of the wall.
+    result = collision.sweep(m, 1.5, 0.5, 0, 1, 1)
+    assert_inside_open_cell(m, result)
+    assert result.contacts[0][1] == (2, 1, 0)
+
+
+def test_rounding_does_not_carry_the_position_into_a_wall(grass_map):
+    m = grass_map(3, 3)
+    m.set(2, 1, 0, "wall")
+    result = collision.sweep(m, 1.5, 1.5, 0, 0.49996, 0)
+    assert not result.blocked
+    assert result.x == 1.999
+
+
+def test_walking_off_a_ledge_steps_down_or_falls(grass_map):
+    m = grass_map(3, 1, 4)
+    m.set(0, 0, 1, "grass")
+    m.set(0, 0, 0, "wall")
+    assert collision.sweep(m, 0.5, 0.5, 1, 1, 0).position == (1.5, 0.5, 0)
+    m.set(0, 0, 2, "grass")
+    m.set(0, 0, 1, "wall")
+    # two cells down is a fall, the entity is left in the air.
+    assert collision.sweep(m, 0.5, 0.5, 2, 1, 0).position == (1.5, 0.5, 2)
@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from libs import columns, navigation
+
+
+def random_map(grid_map, seed, sx=6, sy=6, sz=8):
+    rng = random.Random(seed)
+    m = grid_map(sx, sy, sz)
+    for x in range(sx):
+        for y in range(sy):
+            for z in range(sz):
+                m.set(x, y, z, rng.choice(("", "", "air", "grass", "wall")))
+    return m
+
+
+def brute_landing(m, x, y, z):
+    for below in range(z, m.minz - 1, -1):
+        if not navigation.is_open(m.cells.get((x, y, below), "")):
+            return below
+    return None
+
+
+@pytest.mark.parametrize("baked", [False, True])
+def test_landings_match_scanning_down_the_column(grid_map, baked):
+    m = random_map(grid_map, 1)
+    if baked:
+        m.bake_tiles()
+    index = columns.ColumnIndex(m)
+    for x in range(6):
+        for y in range(6):
+            for z in range(-1, 10):
+                assert index.landing(x, y, z) == brute_landing(m, x, y, z)
+
+
+def test_columns_are_read_once_until_a_tile_in_them_changes(grid_map):
+    m = grid_map(2, 2, 5)
+    m.set(0, 0, 1, "grass")
+    index = columns.ColumnIndex(m)
+    assert index.landing(0, 0, 4) == 1
+    reads = m.reads
+    assert index.landing(0, 0, 3) == 1
+    assert index.landing(0, 0, 0) is None
+    assert m.reads == reads
+    m.set(0, 0, 3, "door")
+    assert index.landing(0, 0, 4) == 3
+    m.set(0, 0, 3, "air")
+    assert index.landing(0, 0, 4) == 1
+
+
+def test_large_invalidations_only_drop_cached_columns_inside_them(grid_map):
+    m = grid_map(4, 4, 3)
+    index = columns.ColumnIndex(m)
+    index.column(0, 0)
+    index.column(3, 3)
+    index.invalidate(0, 2, 0, 2, 0, 2)
+    assert list(index._columns) == [(3, 3)]
+    index.destroy()
+    assert m.listeners == []
@@ -0,0 +1,128 @@
+import random
+from types import SimpleNamespace
+
+import numpy as np
+
+from libs import clock, columns, entity_store, tile_raster
+
+
+class Thing:
+    __slots__ = ("store", "id", "_x", "_hp", "events")
+    x = entity_store.Field()
+    hp = entity_store.Field()
+
+    def __init__(self, store=None):
+        self.store = store
+        self.id = store.allocate(self) if store is not None else None
+        self.events = []
+
+    def moved(self):
+        self.events.append("moved")
+
+    def fall_stop(self):
+        self.store.falling[self.id] = False
+        self.events.append("landed")
+
+
+def make_map():
+    m = SimpleNamespace(minx=0, miny=0, minz=0, maxx=3, maxy=3, maxz=9, raster=None)
+    m.time_domain = clock.TimeDomain()
+    m.raster = tile_raster.TileRaster(m)
+    # a floor at z 2 in the first column, nothing under the others.
+    m.raster.ids[0, 0, 2] = m.raster.id_of("grass")
+    return m
+
+
+def test_fields_live_in_slots_or_in_the_store():
+    loose = Thing()
+    loose.x = 4
+    assert loose.x == 4 and loose._x == 4
+    store = entity_store.EntityStore(make_map(), capacity=2)
+    things = [Thing(store) for _ in range(5)]
+    for i, thing in enumerate(things):
+        thing.x = i * 10
+    assert store.capacity == 8
+    assert store.x[store.ids()].tolist() == [0, 10, 20, 30, 40]
+    assert things[3].x == 30
+    store.free(things[1].id)
+    store.free(things[1].id)
+    assert len(store) == 4
+    reused = Thing(store)
+    assert reused.id == things[1].id and reused.x == 0
+
+
+def test_queries_over_every_entity():
+    store = entity_store.EntityStore(make_map())
+    things = [Thing(store) for _ in range(3)]
+    store.x[[t.id for t in things]] = [0, 3, 10]
+    ids, distances = store.distances(0, 0, 0)
+    assert distances.tolist() == [0, 3, 10]
+    assert store.within(0, 0, 0, 5).tolist() == [things[0].id, things[1].id]
+    store.face_towards([things[0].id], 1, 0)
+    assert store.hfacing[things[0].id] == 90
+
+
+def test_fall_moves_every_due_entity_and_reports_landings():
+    m = make_map()
+    store = entity_store.EntityStore(m)
+    lander, faller, resting = (Thing(store) for _ in range(3))
+    store.z[[lander.id, faller.id, resting.id]] = 5
+    store.y[faller.id] = 2
+    store.falling[[lander.id, faller.id]] = True
+    store.fall_time[[lander.id, faller.id]] = 100
+    m.time_domain.advance(250)
+    store.update()
+    assert store.z[lander.id] == 3 and store.z[faller.id] == 3
+    assert store.fall_elapsed[lander.id] == 50
+    assert lander.events == ["moved"] and resting.events == []
+    m.time_domain.advance(100)
+    store.update()
+    assert store.z[lander.id] == 2
+    assert lander.events == ["moved", "moved", "landed"]
+    assert store.fall_distance[lander.id] == 3
+    m.time_domain.advance(1000)
+    store.update()
+    # nothing under the other column, it falls off the bottom of the map.
+    assert store.z[faller.id] == -1
+    assert faller.events[-1] == "landed"
+    assert lander.events == ["moved", "moved", "landed"]
+
+
+def test_falls_on_unbaked_maps_land_where_they_do_on_baked_ones(grid_map):
+    rng = random.Random(6)
+    tiles = [
+        (rng.randrange(-3, 6), rng.randrange(-3, 6), rng.randrange(8))
+        for _ in range(40)
+    ]
+    tiletypes = [rng.choice(("grass", "air", "wall")) for _ in tiles]
+    # some start outside the map, or above or below it.
+    positions = [
+        (rng.uniform(-4, 7), rng.uniform(-4, 7), rng.choice((-2, 0, 3, 5, 7, 9, 12)))
+        for _ in range(60)
+    ]
+    maps, stores = [], []
+    for baked in (False, True):
+        m = grid_map(6, 6, 8)
+        m.minx = m.miny = -3
+        for cell, tiletype in zip(tiles, tiletypes):
+            m.set(*cell, tiletype)
+        if baked:
+            m.bake_tiles()
+        m.columns = columns.ColumnIndex(m)
+        m.time_domain = clock.TimeDomain()
+        store = entity_store.EntityStore(m)
+        ids = [Thing(store).id for _ in positions]
+        store.x[ids], store.y[ids], store.z[ids] = np.array(positions).T
+        store.falling[ids] = True
+        store.fall_time[ids] = 100
+        maps.append(m)
+        stores.append(store)
+    for delta in (250, 100, 1000):
+        landed = []
+        for m, store in zip(maps, stores):
+            landed.append(store.fall(delta)[1])
+            store.falling[landed[-1]] = False
+        assert sorted(landed[0].tolist()) == sorted(landed[1].tolist())
+        np.testing.assert_array_equal(stores[0].z, stores[1].z)
+        np.testing.assert_array_equal(stores[0].fall_distance, stores[1].fall_distance)
+    assert maps[0].raster is None
@@ -0,0 +1,108 @@
+import random
+
+import numpy as np
+import pytest
+
+from libs import map_format
+
+
+def compile_source(tmp_path, text, cell_size=16):
+    source = tmp_path / "map.txt"
+    source.write_text(text, encoding="utf-8")
+    output = tmp_path / "map.map"
+    map_format.compile_map(str(source), str(output), cell_size)
+    return map_format.CompiledMap(str(output))
+
+
+def test_compiled_map_answers_point_queries(tmp_path):
+    compiled = compile_source(
+        tmp_path,
+        """# a small map
+map 0 0 0 100 100 10
+platform 0 100 0 100 0 0 grass
+platform 10 20 10 20 0 3 wall
+zone 0 10 0 10 0 5 "the kitchen"
+door 5 5 10 10 0 3 wall wood
+ambience 0 100 0 100 0 10 ambience/wind.ogg 60
+""",
+    )
+    try:
+        assert compiled.bounds == [0, 0, 0, 100, 100, 10]
+        assert compiled.tile_at(50, 50, 0) == "grass"
+        assert compiled.tile_at(15, 15, 0) == "wall"
+        assert compiled.tile_at(50, 50, 1) is None
+        assert compiled.zone_at(3, 3, 3) == "the kitchen"
+        assert compiled.zone_at(30, 3, 3) is None
+        door = compiled.doors[0].tolist()
+        assert compiled.string(door[6]) == "wall"
+        assert compiled.string(door[7]) == "wood"
+        assert compiled.ambiences[0]["f1"] == 60
+    finally:
+        compiled.close()
+
+
+def test_indexed_box_queries_match_a_linear_scan(tmp_path):
+    rng = random.Random(5)
+    lines = ["map -50 -50 0 200 200 20"]
+    for _ in range(300):
+        x, y, z = rng.randrange(-50, 190), rng.randrange(-50, 190), rng.randrange(0, 18)
+        w, d, h = rng.randrange(0, 40), rng.randrange(0, 40), rng.randrange(0, 3)
+        kind = rng.choice(("platform", "zone"))
+        lines.append(f"{kind} {x} {x + w} {y} {y + d} {z} {z + h} t{rng.randrange(5)}")
+    compiled = compile_source(tmp_path, "\n".join(lines), cell_size=8)
+    try:
+        for _ in range(100):
+            x, y = rng.randrange(-60, 200), rng.randrange(-60, 200)
+            box = (x, x + rng.randrange(0, 120), y, y + rng.randrange(0, 120), 0, 20)
+            np.testing.assert_array_equal(
+                compiled.tiles_in_box(*box), compiled.in_box(compiled.tiles, *box)
+            )
+            np.testing.assert_array_equal(
+                compiled.zones_in_box(*box), compiled.in_box(compiled.zones, *box)
+            )
+        assert len(compiled.tiles_in_box(1000, 1001, 1000, 1001, 0, 0)) == 0
+    finally:
+        compiled.close()
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "platform 0 1 0 1 0 0 grass",
+        "map 0 0 0 10 10",
+        "map 0 0 0 10 10 10\nplatform 0 1 0 1 0 0",
+        "map 0 0 0 10 10 10\ndoor 0 1 0 1 0 0 wall",
+        "map 0 0 0 10 10 10\nplatform a 1 0 1 0 0 grass",
+        "map 0 0 0 10 10 10\ntree 0 1 0 1 0 0 oak",
+        'map 0 0 0 10 10 10\nzone 0 1 0 1 0 0 "unclosed',
+    ],
+)
+def test_bad_source_raises_map_format_error(text):
+    with pytest.raises(map_format.MapFormatError):
+        map_format.parse_source(text)
+
+
+def test_files_that_are_not_compiled_maps_are_refused(tmp_path):
+    path = tmp_path / "junk.map"
+    path.write_bytes(b"\0" * 256)
+    with pytest.raises(map_format.MapFormatError):
+        map_format.CompiledMap(str(path))
+
+
+def test_boxes_bigger_than_the_occupied_grid(tmp_path):
+    compiled = compile_source(
+        tmp_path,
+        """map -1000 -1000 0 1000 1000 10
+platform -900 -899 -900 -899 0 0 a
+platform 5 6 5 6 0 0 b
+zone 900 901 900 901 0 0 c
+""",
+        cell_size=4,
+    )
+    try:
+        assert compiled.tiles_in_box(-1000, 1000, -1000, 1000, 0, 10).tolist() == [0, 1]
+        assert compiled.tiles_in_box(0, 1000, 0, 1000, 0, 10).tolist() == [1]
+        assert compiled.zones_in_box(-1000, 1000, -1000, 1000, 0, 10).tolist() == [0]
+        assert compiled.zones_in_box(-1000, 0, -1000, 1000, 0, 10).tolist() == []
+    finally:
+        compiled.close()
@@ -0,0 +1,54 @@
+import random
+from math import sqrt
+
+import numpy as np
+
+from libs import movement, string_utils
+
+
+def test_trig_tables_match_math_for_whole_and_fractional_degrees():
+    for deg in (0, 45, 90, 359, 360, 725, -90):
+        assert abs(movement.sin_deg(deg) - np.sin(np.radians(deg))) < 1e-12
+        assert abs(movement.cos_deg(deg) - np.cos(np.radians(deg))) < 1e-12
+    assert abs(movement.sin_deg(30.5) - np.sin(np.radians(30.5))) < 1e-12
+
+
+def test_3d_distance_truncates_coordinates_to_whole_units():
+    assert movement.get_3d_distance(0, 0, 0, 3, 4, 0) == 5
+    assert movement.get_3d_distance(0.9, 0.9, 0.9, 3.5, 4.2, 12.7) == 13
+    assert movement.get_3d_distance(-3, 0, 0, 0, 0, 0) == 3
+    assert movement.get_2d_distance(1, 1, 4, 5) == 5
+
+
+def test_move_many_matches_move():
+    rng = random.Random(1)
+    coords = [
+        (rng.uniform(-50, 50), rng.uniform(-50, 50), rng.uniform(0, 9))
+        for i in range(50)
+    ]
+    for deg, pitch in ((90, 0), (33, 10), (12.5, -7.5)):
+        batch = movement.move_many(coords, deg, pitch, 2.0)
+        for point, moved in zip(coords, batch):
+            expected = movement.move(point, deg, pitch, 2.0).coords
+            assert np.allclose(moved, expected)
+
+
+def test_distances_from_one_origin_to_many_points():
+    points = np.array([[3, 4, 0], [0, 0, 0], [1.5, 0, 2]])
+    assert np.allclose(movement.distance_squared_many((0, 0, 0), points), [25, 0, 6.25])
+    assert np.allclose(movement.distance_many((0, 0, 0), points), [5, 0, sqrt(6.25)])
+
+
+def test_calculate_angle_many_matches_calculate_angle():
+    rng = random.Random(2)
+    points = [(rng.randint(-5, 5), rng.randint(-5, 5), 0) for i in range(100)]
+    for deg in (0, 90, 200):
+        batch = movement.calculate_angle_many((0, 0, 0), points, deg)
+        for (x, y, z), angle in zip(points, batch):
+            assert abs(angle - movement.calculate_angle(0, 0, x, y, 0, z, deg)) < 1e-9
+
+
+def test_direction_many_matches_direction():
+    angles = [0, 11, 12, 22.5, 90, 180, 270, 348, 359.9]
+    names = movement.direction_many(angles)
+    assert list(names) == [string_utils.direction(i) for i in angles]
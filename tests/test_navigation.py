@@ -0,0 +1,149 @@
+import random
+
+import numpy as np
+import pytest
+
+from libs import collision, navigation
+
+
+def random_map(grid_map, seed, sx=12, sy=12, sz=4):
+    rng = random.Random(seed)
+    m = grid_map(sx, sy, sz)
+    for x in range(sx):
+        for y in range(sy):
+            height = rng.choice((0, 0, 0, 1, 1, 2))
+            for z in range(height):
+                m.set(x, y, z, "wall")
+            m.set(x, y, height, "grass" if rng.random() > 0.1 else "wall")
+    return m
+
+
+def path_cost(path):
+    return sum(
+        (2**0.5 if a[0] != b[0] and a[1] != b[1] else 1) + abs(a[2] - b[2])
+        for a, b in zip(path, path[1:])
+    )
+
+
+def grid_steps(grid, cell):
+    target, costs = grid.steps()
+    index = grid.flat(*cell)
+    return sorted(
+        (grid.unflat(int(t)), round(float(c), 4))
+        for t, c in zip(target[:, index], costs[:, index])
+        if t >= 0
+    )
+
+
+def test_the_walk_grid_agrees_with_navigator_neighbours(grid_map):
+    m = random_map(grid_map, 1)
+    navigator = navigation.Navigator(m)
+    grid = navigation.WalkGrid(m.bake_tiles())
+    for cell in m.cells:
+        if not grid.standable[cell]:
+            continue
+        expected = sorted((i, round(c, 4)) for i, c in navigator.neighbours(cell))
+        assert grid_steps(grid, cell) == expected, cell
+
+
+def test_a_star_steps_up_ledges_the_sweep_can_climb(grid_map):
+    m = grid_map(3, 1, 3)
+    m.set(0, 0, 0, "grass")
+    m.set(1, 0, 0, "wall")
+    m.set(1, 0, 1, "grass")
+    m.set(2, 0, 0, "wall")
+    m.set(2, 0, 1, "wall")
+    m.set(2, 0, 2, "grass")
+    navigator = navigation.Navigator(m)
+    assert navigator.find_path((0, 0, 0), (1, 0, 1)) == [(0, 0, 0), (1, 0, 1)]
+    assert collision.sweep(m, 0.5, 0.5, 0, 1, 0).z == 1
+    # two cells up is too high for step_height 1.
+    assert navigator.find_path((0, 0, 0), (2, 0, 2)) == [
+        (0, 0, 0),
+        (1, 0, 1),
+        (2, 0, 2),
+    ]
+    assert navigator.landing(2, 0, 0) is None
+    assert navigation.Navigator(m, step_height=2).landing(2, 0, 0) == (2, 0, 2)
+
+
+def test_flow_field_distances_match_a_star_path_costs(grid_map):
+    m = random_map(grid_map, 2)
+    m.bake_tiles()
+    navigator = navigation.Navigator(m)
+    goal = next(c for c in sorted(m.cells) if m.cells[c] == "grass")
+    field = navigator.flow_field(goal)
+    reachable = 0
+    for cell, tiletype in m.cells.items():
+        if tiletype != "grass":
+            continue
+        path = navigator.find_path(cell, goal)
+        distance = field.distance_at(*cell)
+        if path is None:
+            assert distance == float("inf")
+            continue
+        reachable += 1
+        assert abs(path_cost(path) - distance) < 1e-3, cell
+        # following the field reaches the goal along an equally short path.
+        walked = [cell]
+        while walked[-1] != goal:
+            walked.append(field.next_step(*walked[-1]))
+        assert abs(path_cost(walked) - distance) < 1e-3
+    assert reachable > 20
+
+
+def test_changed_tiles_update_the_walk_grid_in_place(grid_map):
+    m = random_map(grid_map, 3)
+    m.bake_tiles()
+    navigator = navigation.Navigator(m)
+    goal = next(c for c in sorted(m.cells) if m.cells[c] == "grass")
+    navigator.flow_field(goal)
+    grid = navigator._grid
+    rng = random.Random(3)
+    for _ in range(20):
+        x, y = rng.randrange(12), rng.randrange(12)
+        z = rng.randrange(3)
+        m.set(x, y, z, rng.choice(("wall", "grass", "air")))
+    field = navigator.flow_field(goal)
+    assert navigator._grid is grid
+    fresh = navigation.WalkGrid(m.raster)
+    for name in ("land", "standable", "target", "costs"):
+        np.testing.assert_array_equal(getattr(grid, name), getattr(fresh, name))
+    np.testing.assert_array_equal(
+        field.distance, navigation.FlowField(fresh, goal).distance
+    )
+
+
+def test_unreachable_goals_give_an_empty_field(grid_map):
+    m = grid_map(3, 3, 1)
+    for x in range(3):
+        for y in range(3):
+            m.set(x, y, 0, "grass")
+    navigator = navigation.Navigator(m)
+    # flow fields don't bake the map behind the caller's back.
+    with pytest.raises(RuntimeError):
+        navigator.flow_field((1, 1, 5))
+    assert m.raster is None
+    m.bake_tiles()
+    field = navigator.flow_field((1, 1, 5))
+    assert np.isinf(field.distance).all()
+    assert field.next_step(0, 0, 0) is None
+
+
+def test_cached_paths_are_dropped_when_tiles_near_them_change(grid_map):
+    m = grid_map(6, 6, 1)
+    m.add(0, 5, 0, 5, 0, 0, "grass")
+    navigator = navigation.Navigator(m)
+    near = navigator.find_path((0, 0, 0), (5, 0, 0))
+    far = navigator.find_path((0, 5, 0), (5, 5, 0))
+    assert navigator.find_path((0, 0, 0), (5, 0, 0)) is near
+    assert (3, 0, 0) in near
+    m.set(3, 0, 0, "wall")
+    rerouted = navigator.find_path((0, 0, 0), (5, 0, 0))
+    assert rerouted is not near and (3, 0, 0) not in rerouted
+    assert navigator.find_path((0, 5, 0), (5, 5, 0)) is far
+    # unreachable goals are looked for again after any change.
+    wall = m.add(3, 3, 0, 5, 0, 0, "wall")
+    assert navigator.find_path((0, 5, 0), (5, 5, 0)) is None
+    m.remove(wall)
+    assert navigator.find_path((0, 5, 0), (5, 5, 0)) == far
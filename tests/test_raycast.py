@@ -0,0 +1,83 @@
+import random
+from types import SimpleNamespace
+
+import numpy as np
+
+from libs import raycast, tile_raster
+
+
+def make_raster(seed, size=16):
+    rng = random.Random(seed)
+    m = SimpleNamespace(minx=0, miny=0, minz=0, maxx=size - 1, maxy=size - 1, maxz=3)
+    raster = tile_raster.TileRaster(m)
+    for _ in range(60):
+        x, y, z = rng.randrange(size), rng.randrange(size), rng.randrange(4)
+        raster.ids[x, y, z] = raster.id_of(rng.choice(("wall", "brick wall", "grass")))
+    return raster
+
+
+def is_wall(tiletype):
+    return "wall" in tiletype
+
+
+def march(raster, origin, target, samples=20000):
+    """the first blocking tile along a ray, found by sampling it finely"""
+    origin, target = np.array(origin), np.array(target)
+    length = np.linalg.norm(target - origin)
+    s = np.linspace(0, 1, samples)
+    cells = np.floor(origin + (target - origin) * s[:, None]).astype(int)
+    inside = np.all((cells >= 0) & (cells < raster.shape), axis=1)
+    tiles = np.full(samples, "", dtype=object)
+    tiles[inside] = raster.decode(raster.ids)[tuple(cells[inside].T)]
+    blocked = np.flatnonzero([is_wall(i) for i in tiles])
+    if not len(blocked):
+        return False, "", length
+    return True, tiles[blocked[0]], s[blocked[0]] * length
+
+
+def test_batched_rays_match_marching_each_ray():
+    raster = make_raster(4)
+    rng = random.Random(4)
+    origins = [
+        [rng.uniform(-2, 18), rng.uniform(-2, 18), rng.uniform(0, 4)] for _ in range(60)
+    ]
+    targets = [
+        [rng.uniform(-2, 18), rng.uniform(-2, 18), rng.uniform(0, 4)] for _ in range(60)
+    ]
+    hits, tiletypes, distances = raycast.raycast(raster, origins, targets, is_wall)
+    for i in range(60):
+        hit, tiletype, distance = march(raster, origins[i], targets[i])
+        assert hits[i] == hit, i
+        assert tiletypes[i] == tiletype
+        assert abs(distances[i] - distance) < 0.01
+
+
+def test_rays_starting_in_a_wall_and_zero_length_rays():
+    raster = make_raster(0, size=4)
+    raster.ids[...] = 0
+    raster.ids[1, 1, 1] = raster.id_of("wall")
+    hits, tiletypes, distances = raycast.raycast(
+        raster,
+        [[1.5, 1.5, 1.5], [0.5, 0.5, 0.5], [0.5, 1.5, 1.5]],
+        [[3.5, 1.5, 1.5], [0.5, 0.5, 0.5], [3.5, 1.5, 1.5]],
+        is_wall,
+    )
+    assert hits.tolist() == [True, False, True]
+    assert tiletypes.tolist() == ["wall", "", "wall"]
+    assert np.allclose(distances, [0, 0, 0.5])
+
+
+def test_unbaked_maps_cast_the_same_rays_without_baking(grid_map):
+    rng = random.Random(5)
+    m = grid_map(12, 12, 4)
+    m.add(0, 11, 0, 11, 0, 0, "grass")
+    for _ in range(40):
+        m.set(rng.randrange(12), rng.randrange(12), rng.randrange(4), "wall")
+    origins = [[rng.uniform(-2, 14), rng.uniform(-2, 14), 0.5] for _ in range(40)]
+    targets = [[rng.uniform(-2, 14), rng.uniform(-2, 14), 3.5] for _ in range(40)]
+    unbaked = raycast.raycast_map(m, origins, targets, is_wall)
+    assert m.raster is None
+    baked = raycast.raycast(m.bake_tiles(), origins, targets, is_wall)
+    assert unbaked[0].tolist() == baked[0].tolist() and unbaked[0].any()
+    assert unbaked[1].tolist() == baked[1].tolist()
+    assert np.allclose(unbaked[2], baked[2])
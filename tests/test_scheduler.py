@@ -0,0 +1,92 @@
+from libs import scheduler
+
+
+def test_call_after_fires_once_when_due():
+    s = scheduler.Scheduler()
+    calls = []
+    timer = s.call_after(10, lambda: calls.append("x"))
+    s.update(9)
+    assert calls == []
+    s.update(10)
+    s.update(20)
+    assert calls == ["x"]
+    assert timer.fired and not timer.active
+    assert len(s) == 0
+
+
+def test_timers_fire_in_deadline_then_insertion_order():
+    s = scheduler.Scheduler()
+    calls = []
+    s.call_after(5, lambda: calls.append("b"))
+    s.call_after(1, lambda: calls.append("a"))
+    s.call_after(5, lambda: calls.append("c"))
+    s.update(10)
+    assert calls == ["a", "b", "c"]
+
+
+def test_call_every_repeats_without_catch_up_bursts():
+    s = scheduler.Scheduler()
+    calls = []
+    timer = s.call_every(10, lambda: calls.append(s.now), delay=0)
+    s.update(0)
+    s.update(10)
+    s.update(100)
+    assert calls == [0, 10, 100]
+    s.update(105)
+    assert len(calls) == 3
+    timer.cancel()
+    s.update(1000)
+    assert len(calls) == 3
+
+
+def test_timers_scheduled_during_update_wait_for_the_next_one():
+    s = scheduler.Scheduler()
+    calls = []
+    s.call_after(0, lambda: s.call_after(0, lambda: calls.append("inner")))
+    s.update(0)
+    assert calls == []
+    s.update(0)
+    assert calls == ["inner"]
+
+
+def test_cancel_prevents_firing_and_updates_len():
+    s = scheduler.Scheduler()
+    calls = []
+    timer = s.call_after(5, lambda: calls.append("x"))
+    s.call_after(5, lambda: None)
+    timer.cancel()
+    timer.cancel()
+    assert len(s) == 1
+    s.update(5)
+    assert calls == []
+    assert len(s) == 0
+
+
+def test_mass_cancel_from_a_callback_does_not_fire_twice():
+    s = scheduler.Scheduler()
+    calls = []
+    others = []
+
+    def cancel_others():
+        for i in others:
+            i.cancel()
+
+    s.call_after(5, cancel_others)
+    s.call_after(5, lambda: calls.append("x"))
+    others.extend(
+        s.call_after(20, lambda: calls.append("cancelled")) for _ in range(100)
+    )
+    s.update(5)
+    s.update(10)
+    s.update(30)
+    assert calls == ["x"]
+    assert len(s) == 0
+    assert s._cancelled == 0
+
+
+def test_clear_cancels_everything():
+    s = scheduler.Scheduler()
+    timers = [s.call_after(i, lambda: None) for i in range(5)]
+    s.clear()
+    assert len(s) == 0
+    assert not any(i.active for i in timers)
@@ -0,0 +1,129 @@
+import random
+
+from libs import spatial
+
+
+def test_grid_index_point_queries_come_back_in_insertion_order():
+    index = spatial.GridIndex(cell_size=4)
+    index.insert("floor", 0, 10, 0, 10, 0, 0)
+    index.insert("rug", 2, 3, 2, 3, 0, 0)
+    index.insert("far", 20, 30, 20, 30, 0, 0)
+    assert list(index.query_point(2, 2, 0)) == ["floor", "rug"]
+    assert index.first_at(2, 2, 0) == "floor"
+    assert index.last_at(2, 2, 0) == "rug"
+    assert index.last_at(5, 5, 0) == "floor"
+    assert index.last_at(15, 15, 0) is None
+
+
+def test_grid_index_explicit_order_wins_over_insertion_order():
+    index = spatial.GridIndex(cell_size=4)
+    index.insert("late", 0, 1, 0, 1, 0, 0, order=10)
+    index.insert("early", 0, 1, 0, 1, 0, 0, order=1)
+    assert list(index.query_point(0, 0, 0)) == ["early", "late"]
+
+
+def test_grid_index_box_queries_match_a_linear_scan():
+    index = spatial.GridIndex(cell_size=4)
+    boxes = {}
+    for i in range(40):
+        box = (i, i + i % 7, i % 5, i % 5 + 3, 0, i % 3)
+        boxes[f"box{i}"] = box
+        index.insert(f"box{i}", *box)
+    query = (5, 20, 1, 2, 0, 1)
+    expected = [
+        name
+        for name, (minx, maxx, miny, maxy, minz, maxz) in boxes.items()
+        if minx <= query[1]
+        and maxx >= query[0]
+        and miny <= query[3]
+        and maxy >= query[2]
+        and minz <= query[5]
+        and maxz >= query[4]
+    ]
+    assert index.query_box(*query) == expected
+
+
+def test_grid_index_remove_and_reinsert():
+    index = spatial.GridIndex(cell_size=4)
+    index.insert("a", 0, 9, 0, 9, 0, 0)
+    index.remove("a")
+    index.remove("a")
+    assert len(index) == 0
+    assert index.first_at(1, 1, 0) is None
+    assert index._cells == {}
+    index.insert("a", 0, 0, 0, 0, 0, 0)
+    index.insert("a", 5, 5, 5, 5, 0, 0)
+    assert index.box_of("a") == (5, 5, 5, 5, 0, 0)
+    assert index.first_at(0, 0, 0) is None
+
+
+def test_grid_index_last_at_skips_items_the_predicate_rejects():
+    index = spatial.GridIndex(cell_size=4)
+    index.insert("floor", 0, 10, 0, 10, 0, 0)
+    index.insert("gap", 0, 10, 0, 10, 0, 0)
+    index.insert("hole", 20, 21, 20, 21, 0, 0)
+    assert index.last_at(1, 1, 0) == "gap"
+    assert index.last_at(1, 1, 0, lambda i: i != "gap") == "floor"
+    assert index.last_at(1, 1, 0, lambda i: False) is None
+
+
+def random_points(seed, count=200):
+    rng = random.Random(seed)
+    return {
+        f"e{i}": (rng.uniform(-50, 50), rng.uniform(-50, 50), rng.randrange(0, 4))
+        for i in range(count)
+    }
+
+
+def squared_distance(a, b):
+    return sum((i - j) ** 2 for i, j in zip(a, b))
+
+
+def test_spatial_hash_queries_match_brute_force():
+    points = random_points(1)
+    h = spatial.SpatialHash(cell_size=8)
+    for name, position in points.items():
+        h.insert(name, *position)
+    center = (3.0, -7.0, 1)
+    assert h.query_radius(*center, 20) == sorted(
+        (i for i in points if squared_distance(points[i], center) <= 400),
+        key=lambda i: squared_distance(points[i], center),
+    )
+    box = (-10, 25, -30, 5, 0, 2)
+    assert sorted(h.query_box(*box)) == sorted(
+        i
+        for i, (x, y, z) in points.items()
+        if box[0] <= x <= box[1] and box[2] <= y <= box[3] and box[4] <= z <= box[5]
+    )
+    by_distance = sorted(points, key=lambda i: squared_distance(points[i], center))
+    assert h.nearest(*center, k=5) == by_distance[:5]
+    assert h.nearest(*center, k=3, exclude=by_distance[0]) == by_distance[1:4]
+    assert h.nearest(1000, 1000, 0) == [
+        min(points, key=lambda i: squared_distance(points[i], (1000, 1000, 0)))
+    ]
+
+
+def test_spatial_hash_move_and_remove():
+    h = spatial.SpatialHash(cell_size=4)
+    h.insert("a", 0, 0, 0)
+    h.insert("b", 0, 0, 0)
+    assert sorted(h.query_point(0, 0, 0)) == ["a", "b"]
+    h.move("a", 30, 30, 0)
+    assert h.query_point(0, 0, 0) == ["b"]
+    assert h.position_of("a") == (30, 30, 0)
+    h.move("ghost", 1, 1, 1)
+    assert "ghost" not in h
+    h.remove("a")
+    h.remove("b")
+    assert len(h) == 0
+    assert h._cells == {}
+    assert h.nearest(0, 0, 0) == []
+
+
+def test_spatial_hash_box_queries_bigger_than_the_occupied_cells():
+    h = spatial.SpatialHash(cell_size=1)
+    assert h.query_box(-1000, 1000, -1000, 1000, -1000, 1000) == []
+    h.insert("a", 5, 5, 0)
+    h.insert("b", -500, 300, 2)
+    assert sorted(h.query_box(-1000, 1000, -1000, 1000, 0, 2)) == ["a", "b"]
+    assert h.query_box(0, 1000, 0, 1000, 0, 2) == ["a"]
@@ -0,0 +1,108 @@
+import pytest
+
+from libs import tasks
+
+
+def test_generator_tasks_wait_for_time_and_return_a_result():
+    runner = tasks.TaskRunner()
+    log = []
+
+    def routine():
+        log.append("start")
+        yield tasks.wait(100)
+        log.append("waited")
+        yield
+        log.append("next frame")
+        return 5
+
+    task = runner.spawn(routine)
+    runner.update(0)
+    assert log == ["start"]
+    runner.update(99)
+    assert log == ["start"]
+    runner.update(100)
+    assert log == ["start", "waited"]
+    assert not task.done
+    runner.update(100)
+    assert task.done and task.result == 5
+    assert len(runner) == 0
+
+
+def test_async_def_tasks_poll_until_a_predicate_holds():
+    runner = tasks.TaskRunner()
+    state = {"open": False}
+
+    async def routine():
+        await tasks.until(lambda: state["open"])
+        await tasks.next_frame()
+        return "through"
+
+    task = runner.spawn(routine())
+    for now in range(5):
+        runner.update(now)
+    assert not task.done
+    state["open"] = True
+    runner.update(5)
+    assert not task.done
+    runner.update(6)
+    assert task.result == "through"
+
+
+def test_tasks_parked_during_an_update_wait_for_the_next_one():
+    runner = tasks.TaskRunner()
+    steps = []
+
+    def routine():
+        while True:
+            steps.append(runner.now)
+            yield tasks.wait(0)
+
+    runner.spawn(routine)
+    runner.update(0)
+    runner.update(1)
+    assert steps == [0, 1]
+
+
+def test_cancel_and_clear_stop_waiting_tasks():
+    runner = tasks.TaskRunner()
+    closed = []
+
+    def routine(name):
+        try:
+            yield tasks.wait(10)
+        finally:
+            closed.append(name)
+
+    a = runner.spawn(routine("a"))
+    b = runner.spawn(routine("b"))
+    c = runner.spawn(routine("c"))
+    runner.update(0)
+    a.cancel()
+    assert a.cancelled and closed == ["a"]
+    assert len(runner) == 2
+    runner.clear()
+    assert b.cancelled and c.cancelled
+    assert sorted(closed) == ["a", "b", "c"]
+    runner.update(20)
+    assert len(runner) == 0
+
+
+def test_errors_finish_the_task_and_propagate():
+    runner = tasks.TaskRunner()
+
+    def broken():
+        yield
+        raise ValueError("boom")
+
+    def bad_wait():
+        yield "soon"
+
+    task = runner.spawn(broken)
+    runner.update(0)
+    with pytest.raises(ValueError):
+        runner.update(1)
+    assert task.done
+    task = runner.spawn(bad_wait)
+    with pytest.raises(TypeError):
+        runner.update(2)
+    assert task.cancelled
@@ -0,0 +1,53 @@
+from libs import tile_raster
+
+
+def test_bake_paints_later_tiles_over_earlier_ones(grid_map):
+    m = grid_map(10, 10, 4)
+    m.add(0, 9, 0, 9, 0, 0, "grass")
+    m.add(2, 3, 2, 3, 0, 1, "wall")
+    raster = tile_raster.TileRaster(m)
+    raster.bake()
+    assert raster.tile_at(0, 0, 0) == "grass"
+    assert raster.tile_at(2, 3, 0) == "wall"
+    assert raster.tile_at(2, 3, 1) == "wall"
+    assert raster.tile_at(5, 5, 1) == ""
+    assert raster.nbytes == 10 * 10 * 4
+
+
+def test_tiles_outside_the_map_are_clipped(grid_map):
+    m = grid_map(10, 10, 4)
+    m.add(-5, 50, 8, 50, 0, 0, "stone")
+    raster = tile_raster.TileRaster(m)
+    raster.bake()
+    assert raster.tile_at(0, 9, 0) == "stone"
+    assert raster.tile_at(0, 7, 0) == ""
+    assert not raster.contains(10, 0, 0)
+    assert raster.ids_in_box(20, 30, 0, 1, 0, 0).size == 0
+
+
+def test_repaint_rebuilds_a_box_after_a_tile_is_removed(grid_map):
+    m = grid_map(10, 10, 4)
+    m.add(0, 9, 0, 9, 0, 0, "grass")
+    wall = m.set(4, 4, 0, "wall")
+    raster = tile_raster.TileRaster(m)
+    raster.bake()
+    m.remove(wall)
+    raster.repaint(4, 4, 4, 4, 0, 0)
+    assert raster.tile_at(4, 4, 0) == "grass"
+
+
+def test_the_palette_widens_past_255_tiletypes(grid_map):
+    m = grid_map(10, 10, 4)
+    for i in range(300):
+        m.set(i % 10, i // 10 % 10, i // 100, f"t{i}")
+    raster = tile_raster.TileRaster(m)
+    raster.bake()
+    assert raster.ids.dtype.itemsize == 2
+    assert raster.tile_at(9, 9, 2) == "t299"
+    assert list(raster.tiles_in_box(0, 1, 0, 0, 0, 0)[:, 0, 0]) == ["t0", "t1"]
+    assert list(raster.column(0, 0)) == [
+        raster.id_of("t0"),
+        raster.id_of("t100"),
+        raster.id_of("t200"),
+        0,
+    ]
@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pyogg")
+pytest.importorskip("urllib3")
+from libs import audio
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = audio.VoicePool(3)
+    # sounds give their voice back to the module's pool when destroyed.
+    monkeypatch.setattr(audio, "voice_pool", pool)
+    return pool
+
+
+def play(pool, priority=audio.Priority.NORMAL, volume=100, muted=False):
+    voice = pool.acquire(priority)
+    if voice is None:
+        return None
+    src = SimpleNamespace(sounds=set(), muted=muted, direct=True)
+    buffer = audio.openal.BufferSound()
+    buffer.load(bytes(100))
+    voice.add(buffer)
+    sound = audio.Sound(src, buffer, voice, priority=priority)
+    sound.volume = volume
+    src.sounds.add(sound)
+    pool.attach(voice, sound)
+    sound.play()
+    return sound
+
+
+def test_voices_are_borrowed_and_given_back_reset(pool):
+    sound = play(pool)
+    voice = sound.generator
+    voice.volume = 0.3
+    assert len(pool) == 1
+    sound.destroy()
+    assert len(pool) == 0 and voice in pool.free
+    assert voice.queue == [] and voice.volume == 1.0 and not voice.playing()
+    # releasing a free voice again doesn't hand it out twice.
+    pool.release(voice)
+    assert len(pool.free) == 3
+
+
+def test_the_least_audible_sound_of_the_lowest_priority_is_stolen(pool):
+    ambient = play(pool, audio.Priority.AMBIENT, volume=100)
+    quiet = play(pool, audio.Priority.NORMAL, volume=10)
+    loud = play(pool, audio.Priority.NORMAL, volume=100)
+    stealer = play(pool, audio.Priority.NORMAL)
+    assert ambient.destroied and not quiet.destroied
+    assert stealer.generator is ambient.generator
+    stealer = play(pool, audio.Priority.NORMAL)
+    assert quiet.destroied and not loud.destroied
+    assert len(pool) == 3
+
+
+def test_muted_sounds_are_stolen_first(pool):
+    far = play(pool, volume=100, muted=True)
+    near = [play(pool, volume=5) for i in range(2)]
+    play(pool)
+    assert far.destroied and not any(i.destroied for i in near)
+
+
+def test_sounds_more_important_than_the_new_one_are_kept(pool):
+    sounds = [play(pool, audio.Priority.HIGH) for i in range(3)]
+    assert play(pool, audio.Priority.NORMAL) is None
+    assert not any(i.destroied for i in sounds)
+    assert play(pool, audio.Priority.UI) is not None
+
+
+def test_a_stolen_sound_no_longer_controls_its_old_voice(pool):
+    stolen = play(pool, audio.Priority.AMBIENT)
+    voice = stolen.generator
+    for i in range(2):
+        play(pool)
+    stealer = play(pool)
+    assert stealer.generator is voice
+    stealer.set_volume(80)
+    stolen.set_volume(20)
+    stolen.set_position(50)
+    stolen.pause()
+    assert voice.volume == 0.8 and voice.seek == 0 and voice.playing()
+    assert stolen.get_volume() == 0 and not stolen.playing()
+    stolen.destroy()
+    assert voice.playing() and len(pool) == 3
+
+
+def test_destroying_the_pool_destroys_its_sounds_and_voices(pool):
+    sound = play(pool)
+    free = list(pool.free)
+    pool.destroy()
+    assert sound.destroied
+    assert all(i.deleted for i in free) and pool.free == []
@@ -0,0 +1,215 @@
+import pytest
+
+pytest.importorskip("pyogg")
+pytest.importorskip("urllib3")
+from libs import map_format, world_map
+
+
+@pytest.fixture
+def new_map(game, tmp_path):
+    """makes empty maps of 10x10x3 tiles, or loads them from map source text, destroying them after the test"""
+    maps = []
+
+    def make(source=None):
+        if source is None:
+            m = world_map.Map(game, 0, 0, 0, 9, 9, 2)
+        else:
+            path = tmp_path / f"{len(maps)}.txt"
+            path.write_text(source, encoding="utf-8")
+            map_format.compile_map(str(path), str(path.with_suffix(".map")))
+            m = world_map.Map.load(game, str(path.with_suffix(".map")))
+        maps.append(m)
+        return m
+
+    yield make
+    for m in maps:
+        m.destroy()
+
+
+def tiles_of(m):
+    return [
+        [[m.get_tile_at(x, y, z) for z in range(m.minz, m.maxz + 1)] for y in range(10)]
+        for x in range(10)
+    ]
+
+
+def test_overlays_win_over_tiles_which_win_over_the_compiled_map(new_map):
+    m = new_map("""map 0 0 0 9 9 2
+platform 0 9 0 9 0 0 grass
+platform 2 3 2 3 0 1 stone
+""")
+    m.spawn_platform(2, 5, 2, 2, 0, 0, "wood")
+    hatch = m.spawn_dynamic_tile(3, 4, 2, 2, 0, 0, "metal")
+    assert m.get_tile_at(0, 0, 0) == "grass"
+    assert m.get_tile_at(2, 2, 0) == "wood" and m.get_tile_at(2, 2, 1) == "stone"
+    assert m.get_tile_at(3, 2, 0) == "metal" and m.get_tile_at(5, 2, 0) == "wood"
+    assert m.get_tile_at(5, 5, 1) == ""
+    m.set_tile_type(hatch, None)
+    assert m.get_tile_at(3, 2, 0) == "wood"
+    m.set_tile_type(hatch, "metal")
+    unbaked = tiles_of(m)
+    # the raster answers the same, and points outside it still go to the indexes.
+    m.bake_tiles()
+    assert tiles_of(m) == unbaked
+    m.spawn_platform(20, 20, 0, 0, 0, 0, "wall")
+    assert m.get_tile_at(20, 0, 0) == "wall" and m.get_tile_at(3, 2, 5) == ""
+
+
+def build(m, baked):
+    """spawns tiles, overlays and a door on {m} and changes them, baking the map first if {baked}"""
+    if baked:
+        m.bake_tiles()
+    m.spawn_platform(0, 9, 0, 9, 0, 0, "grass")
+    door = m.spawn_door(4, 4, 2, 6, 0, 1, "wall", "")
+    bridge = m.spawn_dynamic_tile(2, 7, 4, 4, 0, 0, "wood")
+    hole = m.spawn_dynamic_tile(6, 6, 4, 4, 0, 0, None)
+    # static tiles spawned after the overlays still go under them.
+    m.spawn_platform(3, 5, 3, 5, 0, 1, "stone")
+    m.set_tile_type(bridge, "metal")
+    m.set_tile_type(hole, "water")
+    m.set_tile_type(hole, None)
+    # the door's tiles are older than the bridge, opening it doesn't cut through the bridge.
+    door.switch_state(silent=True)
+
+
+def test_baked_and_unbaked_maps_agree_as_tiles_and_overlays_change(new_map):
+    plain, baked = new_map(), new_map()
+    build(plain, False)
+    build(baked, True)
+    assert tiles_of(baked) == tiles_of(plain)
+    assert plain.get_tile_at(4, 4, 0) == "metal"
+    assert plain.get_tile_at(5, 4, 1) == "stone"
+    assert plain.get_tile_at(6, 4, 0) == "metal"
+    assert plain.get_tile_at(4, 3, 0) == "" and plain.get_tile_at(4, 3, 1) == "air"
+
+
+def test_doors_open_and_close_through_their_dynamic_tiles(new_map):
+    m = new_map()
+    m.spawn_platform(0, 9, 0, 9, 0, 0, "grass")
+    door = m.spawn_door(4, 4, 2, 6, 0, 1, "wall", "wood")
+    changes = []
+    m.add_tile_listener(lambda *box: changes.append(box))
+    assert m.get_tile_at(4, 3, 0) == "wall" and m.get_tile_at(4, 3, 1) == "wall"
+    door.switch_state(silent=True)
+    assert door.open
+    assert m.get_tile_at(4, 3, 0) == "wood" and m.get_tile_at(4, 3, 1) == "air"
+    assert changes == [(4, 4, 2, 6, 0, 0), (4, 4, 2, 6, 1, 1)]
+    door.switch_state(to_open=False)
+    assert m.get_tile_at(4, 3, 0) == "wall" and m.get_tile_at(4, 3, 1) == "wall"
+    # closing a closed door changes nothing.
+    door.switch_state(to_open=False)
+    assert len(changes) == 4
+    m.detach(door)()
+    assert m.get_tile_at(4, 3, 0) == "grass" and m.get_tile_at(4, 3, 1) == ""
+
+
+def test_regions_are_left_before_new_ones_are_entered(new_map):
+    m = new_map()
+    m.spawn_zone(0, 4, 0, 9, 0, 2, "hall")
+    m.spawn_zone(5, 9, 0, 9, 0, 2, "kitchen")
+    m.spawn_zone(5, 9, 5, 9, 0, 2, "pantry")
+    events = []
+    m.regions.add_listener(
+        "zone",
+        lambda zone: events.append(("enter", zone)),
+        lambda zone: events.append(("leave", zone)),
+    )
+    lookups = []
+    get_zone_at = m.get_zone_at
+    m.get_zone_at = lambda *point: lookups.append(point) or get_zone_at(*point)
+    m.regions.update(1, 1, 0)
+    assert events == [("enter", "hall")]
+    # moving inside a cell doesn't look the regions up again.
+    m.regions.update(1.5, 1.9, 0)
+    assert len(lookups) == 1
+    m.regions.update(6, 1, 0)
+    m.regions.update(6, 6, 0)
+    assert events[1:] == [
+        ("leave", "hall"),
+        ("enter", "kitchen"),
+        ("leave", "kitchen"),
+        ("enter", "pantry"),
+    ]
+    m.regions.clear()
+    assert events[-1] == ("leave", "pantry")
+
+
+def test_ambiences_load_when_approached_and_are_released_after_fading_out(
+    new_map, game, audio, monkeypatch
+):
+    monkeypatch.setitem(world_map.options.prefs, "stream_ambience", False)
+    m = new_map()
+    m.regions.approach_distance = 3
+    wind = m.spawn_ambience(0, 2, 0, 2, 0, 2, "wind.ogg", 60)
+
+    def wait(ms):
+        game.time_domain.advance(ms)
+        m.loop()
+
+    m.regions.update(9, 9, 0)
+    assert wind.sound is None
+    m.regions.update(5, 1, 0)
+    sound = wind.sound
+    assert sound.playing() and sound.get_volume() == 0 and not wind.playing
+    m.regions.update(1, 1, 0)
+    wait(500)
+    assert 20 < sound.get_volume() < 40
+    wait(600)
+    assert sound.get_volume() == pytest.approx(60)
+    m.regions.update(5, 1, 0)
+    wait(600)
+    assert wind.sound is None and sound.destroied
+    # walking back in starts it again.
+    m.regions.update(1, 1, 0)
+    assert wind.sound.playing() and wind.playing
+
+
+def test_entities_are_only_ticked_while_they_have_something_to_do(new_map, game):
+    m = new_map()
+    m.spawn_platform(0, 9, 0, 9, 0, 0, "grass")
+    standing = m.spawn_entity("standing", 1, 1, 0)
+    falling = m.spawn_entity("falling", 5, 5, 2)
+    sleeper = m.spawn_entity("sleeper", 8, 8, 0)
+    assert len(m.entity_scheduler) == 3
+    m.loop()
+    assert len(m.entity_scheduler) == 1 and falling.falling
+    game.time_domain.advance(1000)
+    m.loop()
+    assert falling.z == 0 and not falling.falling
+    assert len(m.entity_scheduler) == 0
+    # a hole opening under an entity wakes it, unless it is inactive.
+    sleeper.set_active(False)
+    m.spawn_dynamic_tile(1, 1, 1, 1, 0, 0, "air")
+    m.spawn_dynamic_tile(8, 8, 8, 8, 0, 0, "air")
+    assert standing.falling and len(m.entity_scheduler) == 1
+    assert not sleeper.falling
+    sleeper.set_active(True)
+    assert sleeper.falling and len(m.entity_scheduler) == 2
+
+
+def test_line_of_sight_does_not_bake_the_map(new_map):
+    m = new_map()
+    m.spawn_platform(0, 9, 0, 9, 0, 0, "grass")
+    door = m.spawn_door(4, 4, 0, 9, 1, 2, "wall", "")
+    assert not m.line_of_sight(1.5, 1.5, 1.5, 8.5, 1.5, 1.5)
+    door.switch_state(silent=True)
+    assert m.line_of_sight(1.5, 1.5, 1.5, 8.5, 1.5, 1.5)
+    assert m.raster is None
+
+
+def test_points_are_floored_to_cells_like_falls_floor_them(game):
+    m = world_map.Map(game, -4, -4, 0, 3, 3, 3)
+    try:
+        m.spawn_platform(-1, -1, -1, -1, 0, 0, "grass")
+        m.spawn_zone(-1, -1, -1, -1, 0, 3, "corner")
+        assert m.get_tile_at(-0.5, -0.5, 0.5) == "grass"
+        assert m.get_tile_at(0.5, 0.5, 0) == ""
+        assert m.get_zone_at(-0.2, -0.7, 2) == "corner"
+        assert m.in_bound(-4, -0.5, 0) and not m.in_bound(-4.5, 0, 0)
+        m.use_entity_store()
+        falling = m.spawn_entity("falling", -0.5, -0.5, 3)
+        game.time_domain.advance(1000)
+        m.loop()
+        assert falling.z == 0 and not falling.falling
+    finally:
+        m.destroy()
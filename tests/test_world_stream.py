@@ -0,0 +1,119 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from libs import map_format, world_stream
+
+
+class StubStatic:
+    """a compiled map with one door per 10x10 block"""
+
+    def __init__(self, doors):
+        self.doors = np.zeros(len(doors), dtype=map_format.RECORD)
+        for i, (x, y) in enumerate(doors):
+            self.doors[i] = (x, x, y, y, 0, 0, 0, 0, 0, 0)
+        for kind in ("ambiences", "musics", "reverbs", "tiles"):
+            setattr(self, kind, np.zeros(0, dtype=map_format.RECORD))
+
+    def string(self, index):
+        return "wall"
+
+    def in_box(self, table, minx, maxx, miny, maxy, minz, maxz):
+        return np.flatnonzero(
+            (table["minx"] <= maxx)
+            & (table["maxx"] >= minx)
+            & (table["miny"] <= maxy)
+            & (table["maxy"] >= miny)
+        )
+
+    def tiles_in_box(self, *box):
+        return self.in_box(self.tiles, *box)
+
+
+class StubMap:
+    def __init__(self, doors):
+        self.minz, self.maxz = 0, 0
+        self.static = StubStatic(doors)
+        self.regions = SimpleNamespace(refresh=lambda: None)
+        self.entities = {}
+        self.doors = []
+        self.destroyed_on = []
+
+    def spawn_door(self, minx, maxx, miny, maxy, minz, maxz, closetype, opentype):
+        door = (minx, miny)
+        self.doors.append(door)
+        return door
+
+    def detach(self, door):
+        self.doors.remove(door)
+        return lambda: self.destroyed_on.append(threading.get_ident())
+
+
+class StubEntity:
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+        self.active = True
+
+    def set_active(self, active):
+        self.active = active
+
+
+def wait_for_chunks(streamer):
+    for _ in range(200):
+        if not streamer.pending:
+            return
+        streamer.update()
+        time.sleep(0.005)
+    raise AssertionError("chunks never finished loading")
+
+
+def test_chunks_load_around_the_focus_and_unload_on_the_main_thread():
+    doors = [(x * 10 + 5, y * 10 + 5) for x in range(10) for y in range(10)]
+    m = StubMap(doors)
+    focus = SimpleNamespace(x=5, y=5)
+    streamer = world_stream.ChunkStreamer(
+        m,
+        SimpleNamespace(focus_object=focus),
+        chunk_size=10,
+        radius=1,
+        destroy_per_frame=2,
+    )
+    streamer.update()
+    wait_for_chunks(streamer)
+    assert sorted(m.doors) == [(5, 5), (5, 15), (15, 5), (15, 15)]
+    focus.x = focus.y = 85
+    streamer.update()
+    # unloaded doors leave the map at once but are freed a few per frame.
+    assert all(d[0] >= 75 and d[1] >= 75 for d in m.doors)
+    assert len(m.destroyed_on) == 2
+    wait_for_chunks(streamer)
+    streamer.update()
+    assert len(m.destroyed_on) == 4
+    assert set(m.destroyed_on) == {threading.get_ident()}
+    streamer.stop()
+    assert m.doors == []
+    assert len(m.destroyed_on) == 4 + 9
+
+
+def test_entities_are_reactivated_as_they_move_in_and_out_of_loaded_chunks():
+    m = StubMap([])
+    near, far = StubEntity(1, 1), StubEntity(100, 100)
+    m.entities = {"near": near, "far": far}
+    streamer = world_stream.ChunkStreamer(
+        m,
+        SimpleNamespace(focus_object=SimpleNamespace(x=0, y=0)),
+        chunk_size=10,
+        radius=1,
+    )
+    streamer.update()
+    assert near.active and not far.active
+    near.x = 50
+    streamer.place(near)
+    assert not near.active
+    spawned = StubEntity(12, 3)
+    spawned.active = False
+    streamer.place(spawned)
+    assert spawned.active
+    streamer.stop()